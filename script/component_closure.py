@@ -0,0 +1,211 @@
+from collections import Counter
+# NumPy is imported by the index functions only : kanji_metrics imports the
+# pure Python helpers of this module at startup
+
+#%%
+"""
+Transitive component closure index.
+
+Answering "does 海 contain 母 at any depth?" or "which kanji contain 木
+anywhere?" used to require resolving full decomposition trees.
+
+This module precomputes, in one memoised pass over KANJI_DB :
+    - a component id space (every character used as a component)
+    - for each kanji, the bitset of all its transitive components
+      (Python int, bit i set <=> component id i is contained)
+    - for each component, the posting list of every kanji containing it
+      (CSR arrays : offsets + kanji ids)
+
+Component ids are assigned by descending usage frequency so that the
+common components (口, 木, 氵...) sit in the low bits and most bitsets
+stay a few machine words long.
+"""
+
+def direct_components(entry):
+    """
+    Return the list of direct component characters of a KANJI_DB entry.
+    """
+    if not entry:
+        return []
+
+    return [comp['component'] for comp in entry.get('components') or []]
+
+def component_topological_order(kanji_db):
+    """
+    Order every character of the component DAG so that components always
+    come before the characters built from them (post-order).
+
+    Cycles in the IDS data are broken at the first repeated character,
+    mirroring the visited-set guard of resolve_kanji_tree_enriched.
+
+    Parameters
+    ----------
+    kanji_db : dict
+        Normalised kanji database (KANJI_DB).
+
+    Returns
+    -------
+    list[str]
+        All characters reachable from KANJI_DB, leaves first.
+    """
+    order = []
+    state = {}   # char -> 1 (in progress) | 2 (done)
+
+    for root in kanji_db:
+        if root in state:
+            continue
+
+        # explicit stack of (char, iterator over its components)
+        state[root] = 1
+        stack       = [(root, iter(direct_components(kanji_db.get(root))))]
+
+        while stack:
+            char, children = stack[-1]
+            advanced       = False
+
+            for child in children:
+                # skip finished nodes and back edges (cycles)
+                if child in state:
+                    continue
+
+                state[child] = 1
+                stack.append((child, iter(direct_components(kanji_db.get(child)))))
+                advanced = True
+                break
+
+            if not advanced:
+                stack.pop()
+                state[char] = 2
+                order.append(char)
+
+    return order
+
+def build_component_closure_index(kanji_db):
+    """
+    Build the transitive component closure index for the whole database.
+
+    Parameters
+    ----------
+    kanji_db : dict
+        Normalised kanji database (KANJI_DB).
+
+    Returns
+    -------
+    dict
+        {
+          'kanji'           : list[str]       kanji id -> character (KANJI_DB order),
+          'kanji_ids'       : dict[str, int]  character -> kanji id,
+          'components'      : list[str]       component id -> character,
+          'component_ids'   : dict[str, int]  character -> component id,
+          'closure'         : dict[str, int]  character -> bitset of transitive components,
+          'posting_offsets' : np.ndarray      CSR offsets, length n_components + 1,
+          'posting_kanji'   : np.ndarray      kanji ids, grouped by component id
+        }
+    """
+    import numpy as np
+    # 1. component id space, most frequently used components first
+    usage = Counter()
+    for entry in kanji_db.values():
+        usage.update(set(direct_components(entry)))
+
+    components    = [char for char, _ in usage.most_common()]
+    component_ids = {char: i for i, char in enumerate(components)}
+
+    # 2. closures, bottom-up over the component DAG
+    # closure(c) = OR over direct components d of (bit(d) | closure(d))
+    closure = {}
+    for char in component_topological_order(kanji_db):
+        bits = 0
+        for child in direct_components(kanji_db.get(char)):
+            bits |= (1 << component_ids[child]) | closure.get(child, 0)
+        closure[char] = bits
+
+    # 3. posting lists as CSR arrays over kanji ids
+    kanji     = list(kanji_db)
+    kanji_ids = {char: i for i, char in enumerate(kanji)}
+
+    pair_kanji      = []
+    pair_components = []
+    for kanji_id, char in enumerate(kanji):
+        bits = closure.get(char, 0)
+        while bits:
+            low = bits & -bits
+            pair_kanji.append(kanji_id)
+            pair_components.append(low.bit_length() - 1)
+            bits ^= low
+
+    pair_kanji      = np.asarray(pair_kanji, dtype=np.int32)
+    pair_components = np.asarray(pair_components, dtype=np.int32)
+
+    # stable sort keeps kanji ids ascending inside each posting list
+    order           = np.argsort(pair_components, kind='stable')
+    posting_kanji   = pair_kanji[order]
+    counts          = np.bincount(pair_components, minlength=len(components))
+    posting_offsets = np.zeros(len(components) + 1, dtype=np.int64)
+    np.cumsum(counts, out=posting_offsets[1:])
+
+    return {
+        'kanji'           : kanji,
+        'kanji_ids'       : kanji_ids,
+        'components'      : components,
+        'component_ids'   : component_ids,
+        'closure'         : closure,
+        'posting_offsets' : posting_offsets,
+        'posting_kanji'   : posting_kanji
+    }
+
+#%%
+def contains_component(closure_index, char, component):
+    """
+    Check whether `component` appears at any depth in the decomposition of `char`.
+
+    Single bitwise test, no tree is resolved.
+    """
+    component_id = closure_index['component_ids'].get(component)
+
+    if component_id is None:
+        return False
+
+    return bool(closure_index['closure'].get(char, 0) >> component_id & 1)
+
+def component_posting(closure_index, component):
+    """
+    Return the kanji ids of every kanji containing `component` at any depth.
+
+    The returned array is a read-only view into the precomputed postings,
+    sorted by kanji id.
+    """
+    import numpy as np
+    component_id = closure_index['component_ids'].get(component)
+
+    if component_id is None:
+        return np.empty(0, dtype=np.int32)
+
+    offsets = closure_index['posting_offsets']
+    view    = closure_index['posting_kanji'][offsets[component_id]:offsets[component_id + 1]]
+    view.flags.writeable = False
+
+    return view
+
+def kanji_containing(closure_index, component):
+    """
+    Return every kanji containing `component` at any depth, as characters.
+    """
+    kanji = closure_index['kanji']
+
+    return [kanji[i] for i in component_posting(closure_index, component)]
+
+def transitive_components(closure_index, char):
+    """
+    Decode the closure bitset of `char` into the list of its component characters.
+    """
+    components = closure_index['components']
+    bits       = closure_index['closure'].get(char, 0)
+    result     = []
+
+    while bits:
+        low = bits & -bits
+        result.append(components[low.bit_length() - 1])
+        bits ^= low
+
+    return result
@@ -0,0 +1,324 @@
+import codecs
+import os
+from collections import Counter
+from pathlib import Path
+import numpy as np
+from text_annotation import KANJI_RUN
+from kanji_dict_xml import field_to_int
+
+#%%
+"""
+Kanji frequency and coverage over a local text corpus.
+
+KANJIDIC2 'frequency' only ranks 2,500 kanji, from old newspaper data.
+count_corpus_kanji measures frequencies on any corpus (many files or one
+big file) :
+
+    - the corpus is cut into byte segments (SEGMENT_SIZE, aligned on UTF-8
+      character boundaries), so a single big file is shared by every worker,
+    - each worker reads its segment by blocks, counts the kanji runs found by
+      the text_annotation scanner into its own Counter and returns it,
+    - the parent merges the Counters as they arrive.
+
+Memory is bounded by the number of workers x BLOCK_SIZE, plus the Counters
+(at most one entry per distinct kanji), whatever the corpus size.
+
+frequency_table joins the counts with KANJIDIC2 (JLPT, grade, frequency
+rank) and the complexity metrics ; coverage_curve answers "the top N kanji
+cover X% of the kanji occurrences".
+
+    python corpus_frequency.py corpus_dir/ big_file.txt --workers 4
+"""
+
+# bytes per task / bytes decoded at once by a worker
+SEGMENT_SIZE = 16 << 20
+BLOCK_SIZE   = 1 << 20
+
+COVERAGE_POINTS = (100, 250, 500, 1000, 1500, 2000, 2500, 3000, 4000, 5000)
+
+def _is_continuation(byte):
+    # UTF-8 continuation bytes are 10xxxxxx
+    return byte & 0xC0 == 0x80
+
+def corpus_files(paths, pattern='*.txt'):
+    """
+    Expand files and directories (searched recursively for `pattern`).
+
+    Returns
+    -------
+    list[Path]
+    """
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob(pattern) if p.is_file()))
+        else:
+            files.append(path)
+
+    return files
+
+def corpus_segments(files, segment_size=SEGMENT_SIZE):
+    """
+    Cut the corpus into (path, start, end) byte ranges.
+    """
+    for path in files:
+        size = os.path.getsize(path)
+        for start in range(0, max(size, 1), segment_size):
+            yield str(path), start, min(start + segment_size, size)
+
+def count_segment(segment, block_size=BLOCK_SIZE):
+    """
+    Count the kanji of one byte range of a UTF-8 file.
+
+    A character belongs to the segment its first byte falls in : leading
+    continuation bytes are skipped, a character started before `end` is
+    read to completion.
+
+    Returns
+    -------
+    tuple[Counter, int]
+        Kanji counts and number of characters read.
+    """
+    path, start, end = segment
+    decoder    = codecs.getincrementaldecoder('utf-8')('replace')
+    counts     = Counter()
+    characters = 0
+
+    def _count(text):
+        nonlocal characters
+        characters += len(text)
+        counts.update(''.join(KANJI_RUN.findall(text)))
+
+    with open(path, 'rb') as f:
+        f.seek(start)
+        position = start
+        head     = True
+
+        while position < end:
+            block = f.read(min(block_size, end - position))
+            if not block:
+                break
+            position += len(block)
+
+            if head:
+                # a character started in the previous segment belongs to it
+                skip = 0
+                while skip < len(block) and _is_continuation(block[skip]):
+                    skip += 1
+                block = block[skip:]
+                head  = False
+
+            # the incremental decoder keeps characters cut between blocks
+            _count(decoder.decode(block))
+
+        # complete the last character of the segment
+        tail = f.read(3)
+        size = 0
+        while size < len(tail) and _is_continuation(tail[size]):
+            size += 1
+        _count(decoder.decode(tail[:size], final=True))
+
+    return counts, characters
+
+def count_corpus_kanji(paths, workers=None, segment_size=SEGMENT_SIZE, pattern='*.txt'):
+    """
+    Count kanji occurrences over a corpus with a process pool.
+
+    Parameters
+    ----------
+    paths : iterable[str or Path]
+        Files and directories.
+    workers : int, optional
+        Number of worker processes, os.cpu_count() by default ; 1 counts
+        in the current process.
+    segment_size : int, optional
+        Bytes per task.
+
+    Returns
+    -------
+    dict
+        {'counts': Counter, 'characters': int, 'files': int, 'bytes': int}
+    """
+    files    = corpus_files(paths, pattern)
+    segments = corpus_segments(files, segment_size)
+
+    counts     = Counter()
+    characters = 0
+
+    if workers == 1:
+        for partial, read in map(count_segment, segments):
+            counts.update(partial)
+            characters += read
+    else:
+        import multiprocessing
+        with multiprocessing.Pool(workers) as pool:
+            # segments are generated lazily and counters merged as they arrive
+            for partial, read in pool.imap_unordered(count_segment, segments):
+                counts.update(partial)
+                characters += read
+
+    return {
+        'counts'     : counts,
+        'characters' : characters,
+        'files'      : len(files),
+        'bytes'      : sum(os.path.getsize(path) for path in files)
+    }
+
+#%%
+def frequency_table(counts, kanji_dict=None, metrics=None):
+    """
+    Join corpus counts with KANJIDIC2 and the complexity metrics.
+
+    Parameters
+    ----------
+    counts : Counter
+        count_corpus_kanji()['counts'].
+    kanji_dict : dict, optional
+        Parsed KANJIDIC2 dictionary.
+    metrics : dict[str, dict], optional
+        compute_all_kanji_metrics result.
+
+    Returns
+    -------
+    dict
+        Columns, most frequent kanji first :
+        {
+          'kanji'              : list[str],
+          'count'              : np.ndarray int64,
+          'share'              : np.ndarray, fraction of the kanji occurrences,
+          'cumulative'         : np.ndarray, coverage of the top i+1 kanji,
+          'jlpt', 'grade'      : np.ndarray int8 (0 when unknown),
+          'kanjidic_frequency' : np.ndarray int16 (0 when unranked),
+          'metrics'            : dict metric -> np.ndarray (nan when unknown)
+        }
+    """
+    kanji_dict = kanji_dict or {}
+    metrics    = metrics or {}
+
+    # ties broken by code point, for reproducible tables
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    kanji  = [char for char, _ in ranked]
+    count  = np.array([n for _, n in ranked], dtype=np.int64)
+    total  = count.sum()
+
+    share      = count / total if total else count.astype(float)
+    cumulative = np.cumsum(share)
+
+    jlpt      = np.zeros(len(kanji), dtype=np.int8)
+    grade     = np.zeros(len(kanji), dtype=np.int8)
+    frequency = np.zeros(len(kanji), dtype=np.int16)
+    for i, char in enumerate(kanji):
+        data = kanji_dict.get(char)
+        if data is not None:
+            jlpt[i]      = field_to_int(data.get('jlpt'), 0)
+            grade[i]     = field_to_int(data.get('grade'), 0)
+            frequency[i] = field_to_int(data.get('frequency'), 0)
+
+    names   = sorted({name for values in metrics.values() for name in values})
+    columns = {
+        name: np.array([metrics.get(char, {}).get(name, np.nan) for char in kanji], dtype=float)
+        for name in names
+    }
+
+    return {
+        'kanji'              : kanji,
+        'count'              : count,
+        'share'              : share,
+        'cumulative'         : cumulative,
+        'jlpt'               : jlpt,
+        'grade'              : grade,
+        'kanjidic_frequency' : frequency,
+        'metrics'            : columns
+    }
+
+def coverage_curve(table, points=COVERAGE_POINTS):
+    """
+    Coverage of the kanji occurrences by the top N kanji.
+
+    Returns
+    -------
+    list[tuple[int, float]]
+        (N, covered fraction), N capped at the number of distinct kanji.
+    """
+    cumulative = table['cumulative']
+    if not len(cumulative):
+        return []
+
+    return [(n, round(float(cumulative[min(n, len(cumulative)) - 1]), 4)) for n in points]
+
+def kanji_for_coverage(table, target):
+    """
+    Number of most frequent kanji needed to cover `target` (0-1) of the occurrences.
+
+    Capped at the number of distinct kanji (every kanji covers 100%).
+    """
+    cumulative = table['cumulative']
+
+    return min(int(np.searchsorted(cumulative, target - 1e-12) + 1), len(cumulative))
+
+def level_coverage(table, level='jlpt'):
+    """
+    Share of the kanji occurrences per JLPT level or school grade.
+
+    Returns
+    -------
+    dict[int, float]
+        Level -> covered fraction (0 : not in KANJIDIC2 / no level).
+    """
+    levels = table[level]
+    shares = np.bincount(levels.astype(np.int64), weights=table['share'])
+
+    return {int(value): round(float(shares[value]), 4) for value in np.flatnonzero(shares)}
+
+def main(argv=None):
+    """
+    Command line : python corpus_frequency.py PATH [PATH...] [--workers N] [--kanjidic PATH] [--no-metrics] [--top N]
+    """
+    import argparse
+    import time
+    from parse_unihan_cjkvi import load_kanji_resources
+    from metrics_store import cached_kanji_metrics, store_to_metrics
+
+    data_dir = Path(__file__).resolve().parent.parent / 'data'
+
+    parser = argparse.ArgumentParser(description='Kanji frequency and coverage over a text corpus')
+    parser.add_argument('paths',        nargs='+')
+    parser.add_argument('--workers',    default=None, type=int)
+    parser.add_argument('--pattern',    default='*.txt')
+    parser.add_argument('--unihan',     default=data_dir / 'Unihan_CJKVI_database.txt')
+    parser.add_argument('--kangxi',     default=data_dir / 'kangxi_radicals.json')
+    parser.add_argument('--kanjidic',   default=data_dir / 'kanjidic2.xml.gz', help='KANJIDIC2 XML (or .xml.gz), for the JLPT / grade join')
+    parser.add_argument('--no-metrics', action='store_true', help='skip the complexity metrics join')
+    parser.add_argument('--top',        default=20, type=int)
+    args = parser.parse_args(argv)
+
+    start  = time.perf_counter()
+    corpus = count_corpus_kanji(args.paths, args.workers, pattern=args.pattern)
+    print(f"{corpus['files']} files, {corpus['bytes'] / 1e6:.1f} MB, {corpus['characters']} characters, "
+          f"{sum(corpus['counts'].values())} kanji ({len(corpus['counts'])} distinct) "
+          f"in {time.perf_counter() - start:.1f} s")
+
+    resources  = load_kanji_resources(args.unihan, args.kangxi, args.kanjidic)
+    kanji_dict = resources['KANJI_DICT']
+
+    # metrics from the persistent store, computed once when the data changed
+    metrics = None
+    if not args.no_metrics:
+        metrics = store_to_metrics(cached_kanji_metrics(args.unihan, args.kangxi, resources=resources))
+
+    table = frequency_table(corpus['counts'], kanji_dict, metrics)
+
+    for n, covered in coverage_curve(table):
+        print(f"top {n:>5} kanji cover {covered:.2%}")
+    for target in (0.5, 0.9, 0.95, 0.99):
+        print(f"{target:.0%} coverage : {kanji_for_coverage(table, target)} kanji")
+    print('coverage per JLPT level :', level_coverage(table, 'jlpt'))
+    print('coverage per grade      :', level_coverage(table, 'grade'))
+
+    for i in range(min(args.top, len(table['kanji']))):
+        complexity = ' '.join(f"{name} {column[i]:g}" for name, column in table['metrics'].items())
+        print(table['kanji'][i], table['count'][i], f"{table['share'][i]:.3%}",
+              'jlpt', table['jlpt'][i], 'grade', table['grade'][i], complexity)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import numpy as np
+from parse_unihan_cjkvi import resolve_kanji_tree_enriched
+from positional_index import POSITION_CODES, POSITION_LABELS
+
+#%%
+"""
+Flat array-backed decomposition forest.
+
+Every node of resolve_kanji_tree_enriched is a Python dict with 'char',
+'position', 'is_leaf', 'is_radical' and 'children' keys. For the whole
+database this means hundreds of thousands of dicts and lists.
+
+The forest stores the same trees as flat NumPy arrays :
+
+    codepoint      uint32  ord(node['char'])
+    position       int8    POSITION_CODES[node['position']], -1 for None
+    flags          uint8   FLAG_LEAF | FLAG_RADICAL
+    parent         int32   parent node index, -1 for roots
+    child_offsets  int64   CSR offsets : the children of node i are
+    children       int32   children[child_offsets[i]:child_offsets[i + 1]]
+    tree_offsets   int64   nodes of character c are the nodes
+                           tree_offsets[c]:tree_offsets[c + 1],
+                           the first one being its root
+
+Each tree is laid out breadth-first, so parents always come before their
+children and the children of a node have consecutive indices.
+"""
+
+FLAG_LEAF    = 1
+FLAG_RADICAL = 2
+
+NO_POSITION  = -1
+
+def forest_from_trees(trees):
+    """
+    Convert dict trees into a flat forest.
+
+    Parameters
+    ----------
+    trees : iterable[tuple[str, dict]]
+        (character, tree) pairs, trees as returned by resolve_kanji_tree_enriched.
+
+    Returns
+    -------
+    dict
+        The forest arrays described in the module docstring, plus
+        'kanji' (list[str]) and 'kanji_ids' (dict[str, int]).
+    """
+    kanji         = []
+    codepoint     = []
+    position      = []
+    flags         = []
+    parent        = []
+    n_children    = []
+    tree_offsets  = [0]
+
+    for char, tree in trees:
+        kanji.append(char)
+        base = len(codepoint)
+
+        # breadth-first layout : children are appended after the whole level
+        queue = [(tree, -1)]
+        head  = 0
+        while head < len(queue):
+            node, parent_index = queue[head]
+            current            = base + head
+            head              += 1
+
+            codepoint.append(ord(node['char']))
+            position.append(POSITION_CODES.get(node.get('position'), NO_POSITION))
+            flags.append(
+                (FLAG_LEAF if node.get('is_leaf') else 0)
+                | (FLAG_RADICAL if node.get('is_radical') else 0)
+                )
+            parent.append(parent_index)
+            n_children.append(len(node['children']))
+            queue.extend((child, current) for child in node['children'])
+
+        tree_offsets.append(len(codepoint))
+
+    parent        = np.asarray(parent, dtype=np.int32)
+    child_offsets = np.zeros(len(n_children) + 1, dtype=np.int64)
+    np.cumsum(n_children, out=child_offsets[1:])
+
+    return {
+        'kanji'         : kanji,
+        'kanji_ids'     : {char: i for i, char in enumerate(kanji)},
+        'codepoint'     : np.asarray(codepoint, dtype=np.uint32),
+        'position'      : np.asarray(position, dtype=np.int8),
+        'flags'         : np.asarray(flags, dtype=np.uint8),
+        'parent'        : parent,
+        'child_offsets' : child_offsets,
+        # breadth-first layout : non-root nodes are already grouped by parent
+        'children'      : np.flatnonzero(parent >= 0).astype(np.int32),
+        'tree_offsets'  : np.asarray(tree_offsets, dtype=np.int64)
+    }
+
+def build_decomposition_forest(kanji_db, variant_index, kangxi_radicals, characters=None):
+    """
+    Resolve the enriched tree of every character straight into a flat forest.
+
+    Parameters
+    ----------
+    kanji_db : dict
+        Normalised kanji database (KANJI_DB).
+    variant_index : dict
+        Variant form -> canonical Kangxi radical (VARIANT_INDEX).
+    kangxi_radicals : dict
+        Indexed Kangxi radicals (KANGXI_RADICALS).
+    characters : iterable[str], optional
+        Characters to include, all of KANJI_DB by default.
+
+    Returns
+    -------
+    dict
+        Forest, see forest_from_trees.
+    """
+    if characters is None:
+        characters = kanji_db
+
+    # trees are consumed one at a time, never all held as dicts
+    trees = (
+        (char, resolve_kanji_tree_enriched(char, kanji_db, variant_index, kangxi_radicals))
+        for char in characters
+        )
+
+    return forest_from_trees(trees)
+
+def tree_from_forest(forest, char):
+    """
+    Rebuild the dict tree of a character from the forest.
+
+    The result is equal to the resolve_kanji_tree_enriched tree it was built from.
+    """
+    kanji_id = forest['kanji_ids'][char]
+
+    codepoint     = forest['codepoint']
+    position      = forest['position']
+    flags         = forest['flags']
+    child_offsets = forest['child_offsets']
+    children      = forest['children']
+
+    def _node(i):
+        code = int(position[i])
+        return {
+            'char'       : chr(codepoint[i]),
+            'position'   : None if code == NO_POSITION else POSITION_LABELS[code],
+            'is_leaf'    : bool(flags[i] & FLAG_LEAF),
+            'is_radical' : bool(flags[i] & FLAG_RADICAL),
+            'children'   : [_node(c) for c in children[child_offsets[i]:child_offsets[i + 1]]]
+        }
+
+    return _node(forest['tree_offsets'][kanji_id])
+
+def node_tree_ids(forest):
+    """
+    Character id of every node (which tree it belongs to).
+    """
+    return np.repeat(
+                    np.arange(len(forest['kanji']), dtype=np.int32),
+                    np.diff(forest['tree_offsets'])
+                    )
+
+def node_depths(forest):
+    """
+    Depth of every node (roots have depth 1), computed level by level.
+    """
+    parent = forest['parent']
+    depth  = np.ones(len(parent), dtype=np.int32)
+    inner  = np.flatnonzero(parent >= 0)
+
+    # parents precede their children : one vectorised step per tree level
+    while len(inner):
+        updated = depth[parent[inner]] + 1
+        changed = updated != depth[inner]
+        if not changed.any():
+            break
+        depth[inner] = updated
+
+    return depth
@@ -1,23 +1,40 @@
-import pandas as pd
+#%%
+def fetch_radical_ids(kanji_csv_path='../data/df_kanji.csv'):
+    """
+    Fetch the Kangxi id of the 214 radicals from Wikipedia and merge them
+    with the kanji dataframe.
 
-print("fetching data from Wiki Kanji page")
+    Hits the network : only run on demand, never at import.
 
-#fetch Kanji Kangxi dictionary id_number (colonnne "No.")
-df_radicals = pd.read_html('https://en.wikipedia.org/wiki/List_of_kanji_radicals_by_stroke_count')[0]
+    Returns
+    -------
+    list[dict]
+        'Radical (variants)' and 'index' records of the merged dataframe.
+    """
+    # pandas is only needed by this scraping step
+    import pandas as pd
 
-#in this df_radicals, Meaning & Reading are concatenated into the same column "Meaning and reading"
-#fetch other Kanji list, which lacks of need "No." column, but has tidy differentiated "meaning" & "reading" columns
-# -> dfs to be merged
-df_meaning_tidy = pd.read_html('https://en.wikipedia.org/wiki/List_of_kanji_radicals_by_frequency')[2]
+    print("fetching data from Wiki Kanji page")
 
-print('fetching df_kanji from XML doc')
-df_kanji = pd.DataFrame.from_dict('../data/df_kanji.csv', orient='index')
+    #fetch Kanji Kangxi dictionary id_number (colonnne "No.")
+    df_radicals = pd.read_html('https://en.wikipedia.org/wiki/List_of_kanji_radicals_by_stroke_count')[0]
 
-df_kanji['radicals'] = df_kanji['radicals'].astype(int)
+    #in this df_radicals, Meaning & Reading are concatenated into the same column "Meaning and reading"
+    #fetch other Kanji list, which lacks of need "No." column, but has tidy differentiated "meaning" & "reading" columns
+    # -> dfs to be merged
+    df_meaning_tidy = pd.read_html('https://en.wikipedia.org/wiki/List_of_kanji_radicals_by_frequency')[2]
 
-#merge kanji dictionary with radicals
-print("merging data with Kanji dataframe")
-df_merged = pd.merge(df_kanji.reset_index(), df_radicals, how='left', left_on='radicals', right_on='No.')
+    print('fetching df_kanji from XML doc')
+    df_kanji = pd.read_csv(kanji_csv_path)
 
-#dict of 214 radicals
-dict_radical = df_merged[['Radical (variants)', 'index']].to_dict(orient='records')
+    df_kanji['radicals'] = df_kanji['radicals'].astype(int)
+
+    #merge kanji dictionary with radicals
+    print("merging data with Kanji dataframe")
+    df_merged = pd.merge(df_kanji.reset_index(), df_radicals, how='left', left_on='radicals', right_on='No.')
+
+    #dict of 214 radicals
+    return df_merged[['Radical (variants)', 'index']].to_dict(orient='records')
+
+if __name__ == "__main__":
+    dict_radical = fetch_radical_ids()
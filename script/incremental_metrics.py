@@ -0,0 +1,154 @@
+from collections import deque
+from parse_unihan_cjkvi import (
+    parse_cjkvi_entry,
+    normalise_kanji_entry,
+    resolve_kanji_tree_enriched
+)
+from component_closure import direct_components
+from kanji_metrics import compute_all_kanji_metrics, kanji_complexity_metrics
+
+#%%
+"""
+Dependency-tracked incremental metric recomputation.
+
+Fixing one IDS line (say for 每) makes the metrics of every kanji that
+contains it, at any depth, stale. Instead of rerunning
+compute_all_kanji_metrics on ~88k kanji, a reverse dependency index
+(component -> characters listing it as a direct component) gives the
+ancestor set of the edited characters, and only those are re-resolved.
+
+The metric state is a plain dict :
+    {
+      'KANJI_DB'        : dict, edited in place,
+      'VARIANT_INDEX'   : dict,
+      'KANGXI_RADICALS' : dict,
+      'METRICS'         : dict kanji -> metrics, edited in place,
+      'PARENTS'         : dict component -> set of direct parents
+    }
+"""
+
+def build_parent_index(kanji_db):
+    """
+    Build the reverse dependency index : component -> direct parents.
+    """
+    parents = {}
+
+    for char, entry in kanji_db.items():
+        for component in direct_components(entry):
+            parents.setdefault(component, set()).add(char)
+
+    return parents
+
+def ancestors(parents, chars):
+    """
+    Return the given characters plus every character containing them at any depth.
+    """
+    seen  = set(chars)
+    queue = deque(chars)
+
+    while queue:
+        char = queue.popleft()
+        for parent in parents.get(char, ()):
+            if parent not in seen:
+                seen.add(parent)
+                queue.append(parent)
+
+    return seen
+
+def build_metric_state(kanji_db, variant_index, kangxi_radicals, metrics=None):
+    """
+    Bundle the resources, metrics and reverse dependency index.
+
+    Parameters
+    ----------
+    kanji_db, variant_index, kangxi_radicals : dict
+        Core resources from load_kanji_resources.
+    metrics : dict, optional
+        Existing compute_all_kanji_metrics result, computed if omitted.
+    """
+    if metrics is None:
+        metrics = compute_all_kanji_metrics(kanji_db, variant_index, kangxi_radicals)
+
+    return {
+        'KANJI_DB'        : kanji_db,
+        'VARIANT_INDEX'   : variant_index,
+        'KANGXI_RADICALS' : kangxi_radicals,
+        'METRICS'         : metrics,
+        'PARENTS'         : build_parent_index(kanji_db)
+    }
+
+def update_entries(state, changes):
+    """
+    Apply IDS changes and recompute only the affected metrics.
+
+    Parameters
+    ----------
+    state : dict
+        Metric state from build_metric_state, updated in place.
+    changes : dict[str, str or None]
+        Character -> new raw IDS string as written in Unihan_CJKVI
+        (annotations allowed), or None to remove the decomposition.
+
+    Returns
+    -------
+    dict
+        {
+          'affected' : set[str]   characters whose metrics were recomputed,
+          'changed'  : dict[str, tuple[dict, dict]]  kanji -> (old, new) metrics,
+                       only for kanji whose metrics actually differ,
+          'removed'  : list[str]  kanji which left KANJI_DB
+        }
+    """
+    kanji_db = state['KANJI_DB']
+    parents  = state['PARENTS']
+
+    # 1. ancestors in the old graph (before edges are rewritten)
+    affected = ancestors(parents, changes)
+
+    # 2. rewrite the edited entries and their reverse edges
+    for char, raw_ids in changes.items():
+        for component in direct_components(kanji_db.get(char)):
+            parents.get(component, set()).discard(char)
+
+        old_entry = kanji_db.get(char)
+        codepoint = old_entry['codepoint'] if old_entry else f'U+{ord(char):04X}'
+        raw_entry = parse_cjkvi_entry(codepoint, raw_ids) if raw_ids else None
+
+        if raw_entry is None:
+            kanji_db.pop(char, None)
+            continue
+
+        kanji_db[char] = normalise_kanji_entry(raw_entry)
+        for component in direct_components(kanji_db[char]):
+            parents.setdefault(component, set()).add(char)
+
+    # 3. new edges can only add ancestors through the edited characters,
+    #    which are already part of the set; recompute the affected kanji
+    metrics = state['METRICS']
+    changed = {}
+    removed = []
+    for char in affected:
+        old = metrics.get(char)
+
+        if char not in kanji_db:
+            if metrics.pop(char, None) is not None:
+                removed.append(char)
+            continue
+
+        tree = resolve_kanji_tree_enriched(
+                                        char,
+                                        kanji_db,
+                                        state['VARIANT_INDEX'],
+                                        state['KANGXI_RADICALS']
+                                        )
+        new = kanji_complexity_metrics(tree)
+        metrics[char] = new
+
+        if new != old:
+            changed[char] = (old, new)
+
+    return {
+        'affected' : affected,
+        'changed'  : changed,
+        'removed'  : removed
+    }
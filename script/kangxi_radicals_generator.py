@@ -1,7 +1,6 @@
 # Creating Kangxi radicals JSON and crosswalk, and providing a mapping function + tests.
 from pathlib import Path
 import json
-import pandas as pd
 #%%
 kangxi_radicals = [
   {
@@ -2462,12 +2461,23 @@ kangxi_radicals = [
 # Note: The original Kangxi radicals are 214; the above list includes canonical ones and many common variants.
 # Some entries (towards the end) may be represented with historical forms; for completeness we included common variants.
 
-# Save JSON files: kangxi_radicals.json and radical_crosswalk.json
-out_dir = Path("../data/")
-out_dir.mkdir(parents=True, exist_ok=True)
+#%%
+def write_kangxi_radicals(out_dir="../data/"):
+    """
+    Save the radical list as kangxi_radicals.json.
+
+    Only runs on demand : importing this module writes nothing.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    kangxi_path = out_dir / "kangxi_radicals.json"
+    with kangxi_path.open("w", encoding="utf-8") as f:
+        json.dump(kangxi_radicals, f, ensure_ascii=False, indent=2)
+
+    return kangxi_path
 
-kangxi_path = out_dir / "kangxi_radicals.json"
-with kangxi_path.open("w", encoding="utf-8") as f:
-    json.dump(kangxi_radicals, f, ensure_ascii=False, indent=2)
+if __name__ == "__main__":
+    write_kangxi_radicals()
     
     #%%
@@ -0,0 +1,268 @@
+import json
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+
+#%%
+"""
+Warm Unix-socket daemon and thin client for CLI lookups.
+
+Every CLI call used to pay the full load_kanji_resources parse and build.
+The daemon loads the kanji_service state once, keeps it resident and
+serves the kanji_service endpoints (HTTP/JSON) on a Unix domain socket.
+
+The client side of this module only imports a few standard library modules
+(subprocess is only needed to start the daemon) : a lookup is a connect,
+one request and one JSON decode, well under a millisecond ; a CLI call is
+then dominated by the interpreter startup. When no daemon is
+listening, the first lookup starts one in the background and waits for
+its socket (a few seconds, once).
+
+    python kanji_daemon.py kanji 海
+    python kanji_daemon.py tree 林
+    python kanji_daemon.py metrics 森
+    python kanji_daemon.py radical 75
+    python kanji_daemon.py search 木 口
+    python kanji_daemon.py stop
+
+    from kanji_daemon import lookup
+    lookup('/metrics/海')
+"""
+
+SOCKET_PATH     = Path(os.environ.get('TMPDIR', '/tmp')) / f'kanji_daemon_{os.getuid()}.sock'
+START_TIMEOUT   = 120         # seconds allowed for a cold daemon start
+REQUEST_TIMEOUT = 30
+
+class DaemonError(Exception):
+    """
+    Lookup answered with an HTTP error status.
+    """
+
+    def __init__(self, status, payload):
+        super().__init__(f"{status}: {payload.get('error', payload)}")
+        self.status  = status
+        self.payload = payload
+
+def _pid_path(socket_path):
+    return Path(str(socket_path) + '.pid')
+
+#%% client
+def _request(socket_path, method, target, body=b''):
+    """
+    Send one HTTP request over the socket, return (status, payload).
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(REQUEST_TIMEOUT)
+        client.connect(str(socket_path))
+        client.sendall(
+            f"{method} {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('utf-8')
+            + body
+        )
+
+        # Connection: close : the daemon closes once the response is sent
+        chunks = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+    head, _, payload = b''.join(chunks).partition(b'\r\n\r\n')
+
+    return int(head[9:12]), json.loads(payload)
+
+def start_daemon(socket_path=SOCKET_PATH, timeout=START_TIMEOUT):
+    """
+    Start a daemon in the background unless one is already listening.
+
+    A lock file serialises concurrent starts : only one daemon is spawned
+    when several clients arrive at the same time. The log of the last start
+    is kept next to the socket.
+
+    Raises
+    ------
+    RuntimeError
+        If the daemon exits before listening (bad data, import error...).
+    TimeoutError
+        If it does not listen within `timeout` seconds.
+    """
+    import fcntl
+    import subprocess
+
+    with open(str(socket_path) + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        if is_running(socket_path):
+            return
+
+        # truncated on every start : the log only covers the current daemon
+        log_path = str(socket_path) + '.log'
+        log      = open(log_path, 'wb')
+        process  = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), 'serve', '--socket', str(socket_path)],
+            stdin             = subprocess.DEVNULL,
+            stdout            = log,
+            stderr            = log,
+            cwd               = Path(__file__).resolve().parent,
+            start_new_session = True
+        )
+        log.close()
+
+        deadline = time.monotonic() + timeout
+        while not is_running(socket_path):
+            if process.poll() is not None:
+                raise RuntimeError(f"Kanji daemon exited with status {process.returncode}, see {log_path}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Kanji daemon did not start, see {log_path}")
+            time.sleep(0.05)
+
+def is_running(socket_path=SOCKET_PATH):
+    """
+    True if a daemon accepts connections on the socket.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(socket_path))
+            return True
+        except OSError:
+            # missing, stale or not ours (PermissionError) : no usable daemon
+            return False
+
+def lookup(target, socket_path=SOCKET_PATH, autostart=True, body=None):
+    """
+    Forward one request to the daemon, starting it on first use.
+
+    Parameters
+    ----------
+    target : str
+        kanji_service target, e.g. '/kanji/海' or '/search?components=木,口'.
+    body : dict, optional
+        JSON body, sent as POST (e.g. to '/batch').
+
+    Returns
+    -------
+    object
+        Decoded JSON payload.
+
+    Raises
+    ------
+    DaemonError
+        If the daemon answers with an error status.
+    RuntimeError, TimeoutError
+        If no daemon listens and a new one cannot be started.
+    """
+    method  = 'POST' if body is not None else 'GET'
+    encoded = json.dumps(body, ensure_ascii=False).encode('utf-8') if body is not None else b''
+
+    try:
+        status, payload = _request(socket_path, method, target, encoded)
+    except OSError:
+        # same test as is_running : missing, stale or foreign socket -> start one ;
+        # errors from a daemon that does listen are real request failures
+        if not autostart or is_running(socket_path):
+            raise
+        start_daemon(socket_path)
+        status, payload = _request(socket_path, method, target, encoded)
+
+    if status != 200:
+        raise DaemonError(status, payload)
+
+    return payload
+
+def stop_daemon(socket_path=SOCKET_PATH):
+    """
+    Stop the daemon listening on the socket, if any.
+    """
+    import signal
+
+    try:
+        pid = int(_pid_path(socket_path).read_text())
+    except (FileNotFoundError, ValueError):
+        return False
+
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return False
+
+    return True
+
+#%% daemon
+def serve_daemon(socket_path=SOCKET_PATH, unihan_path=None, kangxi_path=None, kanjidic_path=None):
+    """
+    Load the service state once and serve it on a Unix socket until SIGTERM.
+    """
+    import asyncio
+    import contextlib
+    import signal
+    from kanji_service import load_default_state, start_unix_service
+
+    socket_path = Path(socket_path)
+    if is_running(socket_path):
+        raise RuntimeError(f"A kanji daemon already listens on {socket_path}")
+
+    start = time.perf_counter()
+    state = load_default_state(unihan_path, kangxi_path, kanjidic_path)
+    print(f"state loaded in {time.perf_counter() - start:.1f} s, serving on {socket_path}", flush=True)
+
+    async def _serve():
+        # a stale socket file (daemon killed) would make the bind fail
+        with contextlib.suppress(FileNotFoundError):
+            socket_path.unlink()
+
+        server = await start_unix_service(state, str(socket_path))
+        _pid_path(socket_path).write_text(str(os.getpid()))
+
+        stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        async with server:
+            await stop.wait()
+
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for path in (socket_path, _pid_path(socket_path)):
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+
+def main(argv=None):
+    """
+    Command line : serve | stop | kanji C | tree C | metrics C | radical N | search C...
+    """
+    import argparse
+    from urllib.parse import quote
+
+    parser = argparse.ArgumentParser(description='Warm kanji lookup daemon and client')
+    parser.add_argument('--socket', default=SOCKET_PATH)
+    parser.add_argument('command', choices=['serve', 'stop', 'kanji', 'tree', 'metrics', 'radical', 'search'])
+    parser.add_argument('arguments', nargs='*')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        serve_daemon(args.socket)
+        return
+    if args.command == 'stop':
+        print('stopped' if stop_daemon(args.socket) else 'no daemon running')
+        return
+
+    if not args.arguments:
+        parser.error(f"{args.command} needs an argument")
+
+    if args.command == 'search':
+        target = f"/search?components={quote(','.join(args.arguments))}"
+    else:
+        target = f"/{args.command}/{quote(args.arguments[0])}"
+
+    try:
+        print(json.dumps(lookup(target, args.socket), ensure_ascii=False, indent=2))
+    except (DaemonError, RuntimeError, OSError) as error:
+        # HTTP error, daemon that could not start (see its log), unusable socket
+        print(error, file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import logging
 import xml.etree.ElementTree as ET
-import pandas as pd
 import json
 from typing import Optional, Dict, List, Any
 
@@ -15,11 +14,6 @@ def set_debug(enabled: bool):
     DEBUG_MODE = enabled
     logger.setLevel(logging.DEBUG if DEBUG_MODE else logging.INFO)
 
-#logging config
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-# Create a logger object
-logger = logging.getLogger(__name__)
 #%%
 """
 XML document is inconsistent & nodes are often missing
@@ -86,10 +80,21 @@ def find_nodes(parent : Optional[ET.Element], path: str) -> List[ET.Element]:
     if DEBUG_MODE: logger.debug(f"find_nodes: path='{path}' -> {len(nodes)} nodes")
     return nodes
 
+def field_to_int(value, default=None):
+    """Convert a parsed KANJIDIC2 text field ('12', None...) to int.
+    grade, jlpt, freq & stroke_count are stored as text and often missing
+
+    Output : int - default if the field is missing or not a number
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
 
 #%% Main Parser
 def kanji_XML_parser_dic2(xml_path) -> Dict[str, Any]:
-    logging.info(f"loading XML file : {xml_path}")
+    logger.info(f"loading XML file : {xml_path}")
     #read raw kanji XML document
     tree = ET.parse(xml_path)
     root = tree.getroot()
@@ -97,13 +102,13 @@ def kanji_XML_parser_dic2(xml_path) -> Dict[str, Any]:
     #create own dict
     kanji_dict = {}
     
-    logging.info("Starting parsing Loop : Kanji XML doc")
+    logger.info("Starting parsing Loop : Kanji XML doc")
     
     #iteration through kanji in character beacon
     for kanji in root.findall('character'):
         #get kanji symbol
         literal = kanji.find('literal').text
-        logging.info(f"Processing kanji: {literal}")
+        if DEBUG_MODE: logger.debug(f"Processing kanji: {literal}")
         
         #codepoints fetching
         #codepoints store list of Unicode values ie. Unicode hex | Japanese JIS | variants
@@ -127,22 +132,18 @@ def kanji_XML_parser_dic2(xml_path) -> Dict[str, Any]:
         for readings in kanji.findall('reading_meaning/rmgroup/reading'):
             if readings.attrib['r_type'] == 'ja_kun':
                 readings_kun.append(readings.text)
-                print('ja_kun',readings_kun)
                 
             elif readings.attrib['r_type'] == 'ja_on':
                 readings_on.append(readings.text)
-                # reading_kun[pronunciation] = pronunciation
-                print('ja_on', readings_on)
             
             elif readings.attrib['r_type'] == 'pinyin':
                 readings_ch.append(readings.text)
-                # reading_kun[pronunciation] = pronunciation
-                print('chinese pinyin', readings_ch)
 
             elif readings.attrib['r_type'] == 'korean':
                 readings_kr.append(readings.text)
-                # reading_kun[pronunciation] = pronunciation
-                print('chinese pinyin', readings_kr)
+
+        if DEBUG_MODE:
+            logger.debug(f"readings: on={readings_on}, kun={readings_kun}, pinyin={readings_ch}, korean={readings_kr}")
                 
         #fetching all meanings of kanji to append to list
         #create dictionary of meanings per languages
@@ -205,9 +206,9 @@ def kanji_XML_parser_dic2(xml_path) -> Dict[str, Any]:
                    # 'nanori': nanori,
                            }
         
-        logging.info(f"Parsing kanji: {literal} completed successfully.")
+        if DEBUG_MODE: logger.debug(f"Parsing kanji: {literal} completed successfully.")
 
-    logging.info("Parsing completed successfully.")
+    logger.info(f"Parsing completed successfully : {len(kanji_dict)} kanji.")
     return kanji_dict
             
 #%% filtering on Japanese kanji only
@@ -240,7 +241,7 @@ def filter_japanese_janji(kanji_dict: dict, jlpt_levels=None, require_readings=T
         
     return japanese_filtered
 #define function
-def get_key(meaning):
+def get_key(meaning, kanji_dict):
     for key, value in kanji_dict.items():
         if meaning in value['meanings']:
             print(f"""-----------------------------
@@ -249,65 +250,81 @@ def get_key(meaning):
             
         else : "kanji not found"
 
+#%%
+def export_kanji_csv(xml_path='../data/kanjidic2.xml', csv_path='../data/df_kanji.csv'):
+    """
+    Legacy flat parse of KANJIDIC2, exported as df_kanji.csv.
 
-#read raw kanji XML document
-tree = ET.parse('../data/kanjidic2.xml')
-root = tree.getroot()
+    Only runs on demand : importing this module parses nothing.
+    """
+    #read raw kanji XML document
+    tree = ET.parse(xml_path)
+    root = tree.getroot()
 
-#create own dict
-kanji_dict = {}
+    #create own dict
+    kanji_dict = {}
 
-radical_number = []
+    radical_number = []
 
-print("parsing Kanji XML doc")
-#iteration through kanji in character beacon
-for kanji in root.findall('character'):
-    #get kanji symbol
-    symbol = kanji.find('literal').text
-    print('kanji', symbol)
+    print("parsing Kanji XML doc")
+    #iteration through kanji in character beacon
+    for kanji in root.findall('character'):
+        #get kanji symbol
+        symbol = kanji.find('literal').text
+        print('kanji', symbol)
     
-    #not all kanji have JLPT level defined
-    jlpt_level   = kanji.find('misc/jlpt').text if kanji.tag == 'misc/jlpt' else None
-    stroke_count = kanji.find('misc/stroke_count').text
-    #fetching radical value from classical kanji numerotation
-    radical      = kanji.find('radical/rad_value').text
+        #not all kanji have JLPT level defined
+        jlpt_level   = kanji.find('misc/jlpt').text if kanji.tag == 'misc/jlpt' else None
+        stroke_count = kanji.find('misc/stroke_count').text
+        #fetching radical value from classical kanji numerotation
+        radical      = kanji.find('radical/rad_value').text
     
-    radical_number.append(kanji.find('radical/rad_value').text)
+        radical_number.append(kanji.find('radical/rad_value').text)
 
-    #instantiate variables
-    meanings = []
-    reading_kun = []
-    reading_on = []
+        #instantiate variables
+        meanings = []
+        reading_kun = []
+        reading_on = []
     
-    #fetching all meanings of kanji to append to list
-    for meaning in kanji.findall('reading_meaning/rmgroup/meaning'):
-        meanings.append(meaning.text)
+        #fetching all meanings of kanji to append to list
+        for meaning in kanji.findall('reading_meaning/rmgroup/meaning'):
+            meanings.append(meaning.text)
         
-    #fetching all pronunciations - split in kun-yomi & on-yomi - to append to relevant list        
-    for pronunciation in kanji.findall('reading_meaning/rmgroup/reading'):
-        if pronunciation.attrib['r_type'] == 'ja_kun':
-            print('ja_on',pronunciation.text)
-            reading_kun.append(pronunciation.text)
-        elif pronunciation.attrib['r_type'] == 'ja_on':
-            reading_on.append(pronunciation.text)
-            # reading_kun[pronunciation] = pronunciation
-            print(reading_kun)
+        #fetching all pronunciations - split in kun-yomi & on-yomi - to append to relevant list        
+        for pronunciation in kanji.findall('reading_meaning/rmgroup/reading'):
+            if pronunciation.attrib['r_type'] == 'ja_kun':
+                print('ja_on',pronunciation.text)
+                reading_kun.append(pronunciation.text)
+            elif pronunciation.attrib['r_type'] == 'ja_on':
+                reading_on.append(pronunciation.text)
+                # reading_kun[pronunciation] = pronunciation
+                print(reading_kun)
         
-        #Add entry to kanji_dict
-        kanji_dict[symbol] = {'meanings'     : meanings,
-                             'jlpt_level'   : jlpt_level,
-                             'stroke_count' : stroke_count,
-                             'radicals' 	: radical,
-                             'reading_kun' : reading_kun,
-                              'reading_on'   : reading_on
-                             }
+            #Add entry to kanji_dict
+            kanji_dict[symbol] = {'meanings'     : meanings,
+                                 'jlpt_level'   : jlpt_level,
+                                 'stroke_count' : stroke_count,
+                                 'radicals' 	: radical,
+                                 'reading_kun' : reading_kun,
+                                  'reading_on'   : reading_on
+                                 }
         
-print("parsing XML doc done !")
+    print("parsing XML doc done !")
 
-print("exporting copy in csv")
-df_kanji = pd.DataFrame.from_dict(kanji_dict, orient='index')
-df_kanji.to_csv("../data/df_kanji.csv", index=False)
+    print("exporting copy in csv")
+    # pandas is only needed for the csv export
+    import pandas as pd
+    df_kanji = pd.DataFrame.from_dict(kanji_dict, orient='index')
+    df_kanji.to_csv(csv_path, index=False)
+
+    return kanji_dict
 
 #%%
-print('input needed kanji')
-print(get_key('great'))
+if __name__ == "__main__":
+    #logging config
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    kanji_dict = export_kanji_csv()
+
+    print('input needed kanji')
+    print(get_key('great', kanji_dict))
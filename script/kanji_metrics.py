@@ -1,5 +1,6 @@
+from collections import Counter
 from pathlib import Path
-import numpy as np
+import time
 import logging
 from parse_unihan_cjkvi import (
     parse_unihan_cjkvi,
@@ -10,6 +11,12 @@ from parse_unihan_cjkvi import (
     resolve_kanji_tree_enriched,
     load_kanji_resources
 )
+from component_closure import component_topological_order, direct_components
+# NumPy, multiprocessing and the forest helpers are imported inside the
+# functions using them : importing this module stays cheap (startup_benchmark)
+
+# bump whenever a metric definition changes : invalidates stored metrics
+METRICS_VERSION = 1
 
 def tree_depth(node):
     """
@@ -150,6 +157,53 @@ def branching_factor(node):
     # Return 0 if the tree has no branching nodes
     return sum(nodes) / len(nodes) if nodes else 0
 
+#%% fused metric evaluation
+# extra metrics evaluated in the same traversal as the built-in ones
+# name -> (visit, finalise)
+METRIC_VISITORS = {}
+
+def register_metric(name, visit, finalise=None):
+    """
+    Register an extra metric computed by kanji_complexity_metrics.
+
+    The metric is evaluated in the same single traversal as the built-in
+    metrics, in post-order : every node sees the results of its children,
+    so subtree aggregates (heights, weighted sizes...) can be expressed.
+
+    Registered metrics are part of the dict-tree path only :
+    kanji_complexity_metrics, and compute_all_kanji_metrics, which walks the
+    trees as soon as a metric is registered. component_dag_metrics and
+    forest_complexity_metrics compute the built-in metrics only. The metrics
+    store fingerprint includes the registered names.
+
+    Parameters
+    ----------
+    name : str
+        Key of the metric in the kanji_complexity_metrics output.
+    visit : callable
+        visit(node, child_values, depth) -> value of the node, called once
+        per node after its children ; child_values lists their values in
+        child order (empty for a leaf) and the depth of the root is 1.
+    finalise : callable, optional
+        finalise(root value) -> metric value. Defaults to the root value.
+
+    Example
+    -------
+    register_metric('leaf_radicals',
+                    visit = lambda node, values, depth: sum(values) + bool(not node['children'] and node.get('is_radical')))
+    """
+    builtin = ('depth', 'size', 'leaf_count', 'radical_count', 'branching')
+    if name in builtin:
+        raise ValueError(f"Metric name already used by a built-in metric: {name}")
+
+    METRIC_VISITORS[name] = (visit, finalise or (lambda value: value))
+
+def unregister_metric(name):
+    """
+    Remove a metric added with register_metric.
+    """
+    METRIC_VISITORS.pop(name, None)
+
 def kanji_complexity_metrics(tree):
     """
     Centralise function which aggregates all previous function.
@@ -158,7 +212,13 @@ def kanji_complexity_metrics(tree):
     Compute structural complexity metrics for a kanji decomposition tree.
 
     The metrics include depth, total size, number of leaves,
-    number of distinct radicals, and average branching factor.
+    number of distinct radicals, and average branching factor,
+    plus any metric added with register_metric.
+
+    All metrics are computed in a single post-order traversal with an
+    explicit stack, instead of one recursive walk per metric. The result is
+    identical to combining tree_depth, tree_size, leaf_count, radical_set
+    and branching_factor.
 
     Parameters
     ----------
@@ -170,17 +230,268 @@ def kanji_complexity_metrics(tree):
     dict
         Dictionary containing the computed complexity metrics.
     """
-
-    # collect all distinct radicals in the tree
-    radicals = radical_set(tree)
+    depth          = 0
+    size           = 0
+    leaves         = 0
+    internal       = 0
+    children_total = 0
+    radicals       = set()
+
+    # registered extra metrics : one value per node, children before parents
+    visitors = [visit for visit, _ in METRIC_VISITORS.values()]
+    values   = []
+
+    # (node, level, exiting) : a node is pushed again below its children
+    # and evaluated for the visitors once they are done
+    stack = [(tree, 1, False)]
+    while stack:
+        node, level, exiting = stack.pop()
+        children             = node['children']
+
+        if exiting:
+            # the children values are the last len(children) ones, in child order
+            start  = len(values) - len(children)
+            nested = values[start:]
+            del values[start:]
+            values.append(tuple(
+                visit(node, [child[i] for child in nested], level)
+                for i, visit in enumerate(visitors)
+                ))
+            continue
+
+        if visitors:
+            stack.append((node, level, True))
+
+        size += 1
+        if level > depth:
+            depth = level
+
+        # radicals are identified using the 'is_radical' flag on each node
+        if node.get('is_radical'):
+            radicals.add(node['char'])
+
+        if children:
+            internal       += 1
+            children_total += len(children)
+            # reversed : children are popped, and their values stored, in order
+            for child in reversed(children):
+                stack.append((child, level + 1, False))
+        else:
+            leaves += 1
 
     # aggregate all structural metrics into a single dictionary
-    return {
-        'depth'         : tree_depth(tree),
-        'size'          : tree_size(tree),
-        'leaf_count'    : leaf_count(tree),
+    metrics = {
+        'depth'         : depth,
+        'size'          : size,
+        'leaf_count'    : leaves,
         'radical_count' : len(radicals),
-        'branching'     : round(branching_factor(tree), 2)
+        'branching'     : round(children_total / internal, 2) if internal else 0
+    }
+
+    for i, (name, (_, finalise)) in enumerate(METRIC_VISITORS.items()):
+        metrics[name] = finalise(values[-1][i])
+
+    return metrics
+
+#%% dynamic programming over the component DAG
+# metrics of a truncated node (component already visited) :
+# (depth, size, leaves, internal nodes, children total, radicals)
+_TRUNCATED_METRICS = (1, 1, 1, 0, 0, 0)
+
+def component_dag_metrics(kanji_db, variant_index, kangxi_radicals):
+    """
+    Compute complexity metrics for all kanji in one bottom-up pass.
+
+    Gives exactly the compute_all_kanji_metrics tree-walk values, without
+    resolving one tree per kanji. The trees of resolve_kanji_tree_enriched
+    share one visited set : every character reachable from a kanji is
+    expanded once, at its first occurrence in depth-first order, and any
+    later occurrence (second 木 of 林, a component already met under an
+    earlier sibling, a cycle) is a non-radical leaf.
+
+    Characters are processed in topological order (components first) and
+    memoised as (metrics of their own tree, bitset of the characters it
+    expands). A component whose bitset is disjoint from what is already
+    visited expands exactly as in its own tree, so its memoised metrics are
+    reused and its bitset ORed in ; otherwise (about one character in ten)
+    it is walked again with the current visited set. Only characters used as
+    components get a bit, the most used first, so bitsets stay short.
+
+    Parameters
+    ----------
+    kanji_db : dict
+        Normalised kanji database (KANJI_DB).
+    variant_index : dict
+        Variant form -> canonical Kangxi radical (VARIANT_INDEX).
+    kangxi_radicals : dict
+        Indexed Kangxi radicals (KANGXI_RADICALS).
+
+    Returns
+    -------
+    dict[str, dict]
+        Same format and key order as compute_all_kanji_metrics, built-in
+        metrics only (see register_metric).
+    """
+    order      = component_topological_order(kanji_db)
+    components = {char: direct_components(kanji_db.get(char)) for char in order}
+    usage      = Counter(child for children in components.values() for child in set(children))
+    bits       = {char: 1 << i for i, (char, _) in enumerate(usage.most_common())}
+    radicals   = {form for form, radical in variant_index.items() if radical in kangxi_radicals}
+
+    # char -> (depth, size, leaves, internal nodes, children total, radicals), expanded bits
+    memo = {}
+
+    def walk(char, visited):
+        # metrics of the subtree of `char` under `visited`, and the new visited set
+        bit = bits.get(char, 0)
+        if visited & bit:
+            return _TRUNCATED_METRICS, visited
+
+        cached = memo.get(char)
+        if cached is not None and not cached[1] & visited:
+            return cached[0], visited | cached[1]
+
+        visited  |= bit
+        children  = components.get(char, ())
+        radical   = int(char in radicals)
+        if not children:
+            return (1, 1, 1, 0, 0, radical), visited
+
+        totals = [0, 1, 0, 1, len(children), radical]
+        for child in children:
+            child_metrics, visited = walk(child, visited)
+            totals[0] = max(totals[0], child_metrics[0])
+            for i in range(1, 6):
+                totals[i] += child_metrics[i]
+        totals[0] += 1
+
+        return tuple(totals), visited
+
+    for char in order:
+        children = components[char]
+        radical  = int(char in radicals)
+        expanded = bits.get(char, 0)
+
+        if not children:
+            memo[char] = ((1, 1, 1, 0, 0, radical), expanded)
+            continue
+
+        # fast path : components expanding disjoint sets reuse their memo
+        depth, size, leaves, internal, total, radical_count = 0, 1, 0, 1, len(children), radical
+        for child in children:
+            cached = memo.get(child)
+            if cached is None or cached[1] & expanded:
+                memo[char] = walk(char, 0)
+                break
+
+            (c_depth, c_size, c_leaves, c_internal, c_total, c_radicals), c_expanded = cached
+            if c_depth > depth:
+                depth = c_depth
+            size          += c_size
+            leaves        += c_leaves
+            internal      += c_internal
+            total         += c_total
+            radical_count += c_radicals
+            expanded      |= c_expanded
+        else:
+            memo[char] = ((depth + 1, size, leaves, internal, total, radical_count), expanded)
+
+    metrics = {}
+    for kanji in kanji_db:
+        depth, size, leaves, internal, total, radical_count = memo[kanji][0]
+        metrics[kanji] = {
+            'depth'         : depth,
+            'size'          : size,
+            'leaf_count'    : leaves,
+            'radical_count' : radical_count,
+            'branching'     : round(total / internal, 2) if internal else 0
+        }
+
+    return metrics
+
+#%% vectorised counterparts over a flat decomposition forest
+def forest_tree_size(forest):
+    """
+    Vectorised tree_size : number of nodes of every tree in the forest.
+
+    Parameters
+    ----------
+    forest : dict
+        Flat forest as returned by build_decomposition_forest.
+
+    Returns
+    -------
+    np.ndarray
+        Tree size per character, in forest['kanji'] order.
+    """
+    import numpy as np
+    # trees are contiguous node ranges
+    return np.diff(forest['tree_offsets'])
+
+def forest_leaf_count(forest):
+    """
+    Vectorised leaf_count : number of childless nodes of every tree.
+    """
+    import numpy as np
+    # a node is a leaf when its child range is empty
+    is_leaf = np.diff(forest['child_offsets']) == 0
+
+    return np.add.reduceat(is_leaf.astype(np.int64), forest['tree_offsets'][:-1])
+
+def forest_tree_depth(forest):
+    """
+    Vectorised tree_depth : maximum node depth of every tree.
+    """
+    import numpy as np
+    from decomposition_forest import node_depths
+    return np.maximum.reduceat(node_depths(forest), forest['tree_offsets'][:-1])
+
+def forest_radical_count(forest):
+    """
+    Vectorised len(radical_set(tree)) : distinct radical characters per tree.
+    """
+    import numpy as np
+    from decomposition_forest import FLAG_RADICAL, node_tree_ids
+    is_radical = (forest['flags'] & FLAG_RADICAL).astype(bool)
+    tree_ids   = node_tree_ids(forest)[is_radical].astype(np.int64)
+    codepoints = forest['codepoint'][is_radical].astype(np.int64)
+
+    # distinct (tree, codepoint) pairs, then count them per tree
+    pairs = np.unique(tree_ids << 21 | codepoints)
+
+    return np.bincount(pairs >> 21, minlength=len(forest['kanji']))
+
+def forest_branching_factor(forest):
+    """
+    Vectorised branching_factor : average number of children of non-leaf nodes.
+    """
+    import numpy as np
+    size   = forest_tree_size(forest)
+    leaves = forest_leaf_count(forest)
+
+    # every node but the root is the child of an internal node
+    internal = size - leaves
+    children = size - 1
+
+    return np.divide(children, internal, out=np.zeros(len(size)), where=internal > 0)
+
+def forest_complexity_metrics(forest):
+    """
+    Vectorised kanji_complexity_metrics for every tree of the forest.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        One array per built-in metric (metrics added with register_metric
+        are not computed here).
+    """
+    import numpy as np
+    return {
+        'depth'         : forest_tree_depth(forest),
+        'size'          : forest_tree_size(forest),
+        'leaf_count'    : forest_leaf_count(forest),
+        'radical_count' : forest_radical_count(forest),
+        'branching'     : np.round(forest_branching_factor(forest), 2)
     }
 
 #%%test
@@ -227,14 +538,45 @@ def print_kanji_tree(node, prefix='', is_last=True):
                     )
 
 #%%
-def compute_all_kanji_metrics(kanji_db, variant_index, kangxi_radicals):
+def compute_all_kanji_metrics(kanji_db, variant_index, kangxi_radicals, workers=1, chunk_size=2000):
     """
     Compute complexity metrics for all kanji in the database
+
+    Serially, the metrics come from component_dag_metrics : one bottom-up
+    pass over the component DAG, equal to measuring every tree. Trees are
+    resolved and walked one per kanji only when metrics were added with
+    register_metric, or when workers > 1.
+
+    Parameters
+    ----------
+    kanji_db, variant_index, kangxi_radicals : dict
+        Core resources from load_kanji_resources.
+    workers : int, optional
+        Number of worker processes. 1 (default) runs serially.
+    chunk_size : int, optional
+        Number of kanji per task sent to a worker.
+    """
+    if workers is None or workers > 1:
+        return compute_all_kanji_metrics_parallel(
+                                                kanji_db,
+                                                variant_index,
+                                                kangxi_radicals,
+                                                workers    = workers,
+                                                chunk_size = chunk_size
+                                                )
+
+    if not METRIC_VISITORS:
+        return component_dag_metrics(kanji_db, variant_index, kangxi_radicals)
+
+    return _metrics_for_kanji(kanji_db, kanji_db, variant_index, kangxi_radicals)
+
+def _metrics_for_kanji(kanji_list, kanji_db, variant_index, kangxi_radicals):
+    """
+    Serial metric loop over a list of kanji.
     """
-    
     metrics = {}
     
-    for kanji in kanji_db:
+    for kanji in kanji_list:
         try:
             #build the enriched decomposition tree
             tree = resolve_kanji_tree_enriched(
@@ -250,7 +592,130 @@ def compute_all_kanji_metrics(kanji_db, variant_index, kangxi_radicals):
             #safety net: skip problematic kanji
             print(f'[Warning] Falied to compute metrics for {kanji} : {e}')
 
-    return metrics            
+    return metrics
+
+#%% process pool execution
+# read-only resources seen by pool workers
+# filled in the parent right before forking, so workers inherit them
+# copy-on-write instead of receiving a pickled copy with every task
+_WORKER_RESOURCES = {}
+
+def _init_metrics_worker(resources):
+    """
+    Pool initializer for platforms without fork : resources are sent once per worker.
+    """
+    _WORKER_RESOURCES.update(resources)
+
+def _metrics_worker(chunk):
+    """
+    Pool task : compute the metrics of one chunk of kanji.
+    """
+    return _metrics_for_kanji(
+                            chunk,
+                            _WORKER_RESOURCES['KANJI_DB'],
+                            _WORKER_RESOURCES['VARIANT_INDEX'],
+                            _WORKER_RESOURCES['KANGXI_RADICALS']
+                            )
+
+def compute_all_kanji_metrics_parallel(kanji_db, variant_index, kangxi_radicals, workers=None, chunk_size=2000):
+    """
+    Compute complexity metrics for all kanji, sharded across a process pool.
+
+    Workers inherit KANJI_DB, VARIANT_INDEX and KANGXI_RADICALS through fork
+    (or receive them once through the pool initializer where fork is not
+    available); tasks only carry the list of kanji of their chunk.
+
+    Chunks are consumed in submission order, so the result is deterministic
+    and identical to the serial compute_all_kanji_metrics, key order included.
+
+    Parameters
+    ----------
+    kanji_db, variant_index, kangxi_radicals : dict
+        Core resources from load_kanji_resources.
+    workers : int, optional
+        Number of worker processes, os.cpu_count() by default.
+    chunk_size : int, optional
+        Number of kanji per task.
+
+    Returns
+    -------
+    dict[str, dict]
+        Same format as compute_all_kanji_metrics.
+    """
+    import multiprocessing
+    kanji  = list(kanji_db)
+    chunks = [kanji[i:i + chunk_size] for i in range(0, len(kanji), chunk_size)]
+
+    resources = {
+        'KANJI_DB'        : kanji_db,
+        'VARIANT_INDEX'   : variant_index,
+        'KANGXI_RADICALS' : kangxi_radicals
+    }
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context  = multiprocessing.get_context('fork')
+        _WORKER_RESOURCES.update(resources)
+        initargs = None
+    else:
+        context  = multiprocessing.get_context('spawn')
+        initargs = (resources,)
+
+    metrics = {}
+    try:
+        with context.Pool(
+                        processes   = workers,
+                        initializer = _init_metrics_worker if initargs else None,
+                        initargs    = initargs or ()
+                        ) as pool:
+            # imap keeps chunk order : merged result matches the serial run
+            for part in pool.imap(_metrics_worker, chunks):
+                metrics.update(part)
+    finally:
+        _WORKER_RESOURCES.clear()
+
+    return metrics
+
+def benchmark_parallel_metrics(kanji_db, variant_index, kangxi_radicals, worker_counts=(1, 2, 4, 8), chunk_size=2000):
+    """
+    Time compute_all_kanji_metrics for several worker counts.
+
+    Every parallel result is checked against the serial one.
+
+    Returns
+    -------
+    list[dict]
+        One {'workers', 'seconds', 'speedup'} entry per worker count.
+    """
+    start     = time.perf_counter()
+    reference = compute_all_kanji_metrics(kanji_db, variant_index, kangxi_radicals)
+    serial    = time.perf_counter() - start
+
+    results = []
+    for workers in worker_counts:
+        if workers == 1:
+            seconds = serial
+        else:
+            start   = time.perf_counter()
+            metrics = compute_all_kanji_metrics(
+                                            kanji_db,
+                                            variant_index,
+                                            kangxi_radicals,
+                                            workers    = workers,
+                                            chunk_size = chunk_size
+                                            )
+            seconds = time.perf_counter() - start
+
+            if metrics != reference or list(metrics) != list(reference):
+                raise RuntimeError(f"Parallel metrics with {workers} workers differ from the serial run")
+
+        results.append({
+            'workers' : workers,
+            'seconds' : round(seconds, 3),
+            'speedup' : round(serial / seconds, 2)
+        })
+
+    return results
+
 def metric_distribution(metrics, key):
     """
     Extract a list of values for a given metric key
@@ -258,15 +723,12 @@ def metric_distribution(metrics, key):
     # extract all values corresponding to a given metric key
     return [v[key] for v in metrics.values() if key in v]
 
-depths = metric_distribution(KANJI_METRICS, "depth")
-sizes  = metric_distribution(KANJI_METRICS, "size")
-#print min, max, outliers
-print("Depth:", min(depths), max(depths))
-print("Size:", min(sizes), max(sizes))
+
 def percentile_normalise(values):
     """
     Convert a list of values into normalised  percentile ranks [0,1]
     """
+    import numpy as np
     # sort values once for percentile computation
     sorted_vals = np.sort(values)
     
@@ -276,33 +738,139 @@ def percentile_normalise(values):
     
     return score
 
-def normalise_metrics(metrics):
+def metrics_to_columns(metrics):
     """
-    Normalise all metrics using percentile ranks
+    Turn the {kanji: {metric: value}} dict into one NumPy array per metric.
+
+    Returns
+    -------
+    tuple[list[str], dict[str, np.ndarray]]
+        Kanji in dict order, and metric name -> values aligned with them.
     """
-    # retrieve the list of metric keys from the first entry
-    keys = metrics[next(iter(metrics))].keys()
-    
-    # build global distributions for each metric
-    distributions = {
-        key : metric_distribution(metrics, key)
+    import numpy as np
+    kanji = list(metrics)
+    keys  = list(metrics[kanji[0]]) if kanji else []
+
+    columns = {
+        key : np.fromiter((metrics[k][key] for k in kanji), dtype=np.float64, count=len(kanji))
         for key in keys
         }
-    # create a normalisation function for each metric
-    normalisers = {
-        key : percentile_normalise(distributions[key])
-        for key in keys
+
+    return kanji, columns
+
+def percentile_ranks(values, group_codes=None):
+    """
+    Vectorised percentile_normalise : rank every value at once.
+
+    The percentile of a value is the share of values lower or equal to it,
+    exactly like percentile_normalise, but computed with one sort and one
+    searchsorted call per distribution instead of one call per kanji.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Metric values.
+    group_codes : np.ndarray[int], optional
+        Group of each value (e.g. JLPT level). Percentiles are then computed
+        within each group; values with a negative code get NaN.
+
+    Returns
+    -------
+    np.ndarray[float64]
+        Percentile ranks in [0, 1].
+    """
+    import numpy as np
+    if group_codes is None:
+        sorted_vals = np.sort(values)
+        return np.searchsorted(sorted_vals, values, side='right') / len(sorted_vals)
+
+    ranks = np.full(len(values), np.nan)
+    for code in np.unique(group_codes[group_codes >= 0]):
+        members        = np.flatnonzero(group_codes == code)
+        sorted_vals    = np.sort(values[members])
+        ranks[members] = np.searchsorted(sorted_vals, values[members], side='right') / len(members)
+
+    return ranks
+
+def normalise_metrics_array(metrics, groups=None, decimals=3):
+    """
+    Vectorised percentile normalisation of all metrics.
+
+    Parameters
+    ----------
+    metrics : dict[str, dict]
+        Output of compute_all_kanji_metrics.
+    groups : dict[str, object], optional
+        Kanji -> group label (JLPT level, grade...). When given, percentiles
+        are computed within each group; kanji without a label get NaN.
+        See kanjidic_groups.
+    decimals : int, optional
+        Rounding applied to the percentiles, 3 like normalise_metrics.
+
+    Returns
+    -------
+    np.ndarray
+        Structured array with a 'kanji' field and one float field per metric
+        (pandas.DataFrame(result) gives the table form).
+    """
+    import numpy as np
+    kanji, columns = metrics_to_columns(metrics)
+
+    group_codes = None
+    if groups is not None:
+        labels      = {}
+        group_codes = np.fromiter(
+                    (
+                        labels.setdefault(groups[k], len(labels)) if groups.get(k) is not None else -1
+                        for k in kanji
+                    ),
+                    dtype=np.int64,
+                    count=len(kanji)
+                    )
+
+    width  = max((len(k) for k in kanji), default=1)
+    dtype  = [('kanji', f'U{width}')] + [(key, np.float64) for key in columns]
+    result = np.empty(len(kanji), dtype=dtype)
+
+    result['kanji'] = kanji
+    for key, values in columns.items():
+        result[key] = np.round(percentile_ranks(values, group_codes), decimals)
+
+    return result
+
+def kanjidic_groups(kanji_dict, field='jlpt'):
+    """
+    Build a kanji -> group label mapping from a parsed KANJIDIC2 field.
+
+    Parameters
+    ----------
+    kanji_dict : dict
+        Output of kanji_XML_parser_dic2.
+    field : str, optional
+        'jlpt' or 'grade' (any top-level KANJIDIC2 field works).
+    """
+    return {
+        kanji : data[field]
+        for kanji, data in kanji_dict.items()
+        if data.get(field) is not None
         }
-    
+
+def normalise_metrics(metrics):
+    """
+    Normalise all metrics using percentile ranks
+
+    Dict front-end of normalise_metrics_array, same output as before.
+    """
+    table = normalise_metrics_array(metrics)
+    keys  = [name for name in table.dtype.names if name != 'kanji']
+
+    # one tolist() per column instead of one NumPy scalar per value
+    columns = {key: table[key].tolist() for key in keys}
+
     normalised = {}
-    
-    # normalise each kanji's metrics
-    for kanji, data in metrics.items():
-        normalised[kanji] = {
-            key : round(normalisers[key](value), 3)
-            for key, value in data.items()
-            }
-        
+    for i, kanji in enumerate(table['kanji'].tolist()):
+        normalised[kanji] = {key: columns[key][i] for key in keys}
+
     return normalised
 
 #%%
@@ -325,7 +893,7 @@ def main():
     """
 
     logging.basicConfig(
-        level  = logging.DEBBUG,
+        level  = logging.DEBUG,
         format = '%(asctime)s | %(levelname)s | %(name)s | %(message)s' 
     )
 
@@ -341,7 +909,7 @@ def main():
 
 
     logger.info('Resources loaded')
-    logger.info(f'Total kanji {len(resources['KANJI_DB'])}')
+    logger.info(f'Total kanji {len(resources["KANJI_DB"])}')
 
     logger.info('Computing complexity metrics for all kanji')
 
@@ -353,6 +921,12 @@ def main():
 
     logger.info(f'Metrics computed for {len(metrics)} kanji')
 
+    # min, max of the main distributions
+    depths = metric_distribution(metrics, "depth")
+    sizes  = metric_distribution(metrics, "size")
+    logger.info(f'Depth: {min(depths)} {max(depths)}')
+    logger.info(f'Size: {min(sizes)} {max(sizes)}')
+
     sample = "海"
     
     logger.info(f'Inspecting sample kanji: {sample}')
@@ -365,5 +939,5 @@ def main():
     VARIANT_INDEX   = resources["VARIANT_INDEX"]
 
 
-if __name__ == 'main':
+if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,447 @@
+import asyncio
+import functools
+import json
+import logging
+import time
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+from parse_unihan_cjkvi import load_kanji_resources, resolve_kanji_tree_enriched
+
+#%%
+"""
+Local kanji lookup service : asyncio HTTP/JSON, standard library only.
+
+The KANJIDIC2 dictionary, KANJI_DB, the full-depth radical index, the
+metrics and the multi-radical search index are loaded once at startup,
+then every request is answered from memory :
+
+    GET  /kanji/{char}       KANJI_DB decomposition + KANJIDIC2 entry
+    GET  /tree/{char}        enriched decomposition tree
+    GET  /metrics/{char}     complexity metrics
+    GET  /radical/{n}?max_depth=&position=&outer_position=&limit=
+                             Kangxi radical n (1-214) and the kanji using it,
+                             at any depth of their decomposition
+    GET  /search?components=木,口&min_strokes=&max_strokes=&jlpt=1,2&limit=
+                             kanji containing every component
+    POST /batch              {"requests": ["/kanji/海", "/tree/林", ...]}
+                             -> {"responses": [{"status": 200, "body": ...}, ...]}
+
+Connections are HTTP/1.1 keep-alive : a client sends any number of requests
+on one connection (Connection: close, or HTTP/1.0 without keep-alive, ends
+it). GET responses are cached, already encoded, in an LRU cache.
+
+Run :     python kanji_service.py [--port 8765]
+Measure : python service_loadgen.py (latency / throughput targets)
+"""
+
+DEFAULT_HOST        = '127.0.0.1'
+DEFAULT_PORT        = 8765
+DATA_DIR            = Path(__file__).resolve().parent.parent / 'data'
+
+KEEP_ALIVE_TIMEOUT  = 15          # seconds an idle connection stays open
+MAX_HEADER_SIZE     = 16 * 1024
+MAX_BODY_SIZE       = 1024 * 1024
+MAX_BATCH_SIZE      = 256
+DEFAULT_SEARCH_SIZE = 100
+MAX_SEARCH_SIZE     = 5000
+MAX_STROKES         = 100
+MAX_DEPTH           = 255         # uint8 depth column of the radical index
+RESPONSE_CACHE_SIZE = 8192
+
+logger = logging.getLogger(__name__)
+
+class ServiceError(Exception):
+    """
+    Request error carrying its HTTP status.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def load_service_state(resources, metrics=None, kanji_dict=None):
+    """
+    Gather everything the service answers from.
+
+    Parameters
+    ----------
+    resources : KanjiResources or dict
+        Core resources (load_kanji_resources).
+    metrics : dict, optional
+        compute_all_kanji_metrics result, computed if omitted.
+    kanji_dict : dict, optional
+        Parsed KANJIDIC2 dictionary, resources['KANJI_DICT'] if omitted
+        and available.
+
+    Returns
+    -------
+    dict
+        Service state, read-only once serving.
+    """
+    from radical_index import build_radical_index
+    from radical_search import build_radical_search_index
+
+    kanji_db        = resources['KANJI_DB']
+    variant_index   = resources['VARIANT_INDEX']
+    kangxi_radicals = resources['KANGXI_RADICALS']
+
+    if kanji_dict is None and getattr(resources, 'kanjidic_path', None) is not None:
+        kanji_dict = resources['KANJI_DICT']
+
+    if metrics is None:
+        from kanji_metrics import compute_all_kanji_metrics
+        metrics = compute_all_kanji_metrics(kanji_db, variant_index, kangxi_radicals)
+
+    return {
+        'KANJI_DB'        : kanji_db,
+        'VARIANT_INDEX'   : variant_index,
+        'KANGXI_RADICALS' : kangxi_radicals,
+        'RADICAL_INDEX'   : build_radical_index(kanji_db, variant_index, kangxi_radicals),
+        'KANJI_DICT'      : kanji_dict or {},
+        'METRICS'         : metrics,
+        'RADICALS_BY_ID'  : {data['id']: radical for radical, data in kangxi_radicals.items()},
+        'SEARCH_INDEX'    : build_radical_search_index(kanji_db, variant_index, kangxi_radicals, kanji_dict)
+    }
+
+#%% endpoints
+def _single_char(value):
+    if len(value) != 1:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"Expected one character, got {value!r}")
+
+    return value
+
+def _int_param(query, name, default=None, minimum=None, maximum=None):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[-1])
+    except ValueError:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer") from None
+
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"{name} must be between {minimum} and {maximum}")
+
+    return value
+
+def _list_param(query, name):
+    # ?jlpt=1,2 and ?jlpt=1&jlpt=2 are equivalent
+    return [item for value in query.get(name, []) for item in value.split(',') if item]
+
+def get_kanji(state, char, query):
+    char       = _single_char(char)
+    entry      = state['KANJI_DB'].get(char)
+    dictionary = state['KANJI_DICT'].get(char)
+
+    if entry is None and dictionary is None:
+        raise ServiceError(HTTPStatus.NOT_FOUND, f"Unknown kanji {char!r}")
+
+    return {
+        'kanji'         : char,
+        'decomposition' : entry,
+        'kanjidic'      : dictionary
+    }
+
+def get_tree(state, char, query):
+    char = _single_char(char)
+
+    if char not in state['KANJI_DB'] and char not in state['VARIANT_INDEX']:
+        raise ServiceError(HTTPStatus.NOT_FOUND, f"No decomposition for {char!r}")
+
+    return resolve_kanji_tree_enriched(char, state['KANJI_DB'], state['VARIANT_INDEX'], state['KANGXI_RADICALS'])
+
+def get_metrics(state, char, query):
+    char    = _single_char(char)
+    metrics = state['METRICS'].get(char)
+
+    if metrics is None:
+        raise ServiceError(HTTPStatus.NOT_FOUND, f"No metrics for {char!r}")
+
+    return {'kanji': char, 'metrics': metrics}
+
+def get_radical(state, number, query):
+    from positional_index import POSITION_CODES
+    from radical_index import kanji_for_radical
+
+    try:
+        radical = state['RADICALS_BY_ID'][int(number)]
+    except (ValueError, KeyError):
+        raise ServiceError(HTTPStatus.NOT_FOUND, f"No Kangxi radical {number!r} (1-214)") from None
+
+    filters = {'max_depth': _int_param(query, 'max_depth', minimum=1, maximum=MAX_DEPTH)}
+    for name in ('position', 'outer_position'):
+        values = query.get(name)
+        if values:
+            if values[-1] not in POSITION_CODES:
+                raise ServiceError(HTTPStatus.BAD_REQUEST, f"{name} must be one of {', '.join(POSITION_CODES)}")
+            filters[name] = values[-1]
+    limit = _int_param(query, 'limit', DEFAULT_SEARCH_SIZE, minimum=0, maximum=MAX_SEARCH_SIZE)
+
+    kanji = kanji_for_radical(state['RADICAL_INDEX'], state['KANGXI_RADICALS'][radical]['id'], **filters)
+
+    return {
+        'radical' : radical,
+        'info'    : state['KANGXI_RADICALS'][radical],
+        'total'   : len(kanji),
+        'kanji'   : kanji[:limit]
+    }
+
+def search(state, argument, query):
+    from radical_search import JLPT_LEVELS, search_by_components
+
+    components = _list_param(query, 'components')
+    if not components:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, "components is required, e.g. ?components=木,口")
+
+    try:
+        jlpt = [int(level) for level in _list_param(query, 'jlpt')] or None
+    except ValueError:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, "jlpt must list integers") from None
+    if jlpt is not None and not all(level in JLPT_LEVELS for level in jlpt):
+        raise ServiceError(HTTPStatus.BAD_REQUEST, "jlpt levels must be between 1 and 4")
+
+    # every parameter is validated before the search runs
+    min_strokes = _int_param(query, 'min_strokes', minimum=0, maximum=MAX_STROKES)
+    max_strokes = _int_param(query, 'max_strokes', minimum=0, maximum=MAX_STROKES)
+    limit       = _int_param(query, 'limit', DEFAULT_SEARCH_SIZE, minimum=0, maximum=MAX_SEARCH_SIZE)
+
+    result = search_by_components(
+                            state['SEARCH_INDEX'],
+                            components,
+                            min_strokes = min_strokes,
+                            max_strokes = max_strokes,
+                            jlpt_levels = jlpt
+                            )
+
+    return {
+        'total'           : len(result['kanji']),
+        'kanji'           : result['kanji'][:limit],
+        'next_components' : result['next_components']
+    }
+
+# first path segment -> handler(state, rest of the path, query)
+ROUTES = {
+    'kanji'   : get_kanji,
+    'tree'    : get_tree,
+    'metrics' : get_metrics,
+    'radical' : get_radical,
+    'search'  : search
+}
+
+def dispatch_get(state, target):
+    """
+    Answer one GET target ('/kanji/海', '/search?components=木').
+
+    Returns
+    -------
+    tuple[int, object]
+        (HTTP status, JSON-serialisable body)
+    """
+    parts          = urlsplit(target)
+    route, _, rest = unquote(parts.path).strip('/').partition('/')
+    handler        = ROUTES.get(route)
+
+    if handler is None:
+        return HTTPStatus.NOT_FOUND, {'error': f"Unknown endpoint {parts.path!r}"}
+
+    try:
+        return HTTPStatus.OK, handler(state, rest, parse_qs(parts.query))
+    except ServiceError as error:
+        return error.status, {'error': str(error)}
+    except Exception:
+        # a handler bug must still produce a response
+        logger.exception(f"GET {target} failed")
+        return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'Internal server error'}
+
+def dispatch_batch(state, body):
+    """
+    Answer a POST /batch body : several GET targets in one round trip.
+    """
+    try:
+        targets = json.loads(body)['requests']
+    except (ValueError, KeyError, TypeError):
+        return HTTPStatus.BAD_REQUEST, {'error': 'Expected {"requests": [target, ...]}'}
+
+    if not isinstance(targets, list) or len(targets) > MAX_BATCH_SIZE:
+        return HTTPStatus.BAD_REQUEST, {'error': f"requests must be a list of at most {MAX_BATCH_SIZE} targets"}
+
+    responses = []
+    for target in targets:
+        status, payload = dispatch_get(state, str(target))
+        responses.append({'status': int(status), 'body': payload})
+
+    return HTTPStatus.OK, {'responses': responses}
+
+#%% HTTP/1.1 over asyncio streams
+def _encode(status, payload):
+    return int(status), json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+def _response(status, body, keep_alive):
+    reason = HTTPStatus(status).phrase
+    head   = (
+        f"HTTP/1.1 {status} {reason}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        f"\r\n"
+    )
+
+    return head.encode('latin-1') + body
+
+async def _read_request(reader):
+    """
+    Read one request : (method, target, version, headers, body), None at EOF.
+    """
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise ServiceError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Headers too large") from None
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ')
+        # clients may send the kanji unescaped : the target is UTF-8
+        target = target.encode('latin-1').decode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        raise ServiceError(HTTPStatus.BAD_REQUEST, "Malformed request line") from None
+
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    length = headers.get('content-length') or '0'
+    if not length.isascii() or not length.isdigit():
+        raise ServiceError(HTTPStatus.BAD_REQUEST, "Content-Length must be a non-negative integer")
+    length = int(length)
+    if length > MAX_BODY_SIZE:
+        raise ServiceError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body too large")
+    body = await reader.readexactly(length) if length else b''
+
+    return method, target, version, headers, body
+
+async def handle_connection(state, answer_get, reader, writer):
+    """
+    Serve every request of one keep-alive connection.
+    """
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except ServiceError as error:
+                writer.write(_response(*_encode(error.status, {'error': str(error)}), keep_alive=False))
+                break
+            if request is None:
+                break
+
+            method, target, version, headers, body = request
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+            try:
+                if method == 'GET':
+                    status, encoded = answer_get(target)
+                elif method == 'POST' and target.split('?')[0].rstrip('/') == '/batch':
+                    status, encoded = _encode(*dispatch_batch(state, body))
+                else:
+                    status, encoded = _encode(HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"{method} {target} not allowed"})
+            except Exception:
+                logger.exception(f"{method} {target} failed")
+                status, encoded = _encode(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'Internal server error'})
+                keep_alive      = False
+
+            writer.write(_response(status, encoded, keep_alive))
+            await writer.drain()
+
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+def connection_handler(state):
+    """
+    Build the asyncio connection callback serving a state.
+    """
+    # the state is read-only : encoded GET responses can be cached
+    @functools.lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+    def answer_get(target):
+        return _encode(*dispatch_get(state, target))
+
+    return lambda reader, writer: handle_connection(state, answer_get, reader, writer)
+
+async def start_service(state, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Start serving on host:port.
+
+    Returns
+    -------
+    asyncio.Server
+    """
+    return await asyncio.start_server(connection_handler(state), host, port, limit=MAX_HEADER_SIZE)
+
+async def start_unix_service(state, path):
+    """
+    Start serving on a Unix domain socket (see kanji_daemon).
+
+    Returns
+    -------
+    asyncio.Server
+    """
+    return await asyncio.start_unix_server(connection_handler(state), path, limit=MAX_HEADER_SIZE)
+
+def load_default_state(unihan_path=None, kangxi_path=None, kanjidic_path=None):
+    """
+    Load the service state from the data files (defaults : the repo data/).
+
+    Metrics come from the persistent metrics store when the data did not change.
+    """
+    from metrics_store import cached_kanji_metrics, store_to_metrics
+
+    unihan_path   = unihan_path or DATA_DIR / 'Unihan_CJKVI_database.txt'
+    kangxi_path   = kangxi_path or DATA_DIR / 'kangxi_radicals.json'
+    kanjidic_path = kanjidic_path or DATA_DIR / 'kanjidic2.xml.gz'
+
+    resources = load_kanji_resources(unihan_path, kangxi_path, kanjidic_path)
+    metrics   = store_to_metrics(cached_kanji_metrics(unihan_path, kangxi_path, resources=resources))
+
+    return load_service_state(resources, metrics)
+
+def main(argv=None):
+    """
+    Command line : python kanji_service.py [--host H] [--port P] [data paths]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local kanji lookup service')
+    parser.add_argument('--host',     default=DEFAULT_HOST)
+    parser.add_argument('--port',     default=DEFAULT_PORT, type=int)
+    parser.add_argument('--unihan',   default=DATA_DIR / 'Unihan_CJKVI_database.txt')
+    parser.add_argument('--kangxi',   default=DATA_DIR / 'kangxi_radicals.json')
+    parser.add_argument('--kanjidic', default=DATA_DIR / 'kanjidic2.xml.gz')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger('kanji_service')
+
+    start = time.perf_counter()
+    state = load_default_state(args.unihan, args.kangxi, args.kanjidic)
+    logger.info(f"state loaded in {time.perf_counter() - start:.1f} s, serving on {args.host}:{args.port}")
+
+    async def _serve():
+        server = await start_service(state, args.host, args.port)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import zlib
+from collections import Counter
+import numpy as np
+from positional_index import build_positional_index
+
+#%%
+"""
+Look-alike kanji finder (MinHash + LSH banding).
+
+Each character is described by the multiset of its positioned components,
+taken from the full-depth positional decomposition :
+
+    海 -> {氵@left, 每@right, 𠂉@right/top, 母@right/bottom}
+
+Repeated components are kept apart (木@left#0, 木@left#1...) so that the
+Jaccard similarity is computed on multisets.
+
+MinHash signatures approximate that Jaccard similarity, and LSH banding
+(BANDS bands of ROWS rows) only compares characters sharing at least one
+band bucket, which keeps queries sublinear instead of comparing every
+pair of the ~88k characters.
+
+With BANDS = 16 and ROWS = 4, a pair with similarity s becomes a candidate
+with probability 1 - (1 - s**4)**16 : ~0.63 at s = 0.5, ~0.99 at s = 0.75.
+"""
+
+NUM_PERM = 64
+BANDS    = 16
+ROWS     = NUM_PERM // BANDS
+
+# Mersenne prime used by the universal hash family (a * x + b) mod p
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH       = np.uint64((1 << 32) - 1)
+
+def positioned_tokens(paths):
+    """
+    Turn (component, path) pairs into multiset tokens.
+
+    Parameters
+    ----------
+    paths : list[tuple[str, tuple[str, ...]]]
+        Positioned components, as stored in build_positional_index()['paths'].
+
+    Returns
+    -------
+    list[str]
+        One token per occurrence, e.g. '母@right/bottom#0'.
+    """
+    seen   = Counter()
+    tokens = []
+
+    for component, path in paths:
+        base        = component + '@' + '/'.join(path)
+        tokens.append(f'{base}#{seen[base]}')
+        seen[base] += 1
+
+    return tokens
+
+def _token_hash(token):
+    """
+    Stable 32-bit token hash (Python's hash() is salted per process).
+    """
+    return zlib.crc32(token.encode('utf-8'))
+
+def _permutations(num_perm, seed):
+    """
+    Draw the (a, b) coefficients of the universal hash family.
+    """
+    rng = np.random.default_rng(seed)
+
+    # a < 2**32 : a * hash (hash < 2**32) fits in uint64, see minhash_signatures
+    a   = rng.integers(1, int(MAX_HASH) + 1, size=num_perm, dtype=np.uint64)
+    b   = rng.integers(0, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    return a, b
+
+def minhash_signatures(token_hashes, offsets, perm_a, perm_b):
+    """
+    Compute MinHash signatures for many token sets at once.
+
+    Parameters
+    ----------
+    token_hashes : np.ndarray[uint64]
+        32-bit hashes of every token, grouped by character.
+    offsets : np.ndarray[int64]
+        CSR offsets of each character's tokens (every group must be non-empty).
+    perm_a, perm_b : np.ndarray[uint64]
+        Hash family coefficients.
+
+    Returns
+    -------
+    np.ndarray[uint32]
+        Signatures, shape (n_characters, num_perm).
+    """
+    signatures = np.empty((len(offsets) - 1, len(perm_a)), dtype=np.uint32)
+
+    # one vectorised pass per permutation, reduced per character with reduceat
+    for i, (a, b) in enumerate(zip(perm_a, perm_b)):
+        # reduce the product before adding b : (< 2**61) + (< 2**61) never wraps uint64
+        values           = (((token_hashes * a) % MERSENNE_PRIME + b) % MERSENNE_PRIME) & MAX_HASH
+        signatures[:, i] = np.minimum.reduceat(values, offsets[:-1])
+
+    return signatures
+
+def band_keys(signatures):
+    """
+    Collapse every band of ROWS signature values into one uint64 bucket key.
+
+    Returns
+    -------
+    np.ndarray[uint64]
+        Shape (n_characters, BANDS).
+    """
+    rows = signatures.reshape(len(signatures), BANDS, ROWS).astype(np.uint64)
+    keys = np.zeros(rows.shape[:2], dtype=np.uint64)
+
+    # FNV-style mixing, wrapping uint64 arithmetic is intended
+    with np.errstate(over='ignore'):
+        for r in range(ROWS):
+            keys = (keys ^ rows[:, :, r]) * np.uint64(1099511628211)
+
+    return keys
+
+#%%
+def build_lookalike_index(kanji_db, positional_index=None, seed=1):
+    """
+    Build the MinHash/LSH look-alike index over the whole database.
+
+    Parameters
+    ----------
+    kanji_db : dict
+        Normalised kanji database (KANJI_DB).
+    positional_index : dict, optional
+        Prebuilt build_positional_index result, built if omitted.
+    seed : int, optional
+        Seed of the hash family, fixed so that signatures are reproducible.
+
+    Returns
+    -------
+    dict
+        Index consumed by similar_kanji / batch_similar_kanji.
+    """
+    if positional_index is None:
+        positional_index = build_positional_index(kanji_db)
+
+    # only decomposable characters get a signature
+    kanji   = []
+    hashes  = []
+    offsets = [0]
+    for char in positional_index['kanji']:
+        tokens = positioned_tokens(positional_index['paths'].get(char, []))
+        if not tokens:
+            continue
+        kanji.append(char)
+        hashes.extend(_token_hash(token) for token in tokens)
+        offsets.append(len(hashes))
+
+    perm_a, perm_b = _permutations(NUM_PERM, seed)
+    signatures     = minhash_signatures(
+                                    np.asarray(hashes, dtype=np.uint64),
+                                    np.asarray(offsets, dtype=np.int64),
+                                    perm_a,
+                                    perm_b
+                                    )
+
+    # per band : bucket keys sorted once, members found by binary search
+    keys        = band_keys(signatures)
+    band_order  = np.argsort(keys, axis=0, kind='stable')
+    sorted_keys = np.take_along_axis(keys, band_order, axis=0)
+
+    return {
+        'kanji'       : kanji,
+        'kanji_ids'   : {char: i for i, char in enumerate(kanji)},
+        'paths'       : positional_index['paths'],
+        'perm_a'      : perm_a,
+        'perm_b'      : perm_b,
+        'signatures'  : signatures,
+        'keys'        : keys,
+        'band_order'  : band_order,
+        'sorted_keys' : sorted_keys
+    }
+
+#%%
+def _candidates(lookalike_index, keys):
+    """
+    Collect the ids of every character sharing at least one band bucket.
+    """
+    sorted_keys = lookalike_index['sorted_keys']
+    band_order  = lookalike_index['band_order']
+    members     = []
+
+    for band in range(BANDS):
+        column = sorted_keys[:, band]
+        lo     = np.searchsorted(column, keys[band], side='left')
+        hi     = np.searchsorted(column, keys[band], side='right')
+        members.append(band_order[lo:hi, band])
+
+    return np.unique(np.concatenate(members))
+
+def query_signature(lookalike_index, char):
+    """
+    Return the MinHash signature of a character, indexed or not.
+    """
+    kanji_id = lookalike_index['kanji_ids'].get(char)
+
+    if kanji_id is not None:
+        return lookalike_index['signatures'][kanji_id]
+
+    tokens = positioned_tokens(lookalike_index['paths'].get(char, []))
+    if not tokens:
+        return None
+
+    hashes = np.asarray([_token_hash(token) for token in tokens], dtype=np.uint64)
+    return minhash_signatures(
+                            hashes,
+                            np.asarray([0, len(hashes)], dtype=np.int64),
+                            lookalike_index['perm_a'],
+                            lookalike_index['perm_b']
+                            )[0]
+
+def similar_kanji(lookalike_index, char, k=10, min_similarity=0.0):
+    """
+    Find the top-k visually similar characters of `char`.
+
+    Parameters
+    ----------
+    lookalike_index : dict
+        Index returned by build_lookalike_index.
+    char : str
+        Query character.
+    k : int, optional
+        Number of neighbours to return.
+    min_similarity : float, optional
+        Drop neighbours whose estimated Jaccard similarity is lower.
+
+    Returns
+    -------
+    list[tuple[str, float]]
+        (neighbour, estimated similarity), most similar first.
+    """
+    signature = query_signature(lookalike_index, char)
+    if signature is None:
+        return []
+
+    keys       = band_keys(signature[None, :])[0]
+    candidates = _candidates(lookalike_index, keys)
+
+    # estimated Jaccard : share of equal MinHash values
+    similarity = (lookalike_index['signatures'][candidates] == signature).mean(axis=1)
+
+    kanji   = lookalike_index['kanji']
+    self_id = lookalike_index['kanji_ids'].get(char, -1)
+    keep    = (similarity >= min_similarity) & (candidates != self_id)
+    candidates, similarity = candidates[keep], similarity[keep]
+
+    # partial selection, then exact ordering of the top-k only
+    if len(candidates) > k:
+        top = np.argpartition(-similarity, k - 1)[:k]
+        candidates, similarity = candidates[top], similarity[top]
+
+    order = np.lexsort((candidates, -similarity))
+
+    return [(kanji[candidates[i]], round(float(similarity[i]), 3)) for i in order]
+
+def batch_similar_kanji(lookalike_index, characters, k=10, min_similarity=0.0):
+    """
+    Precompute the top-k neighbours of many characters (e.g. the KANJIDIC2 subset).
+
+    Parameters
+    ----------
+    lookalike_index : dict
+        Index returned by build_lookalike_index.
+    characters : iterable[str]
+        Characters to process, typically the keys of the parsed KANJIDIC2 dict.
+
+    Returns
+    -------
+    dict[str, list[tuple[str, float]]]
+        Character -> neighbours, only for characters with a decomposition.
+    """
+    neighbours = {}
+
+    for char in characters:
+        result = similar_kanji(lookalike_index, char, k=k, min_similarity=min_similarity)
+        if result:
+            neighbours[char] = result
+
+    return neighbours
@@ -0,0 +1,214 @@
+import numpy as np
+from kanji_metrics import metrics_to_columns, percentile_ranks
+from component_closure import component_posting
+from kanji_dict_xml import field_to_int
+
+#%%
+"""
+Top-k complexity ranking queries.
+
+"The 50 most complex JLPT N2 kanji" or "the simplest kanji containing 木"
+used to mean computing all metrics and sorting a dict.
+
+build_metric_ranking turns the metrics into flat arrays once and presorts
+every metric in both directions. Queries then
+
+    - read the first k ids of a presorted order (no filter),
+    - walk the presorted order block by block, keeping the ids allowed by
+      a boolean filter mask, until k are found (with filters),
+    - for weighted composite scores, compute the score vector in one pass
+      and select the k best with a partial selection (np.argpartition),
+      sorting only those k.
+
+The full ranking is never materialised as Python objects.
+"""
+
+# ids read per step when walking a presorted order under a filter
+BLOCK_SIZE = 4096
+
+def build_metric_ranking(metrics, kanji_dict=None):
+    """
+    Precompute metric arrays and sort orders for ranking queries.
+
+    Parameters
+    ----------
+    metrics : dict[str, dict]
+        Output of compute_all_kanji_metrics.
+    kanji_dict : dict, optional
+        Parsed KANJIDIC2 dictionary, for the JLPT / grade filters.
+
+    Returns
+    -------
+    dict
+        {
+          'kanji'       : list[str],
+          'kanji_ids'   : dict[str, int],
+          'values'      : dict metric -> np.ndarray raw values,
+          'percentiles' : dict metric -> np.ndarray percentile ranks,
+          'order_asc'   : dict metric -> np.ndarray ids, simplest first,
+          'order_desc'  : dict metric -> np.ndarray ids, most complex first,
+          'jlpt'        : np.ndarray (0 when unknown),
+          'grade'       : np.ndarray (0 when unknown)
+        }
+    """
+    kanji, values = metrics_to_columns(metrics)
+    ids           = np.arange(len(kanji))
+
+    # ties are broken by kanji id in both directions
+    order_asc  = {key: np.lexsort((ids, column)).astype(np.int32) for key, column in values.items()}
+    order_desc = {key: np.lexsort((ids, -column)).astype(np.int32) for key, column in values.items()}
+
+    kanji_dict = kanji_dict or {}
+    jlpt       = np.zeros(len(kanji), dtype=np.int8)
+    grade      = np.zeros(len(kanji), dtype=np.int8)
+    for i, char in enumerate(kanji):
+        data = kanji_dict.get(char)
+        if data is not None:
+            jlpt[i]  = field_to_int(data.get('jlpt'), 0)
+            grade[i] = field_to_int(data.get('grade'), 0)
+
+    return {
+        'kanji'       : kanji,
+        'kanji_ids'   : {char: i for i, char in enumerate(kanji)},
+        'values'      : values,
+        'percentiles' : {key: percentile_ranks(column) for key, column in values.items()},
+        'order_asc'   : order_asc,
+        'order_desc'  : order_desc,
+        'jlpt'        : jlpt,
+        'grade'       : grade
+    }
+
+def ranking_mask(ranking, jlpt_levels=None, grades=None, component=None, closure_index=None):
+    """
+    Build the boolean filter mask of a ranking query.
+
+    Parameters
+    ----------
+    ranking : dict
+        Result of build_metric_ranking.
+    jlpt_levels, grades : iterable[int], optional
+        Former JLPT levels / school grades to keep.
+    component : str, optional
+        Keep only kanji containing this component at any depth.
+    closure_index : dict, optional
+        build_component_closure_index result, required with `component`.
+
+    Returns
+    -------
+    np.ndarray[bool] or None
+        None when no filter is requested.
+    """
+    mask = None
+
+    def _and(current, extra):
+        return extra if current is None else current & extra
+
+    if jlpt_levels is not None:
+        mask = _and(mask, np.isin(ranking['jlpt'], list(jlpt_levels)))
+
+    if grades is not None:
+        mask = _and(mask, np.isin(ranking['grade'], list(grades)))
+
+    if component is not None:
+        if closure_index is None:
+            raise ValueError("A closure_index is required to filter on a component")
+
+        # closure kanji ids -> ranking kanji ids
+        closure_kanji = closure_index['kanji']
+        ranking_ids   = ranking['kanji_ids']
+        contains      = np.zeros(len(ranking['kanji']), dtype=bool)
+        hits          = [ranking_ids.get(closure_kanji[i]) for i in component_posting(closure_index, component)]
+        contains[[i for i in hits if i is not None]] = True
+        mask = _and(mask, contains)
+
+    return mask
+
+#%%
+def top_k(ranking, metric, k=50, most_complex=True, mask=None):
+    """
+    Return the k highest (or lowest) ranked kanji for one metric.
+
+    Parameters
+    ----------
+    ranking : dict
+        Result of build_metric_ranking.
+    metric : str
+        Metric name ('depth', 'size', 'leaf_count', 'radical_count', 'branching').
+    k : int, optional
+        Number of kanji to return.
+    most_complex : bool, optional
+        True for the highest values first, False for the simplest kanji.
+    mask : np.ndarray[bool], optional
+        Filter from ranking_mask.
+
+    Returns
+    -------
+    list[tuple[str, float]]
+        (kanji, metric value), best first.
+    """
+    order  = ranking['order_desc' if most_complex else 'order_asc'][metric]
+    values = ranking['values'][metric]
+    kanji  = ranking['kanji']
+
+    if mask is None:
+        selected = order[:k]
+    else:
+        # walk the presorted order until k allowed ids are found
+        found = []
+        count = 0
+        for start in range(0, len(order), BLOCK_SIZE):
+            block  = order[start:start + BLOCK_SIZE]
+            block  = block[mask[block]]
+            found.append(block[:k - count])
+            count += len(found[-1])
+            if count >= k:
+                break
+        selected = np.concatenate(found) if found else order[:0]
+
+    return [(kanji[i], float(values[i])) for i in selected]
+
+def top_k_composite(ranking, weights, k=50, most_complex=True, mask=None):
+    """
+    Return the k best kanji for a weighted composite of metric percentiles.
+
+    score = sum(weight * percentile(metric)), computed for all kanji in one
+    vectorised pass; only the k best are then sorted.
+
+    Parameters
+    ----------
+    ranking : dict
+        Result of build_metric_ranking.
+    weights : dict[str, float]
+        Metric name -> weight.
+    k : int, optional
+        Number of kanji to return.
+    most_complex : bool, optional
+        True for the highest scores first.
+    mask : np.ndarray[bool], optional
+        Filter from ranking_mask.
+
+    Returns
+    -------
+    list[tuple[str, float]]
+        (kanji, composite score), best first.
+    """
+    score = np.zeros(len(ranking['kanji']))
+    for metric, weight in weights.items():
+        score += weight * ranking['percentiles'][metric]
+
+    candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(score))
+    if not len(candidates):
+        return []
+
+    # sign so that the best candidates are always the smallest keys
+    keys = -score[candidates] if most_complex else score[candidates]
+
+    if len(candidates) > k:
+        best       = np.argpartition(keys, k - 1)[:k]
+        candidates = candidates[best]
+        keys       = keys[best]
+
+    order = np.lexsort((candidates, keys))
+    kanji = ranking['kanji']
+
+    return [(kanji[candidates[i]], round(float(score[candidates[i]]), 3)) for i in order]
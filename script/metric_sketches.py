@@ -0,0 +1,244 @@
+import math
+import random
+import numpy as np
+
+#%%
+"""
+Streaming approximate percentile sketches for metric normalisation.
+
+normalise_metrics recomputes every distribution from scratch. When characters
+are added (new CJKVI release, custom glyphs) or computed by sharded workers,
+a KLL quantile sketch per metric lets us
+
+    - add the metrics of new characters without the full history
+    - merge sketches built by different workers
+    - score new or changed characters against the current distribution
+
+A sketch is a plain dict of compactor levels. Level h holds items of weight
+2**h; when a level exceeds its capacity it is sorted and every other item
+(random offset) is promoted to the next level.
+
+Error bounds
+------------
+For a sketch with parameter k, the estimated rank of any value is within
+about 3.3 / k * n of the true rank with 99% probability (KLL paper,
+Karnin-Lang-Liberty 2016; same figure as the Apache DataSketches KLL
+implementation : k = 200 gives ~1.65% normalised rank error).
+Percentiles are normalised ranks, so with the default k = 200 a score is
+off by less than ~0.017. compare_with_exact measures the actual error
+against normalise_metrics_array.
+
+Sketches cannot forget a value : when a character changes, its old value
+stays counted until the sketches are rebuilt, which shifts any percentile
+by at most (number of changed characters) / n.
+"""
+
+DEFAULT_K       = 200
+CAPACITY_DECAY  = 2 / 3
+MIN_CAPACITY    = 2
+
+def new_sketch(k=DEFAULT_K, seed=0):
+    """
+    Create an empty KLL sketch.
+
+    Parameters
+    ----------
+    k : int, optional
+        Accuracy parameter (size of the top compactor).
+    seed : int, optional
+        Seed of the compaction coin flips, for reproducible sketches.
+    """
+    return {
+        'k'         : k,
+        'n'         : 0,
+        'levels'    : [[]],
+        'rng'       : random.Random(seed)
+    }
+
+def _capacity(sketch, level):
+    """
+    Capacity of a compactor level : top level k, lower ones shrink by 2/3.
+    """
+    depth = len(sketch['levels']) - level - 1
+    return max(MIN_CAPACITY, int(math.ceil(sketch['k'] * CAPACITY_DECAY ** depth)))
+
+def _compress(sketch):
+    """
+    Compact every level above its capacity, bottom up.
+    """
+    levels = sketch['levels']
+    level  = 0
+
+    while level < len(levels):
+        items = levels[level]
+
+        if len(items) >= _capacity(sketch, level):
+            if level + 1 == len(levels):
+                levels.append([])
+
+            items.sort()
+            offset = sketch['rng'].randint(0, 1)
+            # an odd leftover stays at this level
+            keep   = [items.pop()] if len(items) % 2 else []
+
+            levels[level + 1].extend(items[offset::2])
+            levels[level] = keep
+
+        level += 1
+
+def update_sketch(sketch, values):
+    """
+    Add one value or an iterable of values to a sketch.
+    """
+    if isinstance(values, (int, float, np.number)):
+        values = [values]
+
+    level_zero = sketch['levels'][0]
+    for value in values:
+        level_zero.append(float(value))
+        sketch['n'] += 1
+
+        if len(level_zero) >= _capacity(sketch, 0):
+            _compress(sketch)
+            level_zero = sketch['levels'][0]
+
+    return sketch
+
+def merge_sketches(*sketches):
+    """
+    Merge sketches (e.g. built by sharded workers) into a new one.
+
+    All sketches must share the same k.
+    """
+    if len({s['k'] for s in sketches}) > 1:
+        raise ValueError("Only sketches with the same k can be merged")
+
+    merged = new_sketch(sketches[0]['k'], seed=sum(s['n'] for s in sketches))
+
+    height           = max(len(s['levels']) for s in sketches)
+    merged['levels'] = [[] for _ in range(height)]
+    for sketch in sketches:
+        merged['n'] += sketch['n']
+        for level, items in enumerate(sketch['levels']):
+            merged['levels'][level].extend(items)
+
+    _compress(merged)
+
+    return merged
+
+def sketch_rank(sketch, values):
+    """
+    Estimated share of values lower or equal to each value (percentile rank).
+
+    Same definition as percentile_normalise / percentile_ranks.
+    """
+    if not sketch['n']:
+        raise ValueError("Empty sketch")
+
+    # weighted sorted items : one searchsorted for all queried values
+    items   = []
+    weights = []
+    for level, level_items in enumerate(sketch['levels']):
+        items.extend(level_items)
+        weights.extend([1 << level] * len(level_items))
+
+    order      = np.argsort(items, kind='stable')
+    items      = np.asarray(items)[order]
+    cumulative = np.cumsum(np.asarray(weights, dtype=np.float64)[order])
+    total      = cumulative[-1]
+
+    positions = np.searchsorted(items, np.asarray(values, dtype=np.float64), side='right')
+    ranks     = np.where(positions > 0, cumulative[np.maximum(positions - 1, 0)], 0.0)
+
+    return ranks / total
+
+#%%
+def build_metric_sketches(metrics, k=DEFAULT_K, seed=0):
+    """
+    Build one sketch per metric from a compute_all_kanji_metrics result.
+
+    Returns
+    -------
+    dict[str, dict]
+        Metric name -> sketch.
+    """
+    keys     = list(metrics[next(iter(metrics))]) if metrics else []
+    sketches = {key: new_sketch(k, seed) for key in keys}
+
+    for key, sketch in sketches.items():
+        update_sketch(sketch, [data[key] for data in metrics.values()])
+
+    return sketches
+
+def update_metric_sketches(sketches, metrics):
+    """
+    Add the metrics of new (or changed) characters to existing sketches.
+    """
+    for key, sketch in sketches.items():
+        update_sketch(sketch, [data[key] for data in metrics.values() if key in data])
+
+    return sketches
+
+def merge_metric_sketches(*sketch_sets):
+    """
+    Merge per-metric sketches produced by several workers.
+    """
+    keys = sketch_sets[0].keys()
+
+    return {key: merge_sketches(*(s[key] for s in sketch_sets)) for key in keys}
+
+def normalise_with_sketches(sketches, metrics, decimals=3):
+    """
+    Incremental counterpart of normalise_metrics.
+
+    Scores the given characters only (e.g. new or changed ones) against the
+    distributions summarised by the sketches.
+
+    Parameters
+    ----------
+    sketches : dict[str, dict]
+        Metric name -> sketch.
+    metrics : dict[str, dict]
+        Kanji -> metrics to normalise.
+
+    Returns
+    -------
+    dict[str, dict]
+        Same format as normalise_metrics.
+    """
+    kanji  = list(metrics)
+    scores = {}
+
+    for key, sketch in sketches.items():
+        values      = [metrics[k][key] for k in kanji]
+        scores[key] = np.round(sketch_rank(sketch, values), decimals).tolist()
+
+    return {
+        k : {key: scores[key][i] for key in sketches}
+        for i, k in enumerate(kanji)
+        }
+
+def compare_with_exact(metrics, sketches):
+    """
+    Measure the sketch error against the exact percentiles.
+
+    Parameters
+    ----------
+    metrics : dict[str, dict]
+        Full compute_all_kanji_metrics result the sketches summarise.
+    sketches : dict[str, dict]
+        Metric name -> sketch.
+
+    Returns
+    -------
+    dict[str, float]
+        Metric name -> maximum absolute percentile error over all kanji.
+    """
+    from kanji_metrics import metrics_to_columns, percentile_ranks
+
+    _, columns = metrics_to_columns(metrics)
+
+    return {
+        key : float(np.max(np.abs(sketch_rank(sketches[key], values) - percentile_ranks(values))))
+        for key, values in columns.items()
+        }
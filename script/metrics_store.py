@@ -0,0 +1,200 @@
+import hashlib
+import os
+from pathlib import Path
+import numpy as np
+from parse_unihan_cjkvi import load_kanji_resources
+from kanji_metrics import (
+    METRICS_VERSION,
+    METRIC_VISITORS,
+    compute_all_kanji_metrics,
+    metrics_to_columns,
+    normalise_metrics_array
+)
+
+#%%
+"""
+Persistent metrics store keyed by the input data fingerprint.
+
+compute_all_kanji_metrics and normalise_metrics only depend on
+Unihan_CJKVI_database.txt, kangxi_radicals.json and the metric code, so
+their results are saved once in a compressed columnar .npz file :
+
+    fingerprint            str     sha256 of both inputs + METRICS_VERSION + registered metric names
+    codepoints             uint32  kanji, in compute_all_kanji_metrics order
+    metric/<name>          int16 for integer metrics, float64 otherwise
+    percentile/<name>      uint16  normalise_metrics percentiles * 1000
+
+(percentiles are rounded to 3 decimals, so thousandths are lossless).
+
+The file name contains the fingerprint : editing a data file or bumping
+METRICS_VERSION simply misses the cache. On a hit, only the store is read :
+the CJKVI database is not even parsed.
+"""
+
+METRIC_PREFIX     = 'metric/'
+PERCENTILE_PREFIX = 'percentile/'
+PERCENTILE_SCALE  = 1000
+
+def data_fingerprint(cjkvi_path, kangxi_path, version=METRICS_VERSION):
+    """
+    Hash the metric inputs, the metric code version and the names of the
+    metrics added with register_metric (a store computed without them is
+    not reused once they are registered).
+
+    Returns
+    -------
+    str
+        Hex sha256 digest.
+    """
+    digest = hashlib.sha256()
+
+    for path in (cjkvi_path, kangxi_path):
+        with open(path, 'rb') as f:
+            # read by blocks, the CJKVI file is several MB
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+
+    digest.update(str(version).encode('utf-8'))
+    digest.update(','.join(sorted(METRIC_VISITORS)).encode('utf-8'))
+
+    return digest.hexdigest()
+
+def store_path(cache_dir, fingerprint):
+    """
+    Path of the store file for a fingerprint.
+    """
+    return Path(cache_dir) / f'kanji_metrics_{fingerprint[:16]}.npz'
+
+def save_metrics_store(path, metrics, fingerprint):
+    """
+    Write metrics and their percentiles to a columnar .npz file.
+
+    Parameters
+    ----------
+    path : str or Path
+        Destination file.
+    metrics : dict[str, dict]
+        Output of compute_all_kanji_metrics.
+    fingerprint : str
+        Output of data_fingerprint.
+    """
+    kanji, columns = metrics_to_columns(metrics)
+    normalised     = normalise_metrics_array(metrics)
+
+    arrays = {
+        'fingerprint' : np.array(fingerprint),
+        'codepoints'  : np.fromiter(map(ord, kanji), dtype=np.uint32, count=len(kanji))
+    }
+
+    for key, values in columns.items():
+        integral = np.array_equal(values, np.round(values))
+        arrays[METRIC_PREFIX + key]     = values.astype(np.int16) if integral else values
+        arrays[PERCENTILE_PREFIX + key] = np.rint(normalised[key] * PERCENTILE_SCALE).astype(np.uint16)
+
+    # write then rename : readers never see a half-written store
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+    return path
+
+def load_metrics_store(path, fingerprint=None):
+    """
+    Open a metrics store.
+
+    Parameters
+    ----------
+    path : str or Path
+        Store file.
+    fingerprint : str, optional
+        Expected fingerprint; a store with another one is ignored.
+
+    Returns
+    -------
+    dict or None
+        {
+          'fingerprint' : str,
+          'kanji'       : list[str],
+          'metrics'     : dict metric -> np.ndarray,
+          'percentiles' : dict metric -> np.ndarray float64
+        }
+        None if the file is missing or stale.
+    """
+    if not Path(path).exists():
+        return None
+
+    with np.load(path) as store:
+        stored = str(store['fingerprint'])
+        if fingerprint is not None and stored != fingerprint:
+            return None
+
+        return {
+            'fingerprint' : stored,
+            'kanji'       : [chr(c) for c in store['codepoints'].tolist()],
+            'metrics'     : {
+                name[len(METRIC_PREFIX):] : store[name]
+                for name in store.files if name.startswith(METRIC_PREFIX)
+                },
+            'percentiles' : {
+                name[len(PERCENTILE_PREFIX):] : store[name] / PERCENTILE_SCALE
+                for name in store.files if name.startswith(PERCENTILE_PREFIX)
+                }
+        }
+
+def store_to_metrics(store, field='metrics'):
+    """
+    Rebuild the compute_all_kanji_metrics dict from a store.
+
+    field='percentiles' gives the normalise_metrics dict instead.
+    """
+    columns = {key: values.tolist() for key, values in store[field].items()}
+
+    return {
+        kanji : {key: columns[key][i] for key in columns}
+        for i, kanji in enumerate(store['kanji'])
+        }
+
+def cached_kanji_metrics(cjkvi_path, kangxi_path, cache_dir=None, resources=None):
+    """
+    Load the metrics store for the current data, computing it on a miss.
+
+    Parameters
+    ----------
+    cjkvi_path : str or Path
+        Path to Unihan_CJKVI_database.txt.
+    kangxi_path : str or Path
+        Path to kangxi_radicals.json.
+    cache_dir : str or Path, optional
+        Store directory, 'cache' next to the CJKVI file by default.
+    resources : dict, optional
+        Already loaded load_kanji_resources result, used on a miss.
+
+    Returns
+    -------
+    dict
+        Store, see load_metrics_store.
+    """
+    if cache_dir is None:
+        cache_dir = Path(cjkvi_path).parent / 'cache'
+
+    fingerprint = data_fingerprint(cjkvi_path, kangxi_path)
+    path        = store_path(cache_dir, fingerprint)
+
+    store = load_metrics_store(path, fingerprint)
+    if store is not None:
+        return store
+
+    if resources is None:
+        resources = load_kanji_resources(cjkvi_path, kangxi_path)
+
+    metrics = compute_all_kanji_metrics(
+        resources['KANJI_DB'],
+        resources['VARIANT_INDEX'],
+        resources['KANGXI_RADICALS']
+    )
+    save_metrics_store(path, metrics, fingerprint)
+
+    return load_metrics_store(path, fingerprint)
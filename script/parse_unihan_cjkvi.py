@@ -1,6 +1,8 @@
+from collections.abc import Mapping
 from pathlib import Path
 import re
 import json
+import threading
 
 IDS_OPERATORS        = ("⿰", "⿱", "⿴", "⿵", "⿶","⿷", "⿸", "⿹", "⿺", "⿻")
 
@@ -9,6 +11,22 @@ IDS_BINARY_OPERATORS = {
                         "⿱": ("top", "bottom"),
                     }
 
+#position label of each operand, for every IDS operator (ternary ones included)
+IDS_OPERATOR_POSITIONS = {
+                        "⿰": ("left", "right"),
+                        "⿱": ("top", "bottom"),
+                        "⿲": ("left", "middle", "right"),
+                        "⿳": ("top", "middle", "bottom"),
+                        "⿴": ("surround", "inside"),
+                        "⿵": ("surround_top", "inside"),
+                        "⿶": ("surround_bottom", "inside"),
+                        "⿷": ("surround_left", "inside"),
+                        "⿸": ("top_left", "inside"),
+                        "⿹": ("top_right", "inside"),
+                        "⿺": ("bottom_left", "inside"),
+                        "⿻": ("overlay", "overlay"),
+                    }
+
 #%%
 def clean_ids(ids):
     """
@@ -39,9 +57,6 @@ def parse_ids_minimal(ids):
             "children" : [left, right]
         }
 
-parse_ids_minimal("⿰氵毎")
-parse_ids_minimal("⿱⺊一")
-parse_ids_minimal("⿱一⿰丿𠃌")
 #%%
 def parse_ids_trees(ids):
     """
@@ -68,7 +83,6 @@ def parse_ids_trees(ids):
 
     return tree    
 
-parse_ids_trees('⿰⿱亠口心')
 #%%
 def ids_to_positioned_components(parsed_ids):
     operator = parsed_ids['operator']
@@ -145,30 +159,47 @@ def parse_unihan_cjkvi(path):
             #split each entry in 3 variables
             codepoint, char, raw_ids = parts[:3]
             
-            #clean IDS
-            ids = clean_ids(raw_ids)
-            
-            #parse IDS minimal
-            parsed_ids = parse_ids_minimal(ids)
-            
-            #derive positioned components
-            if parsed_ids is not None:
-                components = ids_to_positioned_components(parsed_ids)
-            else:
-                components = None
+            entry = parse_cjkvi_entry(codepoint, raw_ids)
 
-            if not ids.startswith(IDS_OPERATORS):
+            if entry is None:
                 continue
 
-            cjkvi_dict[char] = {
-                                'codepoint'  : codepoint,
-                                'raw_ids'    : raw_ids,
-                                'ids'        : ids,
-                                'parsed_ids' : parsed_ids,
-                                'components' : components
-                                }
+            cjkvi_dict[char] = entry
     
     return cjkvi_dict
+
+def parse_cjkvi_entry(codepoint, raw_ids):
+    """
+    Build the raw entry of one Unihan_CJKVI line.
+
+    Returns
+    -------
+    dict or None
+        Entry as stored by parse_unihan_cjkvi, None if the IDS does not
+        start with an IDS operator (atomic character).
+    """
+    #clean IDS
+    ids = clean_ids(raw_ids)
+
+    if not ids.startswith(IDS_OPERATORS):
+        return None
+    
+    #parse IDS minimal
+    parsed_ids = parse_ids_minimal(ids)
+    
+    #derive positioned components
+    if parsed_ids is not None:
+        components = ids_to_positioned_components(parsed_ids)
+    else:
+        components = None
+
+    return {
+            'codepoint'  : codepoint,
+            'raw_ids'    : raw_ids,
+            'ids'        : ids,
+            'parsed_ids' : parsed_ids,
+            'components' : components
+            }
 #%%
 def normalise_kanji_entry(entry):
     """
@@ -219,6 +250,9 @@ def build_radical_dict(kanji_db, kangxi_radicals, variant_index):
     """
     Build a reverse dictionary : 
     radical -> all kanji using it
+
+    Only the top-level components of each entry are read.
+    See radical_index.build_radical_index for the full-depth version.
     """
 
     radical_dict = {}
@@ -389,29 +423,148 @@ def resolve_kanji_tree_enriched(char, kanji_db, variant_index, kangxi_radicals,
         node['children'].append(subtree)
 
     return node
-#%%
-def load_kanji_resources(unihan_path, kangxi_path):
-    """load and build all core kanji dictionaries"""
-    
-    raw_cjkvi_data = parse_unihan_cjkvi(unihan_path)
-    KANJI_DB = normalise_unihan_dict(raw_cjkvi_data)
+#%% lazily built resources
+def _load_kangxi_list(resources):
+    with open(resources.kangxi_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _load_kanji_dict(resources):
+    # KANJIDIC2 is optional and shipped gzipped
+    from kanji_dict_xml import kanji_XML_parser_dic2
+
+    if resources.kanjidic_path is None:
+        raise KeyError("KANJI_DICT needs a kanjidic_path")
+
+    if str(resources.kanjidic_path).endswith('.gz'):
+        import gzip
+        with gzip.open(resources.kanjidic_path) as f:
+            return kanji_XML_parser_dic2(f)
+
+    return kanji_XML_parser_dic2(resources.kanjidic_path)
+
+# resource name -> (resources it is built from, builder)
+# builders receive the container and only read their declared dependencies
+RESOURCE_BUILDERS = {
+    'KANJI_DB'             : ((), lambda r: normalise_unihan_dict(parse_unihan_cjkvi(r.unihan_path))),
+    'KANGXI_RADICALS_LIST' : ((), _load_kangxi_list),
+    'KANGXI_RADICALS'      : (('KANGXI_RADICALS_LIST',), lambda r: index_kangxi_radicals(r['KANGXI_RADICALS_LIST'])),
+    'VARIANT_INDEX'        : (('KANGXI_RADICALS',), lambda r: build_variant_index(r['KANGXI_RADICALS'])),
+    'RADICAL_DB'           : (
+                                ('KANJI_DB', 'KANGXI_RADICALS', 'VARIANT_INDEX'),
+                                lambda r: build_radical_dict(r['KANJI_DB'], r['KANGXI_RADICALS'], r['VARIANT_INDEX'])
+                             ),
+    'KANJI_DICT'           : ((), _load_kanji_dict),
+}
+
+# resources built by dict(resources) / .items(), as load_kanji_resources used to return
+CORE_RESOURCES = ('KANJI_DB', 'RADICAL_DB', 'KANGXI_RADICALS', 'VARIANT_INDEX')
+
+class KanjiResources(Mapping):
+    """
+    Lazy, thread-safe container of the core kanji resources.
+
+    Each resource is built on first access (resources['VARIANT_INDEX'] or
+    resources.VARIANT_INDEX), together with the resources it depends on
+    only, then cached. Asking for VARIANT_INDEX reads kangxi_radicals.json
+    and never parses the Unihan file.
+
+    Every resource has its own lock : concurrent first accesses build it
+    once, while other resources stay available. Dependencies form a DAG,
+    so locks are always taken in dependency order and cannot deadlock.
+
+    As a mapping it exposes CORE_RESOURCES, like the dict formerly
+    returned by load_kanji_resources (iterating values builds them all).
+    Membership tests ('KANJI_DB' in resources, resources.keys()) never
+    build anything : the extra resources (KANJI_DICT...) are reachable by
+    name but are not keys.
+    """
 
-    with open('../data/kangxi_radicals.json', 'r', encoding='utf-8') as f:
-        KANGXI_RADICALS_LIST = json.load(f)
+    def __init__(self, unihan_path, kangxi_path, kanjidic_path=None):
+        self.unihan_path   = Path(unihan_path)
+        self.kangxi_path   = Path(kangxi_path)
+        self.kanjidic_path = Path(kanjidic_path) if kanjidic_path is not None else None
+
+        self._values = {}
+        self._locks  = {name: threading.Lock() for name in RESOURCE_BUILDERS}
+
+    def __getitem__(self, name):
+        if name in self._values:
+            return self._values[name]
+
+        if name not in RESOURCE_BUILDERS:
+            raise KeyError(name)
+
+        with self._locks[name]:
+            # another thread may have built it while we waited
+            if name not in self._values:
+                dependencies, builder = RESOURCE_BUILDERS[name]
+                for dependency in dependencies:
+                    self[dependency]
+                self._values[name] = builder(self)
+
+        return self._values[name]
+
+    def __getattr__(self, name):
+        if name.isupper() and name in RESOURCE_BUILDERS:
+            return self[name]
+        raise AttributeError(name)
+
+    def __contains__(self, name):
+        # Mapping.__contains__ would call __getitem__ and build the resource
+        return name in CORE_RESOURCES
+
+    def __iter__(self):
+        return iter(CORE_RESOURCES)
+
+    def __len__(self):
+        return len(CORE_RESOURCES)
+
+    def __repr__(self):
+        return f"KanjiResources(loaded={sorted(self._values)})"
+
+    def is_loaded(self, name):
+        """
+        True if the resource has already been built.
+        """
+        return name in self._values
+
+    def dependants(self, name):
+        """
+        Every resource built (directly or not) from the given one.
+        """
+        result  = set()
+        pending = [name]
+        while pending:
+            current = pending.pop()
+            for other, (dependencies, _) in RESOURCE_BUILDERS.items():
+                if current in dependencies and other not in result:
+                    result.add(other)
+                    pending.append(other)
+
+        return result
+
+    def invalidate(self, name):
+        """
+        Drop a cached resource and everything built from it.
+
+        The next access rebuilds them, e.g. after editing kangxi_radicals.json.
+        """
+        for stale in {name} | self.dependants(name):
+            with self._locks[stale]:
+                self._values.pop(stale, None)
+
+def load_kanji_resources(unihan_path, kangxi_path, kanjidic_path=None):
+    """
+    Return the core kanji resources as a lazy KanjiResources container.
+
+    Nothing is parsed here : each dictionary is built on first access.
+    """
+    return KanjiResources(unihan_path, kangxi_path, kanjidic_path)
 
-    KANGXI_RADICALS = index_kangxi_radicals(KANGXI_RADICALS_LIST)
-    VARIANT_INDEX   = build_variant_index(KANGXI_RADICALS)
-    RADICAL_DB      = build_radical_dict(KANJI_DB, KANGXI_RADICALS, VARIANT_INDEX)
-    
-    return {
-        'KANJI_DB'        : KANJI_DB,
-        'RADICAL_DB'      : RADICAL_DB,
-        'KANGXI_RADICALS' : KANGXI_RADICALS,
-        'VARIANT_INDEX'   : VARIANT_INDEX
-        }
-    
 #%%
 if __name__ == "__main__":
+    from pprint import pprint
+
     resources = load_kanji_resources(
         Path("../data/Unihan_CJKVI_database.txt"),
         Path("../data/kangxi_radicals.json")
@@ -419,29 +572,13 @@ if __name__ == "__main__":
 
     print("Loaded", len(resources["KANJI_DB"]), "kanji")
 
-#%% test
-
-parsed = parse_ids_minimal("⿰氵毎")
-ids_to_positioned_components(parsed)
+    # sanity checks on a known kanji
+    ids    = resources["KANJI_DB"]["海"]["ids"]
+    parsed = parse_ids_minimal(ids)
 
-#%%
-tree = resolve_kanji_tree("海", KANJI_DB)
-from pprint import pprint
-pprint(tree)
-#%% TEST
-unihan_data = parse_unihan_cjkvi(path)
-parsed = parse_ids_minimal(unihan_data["海"]["ids"])
-
-# 3. Interprétation en positions
-components = ids_to_positioned_components(parsed)
-#%%
-ids = unihan_data["海"]["ids"]
-parsed = parse_ids_minimal(ids)
-
-if parsed is None:
-    print("IDS non supporté :", repr(ids), "len =", len(ids))
-    
-ids = unihan_data["海"]["ids"]
-print(ids, len(ids), [c for c in ids])
+    if parsed is None:
+        print("IDS non supporté :", repr(ids), "len =", len(ids))
+    else:
+        pprint(ids_to_positioned_components(parsed))
 
-            
\ No newline at end of file
+    pprint(resolve_kanji_tree("海", resources["KANJI_DB"]))
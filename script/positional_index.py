@@ -0,0 +1,215 @@
+import numpy as np
+from parse_unihan_cjkvi import IDS_OPERATOR_POSITIONS
+
+#%%
+"""
+Position-aware component index.
+
+ids_to_positioned_components and extract_components_from_tree only keep
+the label of the immediate operator, and every operator other than ⿰ / ⿱
+comes back as None.
+
+Here every component of every decomposition is recorded with its full
+position path, from the outermost layout down to the component itself :
+
+    海 = ⿰氵每, 每 = ⿱𠂉母
+        氵 : ('left',)
+        每 : ('right',)
+        𠂉 : ('right', 'top')
+        母 : ('right', 'bottom')
+
+Paths go through the IDS nesting of an entry and then through the
+KANJI_DB entries of its components, so they reach the full depth.
+
+Posting lists (np.int32 kanji ids) are precomputed for :
+    - the full path             ("母" at ('right', 'bottom'))
+    - the outer position        ("氵" on the left of the whole kanji)
+    - any level of the path     ("⺮" at the top of some part)
+"""
+
+# compact integer codes for position labels, in IDS_OPERATOR_POSITIONS order
+POSITION_LABELS = tuple(dict.fromkeys(
+                    label
+                    for labels in IDS_OPERATOR_POSITIONS.values()
+                    for label in labels
+                    ))
+POSITION_CODES  = {label: code for code, label in enumerate(POSITION_LABELS)}
+
+def parse_ids_positioned(ids):
+    """
+    Parse an IDS string into its leaf components with their position paths.
+
+    Unlike parse_ids_trees, the ternary operators ⿲ and ⿳ are supported.
+
+    Parameters
+    ----------
+    ids : str
+        Clean IDS string (e.g. "⿱⿳亠口冖丁").
+
+    Returns
+    -------
+    list[tuple[str, tuple[str, ...]]] or None
+        (component, path) pairs in IDS order, None if the IDS is malformed.
+    """
+    leaves = []
+
+    def _parse(index, path):
+        if index >= len(ids):
+            raise ValueError("IDS string ended before all operands were read.")
+
+        char = ids[index]
+
+        if char not in IDS_OPERATOR_POSITIONS:
+            leaves.append((char, path))
+            return index + 1
+
+        next_index = index + 1
+        for position in IDS_OPERATOR_POSITIONS[char]:
+            next_index = _parse(next_index, path + (position,))
+
+        return next_index
+
+    try:
+        final_index = _parse(0, ())
+    except ValueError:
+        return None
+
+    if final_index != len(ids):
+        return None
+
+    return leaves
+
+#%%
+def build_positional_index(kanji_db):
+    """
+    Build the position-aware component index over the whole database.
+
+    Parameters
+    ----------
+    kanji_db : dict
+        Normalised kanji database (KANJI_DB).
+
+    Returns
+    -------
+    dict
+        {
+          'kanji'      : list[str]  kanji id -> character (KANJI_DB order),
+          'paths'      : dict[str, list[tuple[str, tuple]]]  char -> (component, path),
+          'by_path'    : dict[(str, tuple), np.ndarray]  (component, path) -> kanji ids,
+          'by_outer'   : dict[(str, str), np.ndarray]    (component, outer position) -> kanji ids,
+          'by_any'     : dict[(str, str), np.ndarray]    (component, any position) -> kanji ids
+        }
+    """
+    paths       = {}
+    in_progress = set()
+
+    def _resolve(char):
+        # memoised full-depth expansion of a character
+        if char in paths:
+            return paths[char]
+
+        entry = kanji_db.get(char)
+        # atomic component, unknown character or cycle back-edge
+        if entry is None or char in in_progress:
+            return []
+
+        leaves = parse_ids_positioned(entry['ids']) or []
+
+        in_progress.add(char)
+        result = []
+        for component, path in leaves:
+            result.append((component, path))
+            for sub_component, sub_path in _resolve(component):
+                result.append((sub_component, path + sub_path))
+        in_progress.discard(char)
+
+        paths[char] = result
+        return result
+
+    kanji = list(kanji_db)
+
+    by_path  = {}
+    by_outer = {}
+    by_any   = {}
+    for kanji_id, char in enumerate(kanji):
+        seen_path  = set()
+        seen_outer = set()
+        seen_any   = set()
+
+        for component, path in _resolve(char):
+            seen_path.add((component, path))
+            seen_outer.add((component, path[0]))
+            seen_any.update((component, position) for position in path)
+
+        # kanji ids are appended in increasing order : posting lists stay sorted
+        for key in seen_path:
+            by_path.setdefault(key, []).append(kanji_id)
+        for key in seen_outer:
+            by_outer.setdefault(key, []).append(kanji_id)
+        for key in seen_any:
+            by_any.setdefault(key, []).append(kanji_id)
+
+    def _freeze(postings):
+        return {key: np.asarray(ids, dtype=np.int32) for key, ids in postings.items()}
+
+    return {
+        'kanji'    : kanji,
+        'paths'    : paths,
+        'by_path'  : _freeze(by_path),
+        'by_outer' : _freeze(by_outer),
+        'by_any'   : _freeze(by_any)
+    }
+
+#%%
+def component_at(positional_index, component, position, level='outer', variant_index=None):
+    """
+    Return every kanji containing `component` at a given position.
+
+    Parameters
+    ----------
+    positional_index : dict
+        Index returned by build_positional_index.
+    component : str
+        Component character (IDS form, e.g. 氵 rather than 水).
+    position : str or tuple[str, ...]
+        A label from IDS_OPERATOR_POSITIONS, or a full path when level='path'.
+    level : {'outer', 'any', 'path'}
+        'outer' : position of the outermost layout ("氵 on the left"),
+        'any'   : position at any nesting level,
+        'path'  : exact full position path.
+    variant_index : dict, optional
+        VARIANT_INDEX. When given, every form of the same Kangxi radical
+        is matched (⺮ also finds the 竹 written in the IDS data).
+
+    Returns
+    -------
+    list[str]
+        Matching kanji, in KANJI_DB order.
+    """
+    if level == 'path':
+        postings = positional_index['by_path']
+        position = tuple(position)
+    elif level in ('outer', 'any'):
+        postings = positional_index['by_' + level]
+    else:
+        raise ValueError(f"Unsupported position level: {level}")
+
+    forms = [component]
+    if variant_index is not None and component in variant_index:
+        radical = variant_index[component]
+        forms   = [form for form, canonical in variant_index.items() if canonical == radical]
+
+    hits = [postings[(form, position)] for form in forms if (form, position) in postings]
+    if not hits:
+        return []
+
+    ids   = hits[0] if len(hits) == 1 else np.unique(np.concatenate(hits))
+    kanji = positional_index['kanji']
+
+    return [kanji[i] for i in ids]
+
+def component_paths(positional_index, char):
+    """
+    Return the (component, position path) pairs of a character, full depth.
+    """
+    return positional_index['paths'].get(char, [])
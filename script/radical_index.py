@@ -0,0 +1,179 @@
+import numpy as np
+from positional_index import POSITION_CODES, POSITION_LABELS, build_positional_index
+
+#%%
+"""
+Full-depth radical inverted index.
+
+build_radical_dict only reads the top-level `components` of each entry,
+so a kanji whose radical sits two levels down never appears under it,
+and it copies a metadata dict per radical and per kanji.
+
+This index is built in a single pass over the memoised positional
+decomposition (build_positional_index) and stores, for each Kangxi
+radical number 1-214, compact parallel arrays of hits :
+
+    kanji           int32   kanji id (KANJI_DB order)
+    depth           uint8   length of the position path (1 = operand of the outer layout)
+    position        uint8   code of the immediate position label (POSITION_LABELS)
+    outer_position  uint8   code of the outermost position label
+    form            uint32  codepoint of the IDS form found (氵 for radical 85)
+
+Hits of radical n are the slice offsets[n]:offsets[n + 1], sorted by kanji id.
+Radical metadata stays in KANGXI_RADICALS instead of being copied.
+"""
+
+N_RADICALS = 214
+
+def build_radical_index(kanji_db, variant_index, kangxi_radicals, positional_index=None):
+    """
+    Build the full-depth radical -> kanji inverted index.
+
+    Parameters
+    ----------
+    kanji_db : dict
+        Normalised kanji database (KANJI_DB).
+    variant_index : dict
+        Variant form -> canonical Kangxi radical (VARIANT_INDEX).
+    kangxi_radicals : dict
+        Indexed Kangxi radicals (KANGXI_RADICALS).
+    positional_index : dict, optional
+        Prebuilt build_positional_index result, built if omitted.
+
+    Returns
+    -------
+    dict
+        {
+          'kanji'          : list[str]   kanji id -> character,
+          'offsets'        : np.ndarray  length N_RADICALS + 2, indexed by radical number,
+          'hit_kanji'      : np.ndarray,
+          'depth'          : np.ndarray,
+          'position'       : np.ndarray,
+          'outer_position' : np.ndarray,
+          'form'           : np.ndarray
+        }
+    """
+    if positional_index is None:
+        positional_index = build_positional_index(kanji_db)
+
+    # IDS form -> radical number, resolved once
+    form_to_number = {
+        form: kangxi_radicals[radical]['id']
+        for form, radical in variant_index.items()
+        if radical in kangxi_radicals
+        }
+
+    numbers        = []
+    hit_kanji      = []
+    depth          = []
+    position       = []
+    outer_position = []
+    form           = []
+
+    # one pass over the memoised decomposition
+    paths = positional_index['paths']
+    for kanji_id, char in enumerate(positional_index['kanji']):
+        seen = set()
+        for component, path in paths.get(char, ()):
+            number = form_to_number.get(component)
+            if number is None or (component, path) in seen:
+                continue
+            seen.add((component, path))
+
+            numbers.append(number)
+            hit_kanji.append(kanji_id)
+            depth.append(len(path))
+            position.append(POSITION_CODES[path[-1]])
+            outer_position.append(POSITION_CODES[path[0]])
+            form.append(ord(component))
+
+    numbers = np.asarray(numbers, dtype=np.int16)
+    # hits were produced in kanji order : a stable sort groups them by radical
+    order   = np.argsort(numbers, kind='stable')
+
+    offsets = np.zeros(N_RADICALS + 2, dtype=np.int64)
+    np.cumsum(np.bincount(numbers, minlength=N_RADICALS + 1), out=offsets[1:])
+
+    return {
+        'kanji'          : positional_index['kanji'],
+        'offsets'        : offsets,
+        'hit_kanji'      : np.asarray(hit_kanji, dtype=np.int32)[order],
+        'depth'          : np.asarray(depth, dtype=np.uint8)[order],
+        'position'       : np.asarray(position, dtype=np.uint8)[order],
+        'outer_position' : np.asarray(outer_position, dtype=np.uint8)[order],
+        'form'           : np.asarray(form, dtype=np.uint32)[order]
+    }
+
+#%%
+def radical_hits(radical_index, number, max_depth=None, position=None, outer_position=None):
+    """
+    Return the hits of a radical as a dict of array slices.
+
+    Parameters
+    ----------
+    radical_index : dict
+        Index returned by build_radical_index.
+    number : int
+        Kangxi radical number (1-214).
+    max_depth : int, optional
+        Keep only hits at most this deep (1 = operands of the outer layout).
+    position, outer_position : str, optional
+        Keep only hits with this immediate / outermost position label.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        'kanji', 'depth', 'position', 'outer_position', 'form' columns.
+    """
+    if not 1 <= number <= N_RADICALS:
+        raise ValueError(f"Radical number must be between 1 and {N_RADICALS}: {number}")
+
+    start, stop = radical_index['offsets'][number], radical_index['offsets'][number + 1]
+    columns     = {
+        'kanji'          : radical_index['hit_kanji'][start:stop],
+        'depth'          : radical_index['depth'][start:stop],
+        'position'       : radical_index['position'][start:stop],
+        'outer_position' : radical_index['outer_position'][start:stop],
+        'form'           : radical_index['form'][start:stop]
+    }
+
+    keep = np.ones(stop - start, dtype=bool)
+    if max_depth is not None:
+        keep &= columns['depth'] <= max_depth
+    if position is not None:
+        keep &= columns['position'] == POSITION_CODES[position]
+    if outer_position is not None:
+        keep &= columns['outer_position'] == POSITION_CODES[outer_position]
+
+    if keep.all():
+        return columns
+
+    return {name: values[keep] for name, values in columns.items()}
+
+def kanji_for_radical(radical_index, number, **filters):
+    """
+    Return the distinct kanji containing radical `number` at any depth.
+
+    Keyword arguments are forwarded to radical_hits.
+    """
+    hits  = radical_hits(radical_index, number, **filters)
+    kanji = radical_index['kanji']
+
+    # hits are sorted by kanji id : drop consecutive duplicates
+    ids = hits['kanji']
+    if len(ids):
+        ids = ids[np.concatenate(([True], ids[1:] != ids[:-1]))]
+
+    return [kanji[i] for i in ids]
+
+def describe_hit(radical_index, hits, i):
+    """
+    Decode the i-th hit of a radical_hits result into readable values.
+    """
+    return {
+        'kanji'          : radical_index['kanji'][hits['kanji'][i]],
+        'depth'          : int(hits['depth'][i]),
+        'position'       : POSITION_LABELS[hits['position'][i]],
+        'outer_position' : POSITION_LABELS[hits['outer_position'][i]],
+        'ids_form'       : chr(hits['form'][i])
+    }
@@ -0,0 +1,276 @@
+import numpy as np
+from component_closure import build_component_closure_index
+from kanji_dict_xml import field_to_int
+
+#%%
+"""
+Multi-radical kanji search engine.
+
+Classic multi-radical lookup : "pick 氵 + 每 + stroke count <= 10 -> candidates".
+
+Every component (canonicalised through VARIANT_INDEX, so 氵 / 氺 / 水 share
+one key) owns a compressed bitmap over all KANJI_DB characters, built
+from the transitive closure index. Two container kinds are used, roaring style :
+    - 'array'  : sorted uint32 kanji ids, for sparse components
+    - 'bitmap' : packed uint64 words, for dense components
+                 (more than one kanji in 32 contains them)
+
+A query intersects the selected containers smallest first, applies the
+stroke-count and JLPT filters on flat arrays, then reports the set of
+components which can still be added without emptying the result
+(the "valid next radicals").
+"""
+
+# former JLPT levels stored in KANJIDIC2
+JLPT_LEVELS = (1, 2, 3, 4)
+
+# a sorted uint32 array costs 32 bits per kanji, a bitmap 1 bit per kanji in the universe
+DENSE_RATIO = 32
+
+def canonical_component(char, variant_index):
+    """
+    Map an IDS component to its canonical search key (Kangxi radical if known).
+    """
+    return variant_index.get(char, char)
+
+def build_container(kanji_ids, n_kanji):
+    """
+    Build the compressed container of a sorted array of kanji ids.
+
+    Returns
+    -------
+    tuple
+        ('array', np.ndarray[uint32]) or ('bitmap', np.ndarray[uint64])
+    """
+    if len(kanji_ids) * DENSE_RATIO <= n_kanji:
+        return ('array', np.asarray(kanji_ids, dtype=np.uint32))
+
+    words = np.zeros((n_kanji + 63) // 64, dtype=np.uint64)
+    ids   = np.asarray(kanji_ids, dtype=np.uint64)
+    np.bitwise_or.at(words, ids >> np.uint64(6), np.uint64(1) << (ids & np.uint64(63)))
+
+    return ('bitmap', words)
+
+def container_to_ids(container):
+    """
+    Decode a container into a sorted array of kanji ids.
+    """
+    kind, data = container
+
+    if kind == 'array':
+        return data.astype(np.int64)
+
+    bits = np.unpackbits(data.view(np.uint8), bitorder='little')
+    return np.flatnonzero(bits)
+
+def intersect_container(ids, container):
+    """
+    Keep only the kanji ids present in a container.
+    """
+    kind, data = container
+
+    if not len(ids):
+        return ids
+
+    if kind == 'bitmap':
+        word = data[ids >> 6]
+        keep = (word >> (ids & 63).astype(np.uint64)) & np.uint64(1)
+        return ids[keep.astype(bool)]
+
+    # sparse container : binary search every candidate
+    pos  = np.searchsorted(data, ids)
+    pos  = np.minimum(pos, len(data) - 1)
+    return ids[data[pos] == ids] if len(data) else ids[:0]
+
+#%%
+def build_radical_search_index(kanji_db, variant_index, kangxi_radicals, kanji_dict=None, closure_index=None):
+    """
+    Build the multi-radical search index.
+
+    Parameters
+    ----------
+    kanji_db : dict
+        Normalised kanji database (KANJI_DB).
+    variant_index : dict
+        Variant form -> canonical Kangxi radical (VARIANT_INDEX).
+    kangxi_radicals : dict
+        Indexed Kangxi radicals (KANGXI_RADICALS).
+    kanji_dict : dict, optional
+        Parsed KANJIDIC2 dictionary (kanji_XML_parser_dic2), used for the
+        stroke-count and JLPT filters. Characters missing from it are
+        excluded whenever such a filter is requested.
+    closure_index : dict, optional
+        Prebuilt build_component_closure_index result, built if omitted.
+
+    Returns
+    -------
+    dict
+        Search index consumed by search_by_components.
+    """
+    if closure_index is None:
+        closure_index = build_component_closure_index(kanji_db)
+
+    kanji   = closure_index['kanji']
+    n_kanji = len(kanji)
+
+    # canonical key space : raw component id -> canonical key id
+    keys           = []
+    key_ids        = {}
+    raw_to_key     = np.empty(len(closure_index['components']), dtype=np.int32)
+    for raw_id, char in enumerate(closure_index['components']):
+        key = canonical_component(char, variant_index)
+        if key not in key_ids:
+            key_ids[key] = len(keys)
+            keys.append(key)
+        raw_to_key[raw_id] = key_ids[key]
+
+    # (kanji id, key id) pairs, deduplicated across variant forms
+    offsets    = closure_index['posting_offsets']
+    pair_raw   = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+    pair_key   = raw_to_key[pair_raw].astype(np.int64)
+    pair_kanji = closure_index['posting_kanji'].astype(np.int64)
+    pairs      = np.unique(pair_key * n_kanji + pair_kanji)
+    pair_key   = pairs // n_kanji
+    pair_kanji = pairs %  n_kanji
+
+    # per-key containers (pairs are sorted by key, then kanji id)
+    bounds     = np.searchsorted(pair_key, np.arange(len(keys) + 1))
+    containers = [
+        build_container(pair_kanji[bounds[i]:bounds[i + 1]], n_kanji)
+        for i in range(len(keys))
+        ]
+    cardinality = np.diff(bounds)
+
+    # kanji -> key ids CSR, for the valid next radicals
+    order              = np.argsort(pair_kanji, kind='stable')
+    kanji_keys         = pair_key[order].astype(np.int32)
+    kanji_key_offsets  = np.zeros(n_kanji + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pair_kanji, minlength=n_kanji), out=kanji_key_offsets[1:])
+
+    # filter columns
+    kanji_dict = kanji_dict or {}
+    strokes    = np.full(n_kanji, -1, dtype=np.int16)
+    jlpt       = np.zeros(n_kanji, dtype=np.int8)
+    for i, char in enumerate(kanji):
+        data = kanji_dict.get(char)
+        if data is None:
+            continue
+        strokes[i] = field_to_int(data.get('stroke_count'), -1)
+        jlpt[i]    = field_to_int(data.get('jlpt'), 0)
+
+    is_radical = np.array([key in kangxi_radicals for key in keys], dtype=bool)
+
+    return {
+        'kanji'             : kanji,
+        'keys'              : keys,
+        'key_ids'           : key_ids,
+        'containers'        : containers,
+        'cardinality'       : cardinality,
+        'kanji_keys'        : kanji_keys,
+        'kanji_key_offsets' : kanji_key_offsets,
+        'strokes'           : strokes,
+        'jlpt'              : jlpt,
+        'is_radical'        : is_radical,
+        'variant_index'     : variant_index
+    }
+
+#%%
+def _gather_keys(search_index, ids):
+    """
+    Concatenate the key ids of every candidate kanji (vectorised CSR gather).
+    """
+    offsets = search_index['kanji_key_offsets']
+    starts  = offsets[ids]
+    lengths = offsets[ids + 1] - starts
+    total   = int(lengths.sum())
+
+    if not total:
+        return np.empty(0, dtype=np.int32)
+
+    # position of each gathered item : start of its run + rank inside the run
+    run_start = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return search_index['kanji_keys'][run_start + np.arange(total)]
+
+def search_by_components(search_index, components, min_strokes=None, max_strokes=None,
+                         jlpt_levels=None, radicals_only=False):
+    """
+    Find every kanji containing all the selected components.
+
+    Parameters
+    ----------
+    search_index : dict
+        Index returned by build_radical_search_index.
+    components : iterable[str]
+        Selected components, any variant form (氵, 水 and 氺 are equivalent).
+    min_strokes, max_strokes : int, optional
+        Inclusive stroke-count bounds.
+    jlpt_levels : iterable[int], optional
+        Former JLPT levels (1-4) to keep.
+    radicals_only : bool, optional
+        Restrict the valid next components to Kangxi radicals.
+
+    Raises
+    ------
+    ValueError
+        If a JLPT level is outside 1-4.
+
+    Returns
+    -------
+    dict
+        {
+          'kanji'           : list[str] candidates, in KANJI_DB order,
+          'next_components' : list[str] components which can still be added
+        }
+    """
+    if jlpt_levels is not None:
+        # validated before the int8 comparison, which would overflow
+        jlpt_levels = [int(level) for level in jlpt_levels]
+        invalid     = [level for level in jlpt_levels if level not in JLPT_LEVELS]
+        if invalid:
+            raise ValueError(f"JLPT levels must be in 1-4, got {invalid}")
+
+    key_ids    = search_index['key_ids']
+    containers = search_index['containers']
+    selected   = set()
+
+    for comp in components:
+        key_id = key_ids.get(canonical_component(comp, search_index['variant_index']))
+        # unknown component : nothing can match
+        if key_id is None:
+            return {'kanji': [], 'next_components': []}
+        selected.add(key_id)
+
+    # 1. intersect containers, smallest first
+    if selected:
+        ordered = sorted(selected, key=lambda k: search_index['cardinality'][k])
+        ids     = container_to_ids(containers[ordered[0]])
+        for key_id in ordered[1:]:
+            ids = intersect_container(ids, containers[key_id])
+    else:
+        ids = np.arange(len(search_index['kanji']))
+
+    # 2. flat column filters
+    if min_strokes is not None or max_strokes is not None:
+        strokes = search_index['strokes'][ids]
+        keep    = strokes >= max(min_strokes or 0, 0)
+        if max_strokes is not None:
+            keep &= strokes <= max_strokes
+        ids = ids[keep]
+
+    if jlpt_levels is not None:
+        ids = ids[np.isin(search_index['jlpt'][ids], np.asarray(jlpt_levels, dtype=np.int8))]
+
+    # 3. valid next components : union of candidate components minus the selection
+    present = np.zeros(len(search_index['keys']), dtype=bool)
+    present[_gather_keys(search_index, ids)] = True
+    present[list(selected)] = False
+    if radicals_only:
+        present &= search_index['is_radical']
+
+    kanji = search_index['kanji']
+    keys  = search_index['keys']
+
+    return {
+        'kanji'           : [kanji[i] for i in ids],
+        'next_components' : [keys[i] for i in np.flatnonzero(present)]
+    }
@@ -0,0 +1,268 @@
+import numpy as np
+from kanji_metrics import metrics_to_columns, percentile_ranks
+from text_annotation import KANJI_RUN
+from kanji_dict_xml import field_to_int
+
+#%%
+"""
+Kanji difficulty profile of documents, for grading reading material.
+
+build_difficulty_features precomputes, once, one array entry per kanji :
+
+    level       1-4  former JLPT 4 (easiest) to JLPT 1
+                5    in KANJIDIC2, outside the JLPT lists
+                6    not in KANJIDIC2
+    difficulty  0-1  weighted mix (DIFFICULTY_WEIGHTS) of the level, the
+                     school grade, the KANJIDIC2 frequency rank and the
+                     structural complexity (mean percentile of the
+                     kanji_complexity_metrics)
+
+plus a dense code point -> kanji id table. score_documents then scores a
+batch of documents without any per-kanji Python work : the kanji of the
+batch become one code point array, mapped to ids with one gather, and
+every per-document aggregate is a np.bincount over the document index.
+
+A learner's known kanji are a boolean mask over the ids (known_mask) :
+the unknown ratio is the share of kanji occurrences outside it.
+
+    features = build_difficulty_features(kanji_dict, metrics)
+    known    = known_mask(features, '日本人学生先...')
+    profiles = score_documents(texts, features, known)
+"""
+
+LEVELS          = 6
+LEVEL_NO_JLPT   = 5
+LEVEL_UNLISTED  = 6
+
+# former JLPT level (4 easiest, 1 hardest) -> difficulty level
+JLPT_LEVELS     = {4: 1, 3: 2, 2: 3, 1: 4}
+
+DIFFICULTY_WEIGHTS = {
+    'level'      : 0.4,
+    'grade'      : 0.2,
+    'frequency'  : 0.2,
+    'complexity' : 0.2
+}
+
+MAX_GRADE = 10
+
+# documents scored per vectorised pass
+BATCH_SIZE = 1024
+
+def build_difficulty_features(kanji_dict, metrics=None, weights=DIFFICULTY_WEIGHTS):
+    """
+    Precompute the per-kanji difficulty feature arrays.
+
+    Parameters
+    ----------
+    kanji_dict : dict
+        Parsed KANJIDIC2 dictionary.
+    metrics : dict[str, dict], optional
+        compute_all_kanji_metrics result ; without it the complexity
+        component is 0.5 for every kanji.
+    weights : dict[str, float], optional
+        Weight of each difficulty component, see DIFFICULTY_WEIGHTS.
+
+    Returns
+    -------
+    dict
+        {
+          'kanji'      : list[str], id -> kanji,
+          'kanji_ids'  : dict[str, int],
+          'index'      : np.ndarray int32, code point -> id (unlisted id when absent),
+          'level'      : np.ndarray int8,
+          'grade'      : np.ndarray int8 (0 when unknown),
+          'frequency'  : np.ndarray int16 (0 when unranked),
+          'complexity' : np.ndarray float64 in [0, 1],
+          'difficulty' : np.ndarray float64 in [0, 1]
+        }
+        Every array has one extra last entry, the unlisted id, shared by
+        the kanji absent from KANJIDIC2 and the metrics.
+    """
+    metrics   = metrics or {}
+    kanji     = list(dict.fromkeys([*kanji_dict, *metrics]))
+    kanji_ids = {char: i for i, char in enumerate(kanji)}
+    size      = len(kanji) + 1
+
+    level     = np.full(size, LEVEL_UNLISTED, dtype=np.int8)
+    grade     = np.zeros(size, dtype=np.int8)
+    frequency = np.zeros(size, dtype=np.int16)
+    for char, data in kanji_dict.items():
+        i            = kanji_ids[char]
+        level[i]     = JLPT_LEVELS.get(field_to_int(data.get('jlpt'), 0), LEVEL_NO_JLPT)
+        grade[i]     = field_to_int(data.get('grade'), 0)
+        frequency[i] = field_to_int(data.get('frequency'), 0)
+
+    # structural complexity : mean percentile over the metrics
+    complexity = np.full(size, 0.5)
+    if metrics:
+        names, columns = metrics_to_columns(metrics)
+        ids            = np.fromiter((kanji_ids[char] for char in names), dtype=np.int64, count=len(names))
+        complexity[ids] = np.mean([percentile_ranks(column) for column in columns.values()], axis=0)
+    complexity[-1] = 1.0
+
+    # every component in [0, 1], 1 = hardest ; missing grade / rank count as hardest
+    # (frequency ranks go up to 2501 in KANJIDIC2 : scaled by the actual maximum)
+    max_rank   = max(int(frequency.max()), 1)
+    components = {
+        'level'      : (level - 1) / (LEVELS - 1),
+        'grade'      : np.minimum(np.where(grade > 0, grade, MAX_GRADE) / MAX_GRADE, 1.0),
+        'frequency'  : np.where(frequency > 0, frequency, max_rank) / max_rank,
+        'complexity' : complexity
+    }
+    total      = sum(weights.values())
+    difficulty = sum(weight * components[name] for name, weight in weights.items()) / total
+
+    codepoints = np.fromiter((ord(char) for char in kanji), dtype=np.int64, count=len(kanji))
+    index      = np.full(int(codepoints.max(initial=0)) + 1, size - 1, dtype=np.int32)
+    index[codepoints] = np.arange(len(kanji), dtype=np.int32)
+
+    return {
+        'kanji'      : kanji,
+        'kanji_ids'  : kanji_ids,
+        'index'      : index,
+        'level'      : level,
+        'grade'      : grade,
+        'frequency'  : frequency,
+        'complexity' : complexity,
+        'difficulty' : difficulty
+    }
+
+def known_mask(features, known_kanji):
+    """
+    Boolean mask over the feature ids of a learner's known kanji.
+
+    Parameters
+    ----------
+    known_kanji : iterable[str]
+        Known kanji (a string or any iterable of characters).
+    """
+    mask = np.zeros(len(features['level']), dtype=bool)
+    ids  = [features['kanji_ids'][char] for char in set(known_kanji) if char in features['kanji_ids']]
+    mask[ids] = True
+
+    return mask
+
+def _kanji_ids(features, texts):
+    """
+    Map the kanji of a batch of texts to feature ids.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        Ids and code points of every kanji occurrence, and the document of
+        each occurrence.
+    """
+    runs    = [''.join(KANJI_RUN.findall(text)) for text in texts]
+    lengths = np.fromiter(map(len, runs), dtype=np.int64, count=len(runs))
+
+    codepoints = np.frombuffer(''.join(runs).encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    index      = features['index']
+    unlisted   = len(features['level']) - 1
+    ids        = np.where(codepoints < len(index), index[np.minimum(codepoints, len(index) - 1)], unlisted)
+
+    return ids, codepoints, np.repeat(np.arange(len(texts)), lengths)
+
+#%%
+def _score_batch(texts, features, known):
+    ids, codepoints, documents = _kanji_ids(features, texts)
+    count                      = len(texts)
+    size                       = len(features['level'])
+    unlisted                   = size - 1
+
+    occurrences = np.bincount(documents, minlength=count)
+    safe        = np.maximum(occurrences, 1)
+    difficulty  = features['difficulty'][ids]
+
+    # occurrences per (document, level) : distribution and max level at once
+    levels       = features['level'][ids].astype(np.int64)
+    distribution = np.bincount(documents * (LEVELS + 1) + levels, minlength=count * (LEVELS + 1))
+    distribution = distribution.reshape(count, LEVELS + 1)[:, 1:]
+    present      = distribution > 0
+    max_level    = np.where(present.any(axis=1), LEVELS - np.argmax(present[:, ::-1], axis=1), 0)
+
+    max_difficulty = np.zeros(count)
+    np.maximum.at(max_difficulty, documents, difficulty)
+
+    # distinct kanji per document : sort + adjacent difference, cheaper than np.unique.
+    # Kanji share the unlisted id : they are told apart by code point (keys >= size)
+    space         = size + 0x110000
+    keys          = np.sort(documents * space + np.where(ids == unlisted, size + codepoints, ids))
+    distinct_keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+    distinct_docs = distinct_keys // space
+    distinct_ids  = np.minimum(distinct_keys % space, unlisted)
+
+    unknown_ids = ~known if known is not None else features['level'] == LEVEL_UNLISTED
+    unknown     = unknown_ids[ids]
+
+    return {
+        'kanji'             : occurrences,
+        'distinct'          : np.bincount(distinct_docs, minlength=count),
+        'level_share'       : distribution / safe[:, None],
+        'max_level'         : max_level.astype(np.int8),
+        'mean_difficulty'   : np.bincount(documents, weights=difficulty, minlength=count) / safe,
+        'max_difficulty'    : max_difficulty,
+        'unknown_ratio'     : np.bincount(documents, weights=unknown.astype(np.float64), minlength=count) / safe,
+        'unknown_distinct'  : np.bincount(distinct_docs[unknown_ids[distinct_ids]], minlength=count)
+    }
+
+def score_documents(texts, features, known=None, batch_size=BATCH_SIZE):
+    """
+    Difficulty profile of every document, scored in vectorised batches.
+
+    Parameters
+    ----------
+    texts : iterable[str]
+        Documents.
+    features : dict
+        Result of build_difficulty_features.
+    known : np.ndarray[bool], optional
+        known_mask of the learner. Without it, the unknown kanji are the
+        ones absent from KANJIDIC2.
+    batch_size : int, optional
+        Documents per vectorised pass (bounds the memory used).
+
+    Returns
+    -------
+    dict
+        One array per profile field, aligned with the documents :
+        {
+          'kanji'            : kanji occurrences,
+          'distinct'         : distinct kanji,
+          'level_share'      : (documents, LEVELS) share of the occurrences per level,
+          'max_level'        : highest level present (0 without kanji),
+          'mean_difficulty'  : mean difficulty per occurrence,
+          'max_difficulty'   : hardest kanji difficulty,
+          'unknown_ratio'    : share of the occurrences not known,
+          'unknown_distinct' : distinct kanji not known
+        }
+    """
+    batches = []
+    batch   = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) == batch_size:
+            batches.append(_score_batch(batch, features, known))
+            batch = []
+    if batch or not batches:
+        batches.append(_score_batch(batch, features, known))
+
+    return {key: np.concatenate([scores[key] for scores in batches]) for key in batches[0]}
+
+def document_profile(text, features, known=None):
+    """
+    Difficulty profile of a single document, as plain Python values.
+
+    Returns
+    -------
+    dict
+        score_documents fields for this document, 'level_share' as a
+        level -> share dict.
+    """
+    scores  = score_documents([text], features, known)
+    profile = {key: values[0].item() for key, values in scores.items() if key != 'level_share'}
+    profile['level_share'] = {
+        level: round(float(share), 4) for level, share in enumerate(scores['level_share'][0], start=1)
+    }
+
+    return profile
@@ -0,0 +1,413 @@
+import bisect
+import functools
+import json
+import mmap
+import struct
+import time
+from collections.abc import Mapping
+from pathlib import Path
+
+#%%
+"""
+Precompiled resource bundle, memory-mapped in milliseconds.
+
+Every process used to rebuild KANJI_DB, KANGXI_RADICALS, VARIANT_INDEX,
+RADICAL_DB and the KANJIDIC2 dictionary from the text sources. build-bundle
+serialises all of them, plus derived indexes, into one versioned file :
+
+    header      magic (8 bytes), format version (uint32), directory length (uint32)
+    directory   JSON : bundle metadata and, for every table, the absolute
+                offsets of its four sections
+    tables      one per resource, each made of
+                    key_offsets     uint64[count + 1]
+                    value_offsets   uint64[count + 1]
+                    key_pool        UTF-8 keys, sorted by their bytes
+                    value_pool      compact JSON values
+                    order           uint32[count], sorted position of each
+                                    key in the source dict order
+                    codepoints      uint32[count], only when every key is
+                                    a single character
+
+open_bundle maps the file and returns one read-only Mapping per table.
+A lookup binary-searches the keys (the codepoints array when present, in C,
+otherwise the key pool) and decodes only the requested value, straight from the mapped pages : nothing
+is deserialised up front and the pages are shared between processes.
+
+The tables are Mappings with the same keys and values as the original
+dicts, iterated in the same order (the 'order' section), so
+resolve_kanji_tree_enriched and the other functions taking
+KANJI_DB, VARIANT_INDEX... accept them unchanged.
+"""
+
+BUNDLE_MAGIC          = b'KANJIBDL'
+# 2 : 'codepoints' and 'order' sections
+BUNDLE_FORMAT_VERSION = 2
+HEADER                = struct.Struct('<8sII')
+ALIGNMENT             = 8
+
+# resources copied as they are from a KanjiResources container
+BUNDLE_RESOURCES = ('KANJI_DB', 'KANGXI_RADICALS', 'VARIANT_INDEX', 'RADICAL_DB')
+
+def _encode_value(value):
+    """
+    Compact JSON encoding of a table value (sets become sorted lists).
+    """
+    if isinstance(value, (set, frozenset)):
+        value = sorted(value)
+
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def _pad(buffer):
+    """
+    Pad a bytearray to the section alignment, return its new length.
+    """
+    buffer.extend(b'\0' * (-len(buffer) % ALIGNMENT))
+
+    return len(buffer)
+
+def _table_sections(table):
+    """
+    Serialise one dict into its sections.
+
+    Returns
+    -------
+    tuple[int, dict[str, bytes]]
+        (count, section name -> bytes). Tables keyed by single characters
+        also get a 'codepoints' section.
+    """
+    # (key bytes, position in the dict) : sorted for the lookups, order kept for iteration
+    items = sorted(
+        (str(key).encode('utf-8'), position, value) for position, (key, value) in enumerate(table.items())
+    )
+
+    key_offsets   = [0]
+    value_offsets = [0]
+    key_pool      = bytearray()
+    value_pool    = bytearray()
+    order         = [0] * len(items)
+    for i, (key, position, value) in enumerate(items):
+        order[position] = i
+        key_pool.extend(key)
+        value_pool.extend(_encode_value(value))
+        key_offsets.append(len(key_pool))
+        value_offsets.append(len(value_pool))
+
+    pack = lambda code, values: struct.pack(f'<{len(values)}{code}', *values)
+
+    sections = {
+        'key_offsets'   : pack('Q', key_offsets),
+        'value_offsets' : pack('Q', value_offsets),
+        'key_pool'      : bytes(key_pool),
+        'value_pool'    : bytes(value_pool),
+        'order'         : pack('I', order)
+    }
+
+    # UTF-8 byte order is code point order : same positions as the key pool
+    keys = [key.decode('utf-8') for key, _, _ in items]
+    if all(len(key) == 1 for key in keys):
+        sections['codepoints'] = pack('I', [ord(key) for key in keys])
+
+    return len(items), sections
+
+def bundle_bytes(tables, metadata=None):
+    """
+    Serialise dict tables into the bundle layout, in memory.
+
+    Parameters
+    ----------
+    tables : dict[str, dict]
+        Table name -> dict keyed by str, with JSON-serialisable values.
+    metadata : dict, optional
+        Extra JSON-serialisable information stored in the directory
+        (sources, build time...).
+
+    Returns
+    -------
+    bytearray
+    """
+    sections  = {name: _table_sections(table) for name, table in tables.items()}
+    directory = {'metadata': metadata or {}, 'tables': {}}
+
+    # offsets depend on the directory size, which depends on the offsets :
+    # lay the tables out after a directory padded to a fixed upper bound
+    def _layout(start):
+        layout   = {}
+        position = start
+        for name, (count, parts) in sections.items():
+            entry = {'count': count}
+            for part_name, part in parts.items():
+                entry[part_name] = position
+                position        += len(part) + (-len(part) % ALIGNMENT)
+            entry['end'] = position
+            layout[name] = entry
+
+        return layout
+
+    directory['tables'] = _layout(0)
+    reserved            = len(json.dumps(directory).encode('utf-8')) + 64 * len(sections) + 64
+    start               = HEADER.size + reserved + (-(HEADER.size + reserved) % ALIGNMENT)
+    directory['tables'] = _layout(start)
+
+    encoded = json.dumps(directory, ensure_ascii=False).encode('utf-8')
+    if len(encoded) > reserved:
+        raise ValueError("Bundle directory larger than its reserved space")
+
+    buffer = bytearray(HEADER.pack(BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, len(encoded)))
+    buffer.extend(encoded)
+    buffer.extend(b'\0' * (start - len(buffer)))
+
+    for name, (_, parts) in sections.items():
+        for part in parts.values():
+            buffer.extend(part)
+            _pad(buffer)
+
+    return buffer
+
+def build_bundle(path, tables, metadata=None):
+    """
+    Write dict tables into a bundle file (see bundle_bytes).
+
+    Returns
+    -------
+    Path
+    """
+    buffer = bundle_bytes(tables, metadata)
+
+    # write then rename : readers never map a half-written bundle
+    path     = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path.write_bytes(buffer)
+    tmp_path.replace(path)
+
+    return path
+
+#%%
+class BundleTable(Mapping):
+    """
+    Read-only dict view of one bundle table, backed by the mapped file.
+
+    With cache_size > 0, decoded values are kept in a per-process LRU cache :
+    hot entries (radicals, common components) skip the JSON decoding.
+    Cached values are shared between callers and must not be modified.
+    """
+
+    def __init__(self, view, entry, cache_size=0):
+        count = entry['count']
+
+        self._key_offsets   = view[entry['key_offsets']:entry['key_offsets'] + 8 * (count + 1)].cast('Q')
+        self._value_offsets = view[entry['value_offsets']:entry['value_offsets'] + 8 * (count + 1)].cast('Q')
+        self._keys          = view[entry['key_pool']:entry['key_pool'] + self._key_offsets[count]]
+        self._values        = view[entry['value_pool']:entry['value_pool'] + self._value_offsets[count]]
+        self._order         = view[entry['order']:entry['order'] + 4 * count].cast('I')
+        self._count         = count
+        self._codepoints    = None
+        if 'codepoints' in entry:
+            self._codepoints = view[entry['codepoints']:entry['codepoints'] + 4 * count].cast('I')
+
+        if cache_size:
+            self._decode = functools.lru_cache(maxsize=cache_size)(self._decode)
+
+    def _key(self, i):
+        return bytes(self._keys[self._key_offsets[i]:self._key_offsets[i + 1]])
+
+    def _index(self, key):
+        """
+        Position of a key in the table, or -1.
+        """
+        if not isinstance(key, str):
+            return -1
+
+        if self._codepoints is not None:
+            if len(key) != 1:
+                return -1
+            code = ord(key)
+            i    = bisect.bisect_left(self._codepoints, code)
+            return i if i < self._count and self._codepoints[i] == code else -1
+
+        encoded = key.encode('utf-8')
+        # keys are sorted by their UTF-8 bytes
+        i = bisect.bisect_left(range(self._count), encoded, key=self._key)
+        if i < self._count and self._key(i) == encoded:
+            return i
+
+        return -1
+
+    def _decode(self, i):
+        return json.loads(bytes(self._values[self._value_offsets[i]:self._value_offsets[i + 1]]))
+
+    def __getitem__(self, key):
+        i = self._index(key)
+        if i < 0:
+            raise KeyError(key)
+
+        return self._decode(i)
+
+    def get(self, key, default=None):
+        # no KeyError round trip : most tree nodes are looked up with .get
+        i = self._index(key)
+
+        return self._decode(i) if i >= 0 else default
+
+    def __contains__(self, key):
+        return self._index(key) >= 0
+
+    def __iter__(self):
+        # source dict order, like the dict the table was built from
+        return (self._key(i).decode('utf-8') for i in self._order)
+
+    def __len__(self):
+        return self._count
+
+def open_bundle_buffer(buffer, cache_size=0, source=None):
+    """
+    Expose the tables of a bundle held in any buffer (mmap, shared memory...).
+
+    Parameters
+    ----------
+    buffer : buffer
+        Bundle bytes, see bundle_bytes.
+    cache_size : int, optional
+        Per-table LRU cache of decoded values, see BundleTable.
+    source : object, optional
+        Owner of the buffer (with a close() method), closed by close_bundle.
+
+    Returns
+    -------
+    dict
+        Table name -> BundleTable, plus 'metadata' (dict), '_view' and
+        '_source' (see close_bundle).
+    """
+    view = memoryview(buffer).toreadonly()
+
+    magic, version, directory_size = HEADER.unpack_from(view, 0)
+    if magic != BUNDLE_MAGIC:
+        view.release()
+        raise ValueError("Not a kanji resource bundle")
+    if version != BUNDLE_FORMAT_VERSION:
+        view.release()
+        raise ValueError(f"Bundle format {version} unsupported, rebuild it (expected {BUNDLE_FORMAT_VERSION})")
+
+    directory = json.loads(bytes(view[HEADER.size:HEADER.size + directory_size]))
+
+    bundle = {name: BundleTable(view, entry, cache_size) for name, entry in directory['tables'].items()}
+    bundle['metadata'] = directory['metadata']
+    bundle['_view']    = view
+    bundle['_source']  = source
+
+    return bundle
+
+def open_bundle(path, cache_size=0):
+    """
+    Memory-map a bundle file and expose its tables (see open_bundle_buffer).
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        return open_bundle_buffer(mapped, cache_size, source=mapped)
+    except ValueError as error:
+        mapped.close()
+        raise ValueError(f"{path}: {error}") from None
+
+def close_bundle(bundle):
+    """
+    Release the buffer of a bundle (its tables become unusable).
+    """
+    for table in bundle.values():
+        if isinstance(table, BundleTable):
+            for part in ('_key_offsets', '_value_offsets', '_keys', '_values', '_order', '_codepoints'):
+                if getattr(table, part) is not None:
+                    getattr(table, part).release()
+
+    bundle['_view'].release()
+    if bundle['_source'] is not None:
+        bundle['_source'].close()
+
+#%%
+def bundle_tables(resources, include_metrics=True):
+    """
+    Collect the core resources and derived indexes to bundle.
+
+    Parameters
+    ----------
+    resources : KanjiResources
+        Container from load_kanji_resources; KANJI_DICT is included when
+        it has a kanjidic_path.
+    include_metrics : bool, optional
+        Also store compute_all_kanji_metrics results ('METRICS').
+
+    Returns
+    -------
+    tuple[dict, dict]
+        (tables, metadata). Tables : KANJI_DB, KANGXI_RADICALS,
+        VARIANT_INDEX, RADICAL_DB, KANJI_DICT and the derived PARENTS
+        (component -> direct parents, sorted) and METRICS.
+    """
+    from incremental_metrics import build_parent_index
+
+    tables = {name: resources[name] for name in BUNDLE_RESOURCES}
+    tables['PARENTS'] = build_parent_index(tables['KANJI_DB'])
+
+    if getattr(resources, 'kanjidic_path', None) is not None:
+        tables['KANJI_DICT'] = resources['KANJI_DICT']
+
+    if include_metrics:
+        from kanji_metrics import compute_all_kanji_metrics
+        tables['METRICS'] = compute_all_kanji_metrics(
+            tables['KANJI_DB'],
+            tables['VARIANT_INDEX'],
+            tables['KANGXI_RADICALS']
+        )
+
+    metadata = {
+        'built_at' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'sources'  : {
+            'unihan'   : str(resources.unihan_path),
+            'kangxi'   : str(resources.kangxi_path),
+            'kanjidic' : str(resources.kanjidic_path) if resources.kanjidic_path else None
+        }
+    }
+
+    return tables, metadata
+
+def build_resource_bundle(path, resources, include_metrics=True):
+    """
+    Serialise the core resources and derived indexes into a bundle file.
+
+    See bundle_tables for the tables written.
+    """
+    tables, metadata = bundle_tables(resources, include_metrics)
+
+    return build_bundle(path, tables, metadata)
+
+def main(argv=None):
+    """
+    Command line : python resource_bundle.py build-bundle [--out PATH] ...
+    """
+    # command line only imports : keep open_bundle cheap
+    import argparse
+    from parse_unihan_cjkvi import load_kanji_resources
+
+    data_dir = Path(__file__).resolve().parent.parent / 'data'
+
+    parser   = argparse.ArgumentParser(description='Kanji resource bundle tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build-bundle', help='compile all resources into one mmap-able file')
+    build.add_argument('--unihan',     default=data_dir / 'Unihan_CJKVI_database.txt')
+    build.add_argument('--kangxi',     default=data_dir / 'kangxi_radicals.json')
+    build.add_argument('--kanjidic',   default=data_dir / 'kanjidic2.xml.gz')
+    build.add_argument('--out',        default=data_dir / 'kanji_bundle.bin')
+    build.add_argument('--no-metrics', action='store_true', help='skip the METRICS table')
+
+    args = parser.parse_args(argv)
+
+    start     = time.perf_counter()
+    resources = load_kanji_resources(args.unihan, args.kangxi, args.kanjidic)
+    path      = build_resource_bundle(args.out, resources, include_metrics=not args.no_metrics)
+
+    print(f"bundle written to {path} ({path.stat().st_size / 1e6:.1f} MB) in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import random
+import statistics
+import time
+from urllib.parse import quote
+
+#%%
+"""
+Load generator for kanji_service.
+
+Opens `concurrency` keep-alive connections and sends requests back to back
+on each for `duration` seconds, with a mix of lookup, tree, metrics, radical,
+search and batch requests. Reports throughput and latency percentiles and
+checks them against the service targets :
+
+    TARGET_P99_MS    99% of requests answered within this many milliseconds
+    TARGET_RPS       sustained requests per second (single process)
+
+The fixed mix cycles through a few hundred targets, so after warm-up nearly
+every GET is answered from the service response cache. To measure the
+uncached lookup path, use random_request_mix (random kanji of the CJK
+unified ideographs block, random search filters) and/or cache_bust, which
+appends a unique query parameter to every GET so no target repeats.
+"""
+
+TARGET_P99_MS = 10.0
+TARGET_RPS    = 2000
+
+# common kanji of every complexity
+SAMPLE_KANJI  = '海林森語学校日本人口木水火土金明暗曜鬱議驚響龍'
+
+# search components drawn by random_request_mix
+SAMPLE_COMPONENTS = '木口氵日月言人心金土火糸女手'
+
+def request_mix(kanji=SAMPLE_KANJI, seed=0):
+    """
+    Build the list of (method, target, body) requests cycled by the clients.
+    """
+    rng      = random.Random(seed)
+    requests = []
+
+    for char in kanji:
+        quoted = quote(char)
+        requests.append(('GET', f'/kanji/{quoted}', b''))
+        requests.append(('GET', f'/tree/{quoted}', b''))
+        requests.append(('GET', f'/metrics/{quoted}', b''))
+
+    for _ in range(len(kanji)):
+        requests.append(('GET', f'/radical/{rng.randint(1, 214)}', b''))
+
+    for components in ('木', '木,口', '氵', '日,月', '言'):
+        requests.append(('GET', f'/search?components={quote(components)}&limit=50', b''))
+
+    batch = json.dumps({'requests': [f'/metrics/{char}' for char in kanji[:10]]}, ensure_ascii=False)
+    requests.append(('POST', '/batch', batch.encode('utf-8')))
+
+    rng.shuffle(requests)
+
+    return requests
+
+def random_request_mix(size=20000, seed=0):
+    """
+    Build a large random request list, mostly distinct targets.
+
+    Kanji are drawn uniformly from U+4E00-U+9FFF, so the response cache
+    rarely hits and the lookups exercise the full request path.
+    """
+    rng      = random.Random(seed)
+    requests = []
+
+    for _ in range(size):
+        kind = rng.random()
+        if kind < 0.8:
+            endpoint = rng.choice(('kanji', 'tree', 'metrics'))
+            char     = chr(rng.randint(0x4E00, 0x9FFF))
+            requests.append(('GET', f'/{endpoint}/{quote(char)}', b''))
+        elif kind < 0.9:
+            requests.append(('GET', f'/radical/{rng.randint(1, 214)}', b''))
+        else:
+            components = ','.join(rng.sample(SAMPLE_COMPONENTS, rng.randint(1, 2)))
+            jlpt       = ','.join(map(str, rng.sample(range(1, 5), rng.randint(1, 4))))
+            requests.append((
+                'GET',
+                f'/search?components={quote(components)}&jlpt={jlpt}&max_strokes={rng.randint(5, 30)}'
+                f'&limit={rng.randint(1, 100)}',
+                b''
+            ))
+
+    return requests
+
+async def _client(host, port, requests, deadline, latencies, errors, offset, cache_bust=False):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError as error:
+        # service down or refusing connections : reported, not raised
+        errors.append(type(error).__name__)
+        return
+
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            method, target, body = requests[i % len(requests)]
+            i += 1
+
+            if cache_bust and method == 'GET':
+                # unique target : the service response cache never hits
+                target += f"{'&' if '?' in target else '?'}nocache={offset}-{i}"
+
+            head = (
+                f"{method} {target} HTTP/1.1\r\n"
+                f"Host: {host}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"\r\n"
+            ).encode('latin-1')
+
+            start = time.perf_counter()
+            writer.write(head + body)
+            await writer.drain()
+
+            # status line + headers, then exactly Content-Length bytes
+            response = await reader.readuntil(b'\r\n\r\n')
+            status   = int(response[9:12])
+            length   = 0
+            for line in response.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+
+            latencies.append(time.perf_counter() - start)
+            if status >= 500:
+                errors.append(status)
+    except (OSError, asyncio.IncompleteReadError) as error:
+        # connection dropped mid-request : this client stops
+        errors.append(type(error).__name__)
+    finally:
+        writer.close()
+
+async def run_load(host='127.0.0.1', port=8765, concurrency=16, duration=10.0, requests=None, cache_bust=False):
+    """
+    Run the load test against a running service.
+
+    Parameters
+    ----------
+    requests : list, optional
+        request_mix() by default, or random_request_mix().
+    cache_bust : bool, optional
+        Make every GET target unique, bypassing the response cache.
+
+    Returns
+    -------
+    dict
+        {
+          'requests', 'errors' : int,
+          'rps'                : float,
+          'p50_ms', 'p95_ms', 'p99_ms', 'max_ms' : float, None without any answer,
+          'meets_targets'      : bool
+        }
+        'errors' counts 5xx answers and connection failures.
+    """
+    requests  = requests or request_mix()
+    latencies = []
+    errors    = []
+
+    start    = time.perf_counter()
+    deadline = start + duration
+    # clients start evenly spread over the request list, not in lockstep
+    await asyncio.gather(*(
+        _client(host, port, requests, deadline, latencies, errors,
+                offset=i * len(requests) // concurrency, cache_bust=cache_bust)
+        for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    ms          = sorted(latency * 1000 for latency in latencies)
+    percentiles = statistics.quantiles(ms, n=100) if len(ms) > 1 else ms * 99
+    report      = {
+        'requests' : len(ms),
+        'errors'   : len(errors),
+        'rps'      : round(len(ms) / elapsed, 1),
+        # no answer at all (service down...) : no latency to report
+        'p50_ms'   : round(percentiles[49], 3) if ms else None,
+        'p95_ms'   : round(percentiles[94], 3) if ms else None,
+        'p99_ms'   : round(percentiles[98], 3) if ms else None,
+        'max_ms'   : round(ms[-1], 3) if ms else None
+    }
+    report['meets_targets'] = bool(
+        ms and not errors and report['p99_ms'] <= TARGET_P99_MS and report['rps'] >= TARGET_RPS
+    )
+
+    return report
+
+def main(argv=None):
+    """
+    Command line : python service_loadgen.py [--port P] [--concurrency C] [--duration S]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Load generator for kanji_service')
+    parser.add_argument('--host',        default='127.0.0.1')
+    parser.add_argument('--port',        default=8765, type=int)
+    parser.add_argument('--concurrency', default=16, type=int)
+    parser.add_argument('--duration',    default=10.0, type=float)
+    parser.add_argument('--mix',         default='fixed', choices=['fixed', 'random'])
+    parser.add_argument('--cache-bust',  action='store_true', help='unique GET targets, no response cache hits')
+    args = parser.parse_args(argv)
+
+    requests = random_request_mix() if args.mix == 'random' else request_mix()
+    report   = asyncio.run(run_load(args.host, args.port, args.concurrency, args.duration, requests, args.cache_bust))
+
+    print(json.dumps(report, indent=2))
+    print(f"targets : p99 <= {TARGET_P99_MS} ms, >= {TARGET_RPS} req/s ->",
+          'OK' if report['meets_targets'] else 'MISSED')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+from multiprocessing import shared_memory
+from resource_bundle import bundle_bytes, bundle_tables, close_bundle, open_bundle_buffer
+
+#%%
+"""
+Shared-memory resource sharing across worker processes.
+
+With N workers each holding its own KANJI_DB, VARIANT_INDEX... memory grows
+linearly with N. Here one process compiles the resources into the bundle
+layout (offset tables + string pools, see resource_bundle) and publishes
+the bytes once in a multiprocessing.shared_memory segment. Workers attach
+to the segment by name and read it through read-only memoryviews : no
+copy, no unpickling, one physical copy for every worker.
+
+The attached resources are a dict of read-only Mappings with the same keys
+and values as load_kanji_resources (KANJI_DB, RADICAL_DB, KANGXI_RADICALS,
+VARIANT_INDEX, plus KANJI_DICT, PARENTS and METRICS when bundled), so
+resolve_kanji_tree_enriched and the metric functions take them unchanged.
+
+Lifecycle
+---------
+    handle    = publish_resources(load_kanji_resources(...))
+    # in each worker
+    resources = attach_resources(handle['name'])
+    ...
+    detach_resources(resources)
+    # in the publisher, once every worker is done
+    unpublish_resources(handle)
+"""
+
+# decoded values kept per worker and table (radicals and common components)
+WORKER_CACHE_SIZE = 4096
+
+_WORKER_RESOURCES = {}
+
+def publish_resources(resources, include_metrics=False, name=None):
+    """
+    Compile resources and copy them into a new shared memory segment.
+
+    Parameters
+    ----------
+    resources : KanjiResources
+        Container from load_kanji_resources.
+    include_metrics : bool, optional
+        Also publish compute_all_kanji_metrics results ('METRICS').
+    name : str, optional
+        Segment name, chosen by the system by default.
+
+    Returns
+    -------
+    dict
+        {'name': segment name, 'size': bytes, 'shm': SharedMemory owned by the publisher}
+    """
+    tables, metadata = bundle_tables(resources, include_metrics)
+    buffer           = bundle_bytes(tables, metadata)
+
+    shm = shared_memory.SharedMemory(name=name, create=True, size=len(buffer))
+    shm.buf[:len(buffer)] = buffer
+
+    return {
+        'name' : shm.name,
+        'size' : len(buffer),
+        'shm'  : shm
+    }
+
+def _attach_segment(name):
+    """
+    Attach an existing segment without letting this process unlink it.
+
+    Before Python 3.13, attaching registers the segment with the resource
+    tracker, which destroys it when the first worker exits. Unregistering
+    afterwards is not an option : forked workers share the publisher's
+    tracker. Registration is therefore skipped while attaching.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        from multiprocessing import resource_tracker
+
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+def attach_resources(name, cache_size=WORKER_CACHE_SIZE):
+    """
+    Attach to published resources, zero-copy and read-only.
+
+    Parameters
+    ----------
+    name : str
+        Segment name returned by publish_resources.
+    cache_size : int, optional
+        Per-table LRU cache of decoded values, see BundleTable.
+
+    Returns
+    -------
+    dict
+        Table name -> read-only Mapping, plus 'metadata'.
+    """
+    shm = _attach_segment(name)
+
+    return open_bundle_buffer(shm.buf, cache_size, source=shm)
+
+def detach_resources(resources):
+    """
+    Release the views of a worker and close its handle on the segment.
+    """
+    close_bundle(resources)
+
+def unpublish_resources(handle):
+    """
+    Destroy a published segment (publisher side, after the workers are done).
+    """
+    handle['shm'].close()
+    handle['shm'].unlink()
+
+#%% worker pools
+def init_shared_worker(name):
+    """
+    Pool initializer : attach the published resources once per worker.
+    """
+    _WORKER_RESOURCES.update(attach_resources(name))
+
+def worker_resources():
+    """
+    Resources attached by init_shared_worker in the current worker.
+    """
+    return _WORKER_RESOURCES
+
+def _shared_metrics_worker(chunk):
+    from kanji_metrics import _metrics_for_kanji
+
+    resources = _WORKER_RESOURCES
+    return _metrics_for_kanji(
+                        chunk,
+                        resources['KANJI_DB'],
+                        resources['VARIANT_INDEX'],
+                        resources['KANGXI_RADICALS']
+                        )
+
+def compute_all_kanji_metrics_shared(handle, workers=None, chunk_size=2000):
+    """
+    compute_all_kanji_metrics over a worker pool reading shared resources.
+
+    Unlike compute_all_kanji_metrics_parallel, workers neither inherit nor
+    unpickle private copies of the resources : they all read the same
+    shared segment.
+
+    Parameters
+    ----------
+    handle : dict
+        Result of publish_resources.
+    workers : int, optional
+        Number of worker processes, os.cpu_count() by default.
+    chunk_size : int, optional
+        Number of kanji per task.
+
+    Returns
+    -------
+    dict[str, dict]
+        Same format and key order as compute_all_kanji_metrics (tables
+        iterate in KANJI_DB order, chunks are consumed in order).
+    """
+    import multiprocessing
+
+    resources = attach_resources(handle['name'])
+    try:
+        kanji = list(resources['KANJI_DB'])
+    finally:
+        detach_resources(resources)
+
+    chunks = [kanji[i:i + chunk_size] for i in range(0, len(kanji), chunk_size)]
+
+    results = {}
+    with multiprocessing.Pool(workers, initializer=init_shared_worker, initargs=(handle['name'],)) as pool:
+        for partial in pool.imap(_shared_metrics_worker, chunks):
+            results.update(partial)
+
+    return results
@@ -0,0 +1,98 @@
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+#%%
+"""
+Startup-time benchmark of the script modules.
+
+Every module is imported in a fresh interpreter (nothing cached in
+sys.modules), so the timings are what a notebook, CLI call or service
+worker pays before doing any work. The report also records which heavy
+dependencies the import pulled in : the core modules must not load NumPy
+or pandas, nor parse any data file.
+"""
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# modules expected to import without NumPy / pandas
+CORE_MODULES = (
+    'parse_unihan_cjkvi',
+    'component_closure',
+    'kanji_metrics',
+    'kanji_dict_xml',
+    'kangxi_radicals_validator',
+    'fetch_214_radicals_id',
+    'kangxi_radicals_generator',
+)
+
+HEAVY_DEPENDENCIES = ('numpy', 'pandas')
+
+# run in the child interpreter : time one import, report the heavy modules loaded
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds' : elapsed,
+    'loaded'  : [name for name in {heavy!r} if name in sys.modules]
+}}))
+"""
+
+def time_import(module, repeat=5):
+    """
+    Time the import of one module in fresh interpreters.
+
+    Parameters
+    ----------
+    module : str
+        Module name, importable from the script directory.
+    repeat : int, optional
+        Number of fresh interpreters; the median is reported.
+
+    Returns
+    -------
+    dict
+        {'module', 'median_ms', 'min_ms', 'heavy_dependencies'}
+    """
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY_DEPENDENCIES)],
+            cwd            = SCRIPT_DIR,
+            capture_output = True,
+            text           = True,
+            check          = True
+        )
+        # only the last line : a module printing at import would break the json
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    seconds = [run['seconds'] for run in runs]
+
+    return {
+        'module'             : module,
+        'median_ms'          : round(statistics.median(seconds) * 1000, 2),
+        'min_ms'             : round(min(seconds) * 1000, 2),
+        'heavy_dependencies' : runs[-1]['loaded']
+    }
+
+def benchmark_startup(modules=CORE_MODULES, repeat=5):
+    """
+    Time the import of every module.
+
+    Returns
+    -------
+    list[dict]
+        One time_import result per module.
+    """
+    return [time_import(module, repeat) for module in modules]
+
+if __name__ == "__main__":
+    for row in benchmark_startup():
+        print(
+            f"{row['module']:<28} {row['median_ms']:>8.2f} ms "
+            f"(min {row['min_ms']:.2f})  heavy: {', '.join(row['heavy_dependencies']) or '-'}"
+        )
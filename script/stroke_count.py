@@ -0,0 +1,287 @@
+import random
+from collections import Counter
+import numpy as np
+from component_closure import component_topological_order, direct_components
+from kanji_dict_xml import field_to_int
+
+#%%
+"""
+Stroke count derivation from decompositions.
+
+KANJIDIC2 gives stroke counts for ~13k kanji; the other Unihan characters
+have none. A character's stroke count is (almost) the sum of the stroke
+counts of its direct components, so counts are derived bottom-up over the
+component DAG, in topological order, each character reusing the memoised
+counts of its components :
+
+    strokes(char) = seed(char)                        if seeded
+                  = sum(strokes(component))           otherwise
+
+Seeds come from kangxi_radicals.json 'strokes' and KANJIDIC2 'stroke_count'.
+Many components are radical variants (氵, 扌, 艹...) absent from both
+sources; their counts can be inferred from KANJIDIC2 kanji where they are
+the only unknown component (most frequent remainder).
+
+Known limits : strokes can merge or vanish when parts are combined, so
+derived counts are an estimate. stroke_count_report measures how far they
+are from KANJIDIC2 wherever both exist; as KANJIDIC2 also provides the
+seeds and the inferred counts, that is an in-sample fit.
+holdout_stroke_count_report gives the out-of-sample figures : a share of
+the KANJIDIC2 kanji is held out of the seeds and of the inference, and
+only those kanji are scored.
+"""
+
+# share of the KANJIDIC2 kanji held out by holdout_stroke_count_report
+HOLDOUT_FRACTION = 0.2
+
+# origin of each stroke count
+SOURCE_UNKNOWN  = 0
+SOURCE_RADICAL  = 1
+SOURCE_KANJIDIC = 2
+SOURCE_INFERRED = 3
+SOURCE_DERIVED  = 4
+
+UNKNOWN_STROKES = -1
+
+def radical_stroke_counts(kangxi_radicals):
+    """
+    Seed counts of the 214 radicals, under both their standard and Kangxi forms.
+
+    Variant forms are not included : 氵 does not have the 4 strokes of 水.
+    """
+    seeds = {}
+    for radical, data in kangxi_radicals.items():
+        seeds[radical] = data['strokes']
+        if data.get('kangxi_radical'):
+            seeds[data['kangxi_radical']] = data['strokes']
+
+    return seeds
+
+def kanjidic_stroke_counts(kanji_dict):
+    """
+    Seed counts from a parsed KANJIDIC2 dictionary (stroke_count is text).
+    """
+    seeds = {}
+    for kanji, data in kanji_dict.items():
+        strokes = field_to_int(data.get('stroke_count'))
+        if strokes is not None:
+            seeds[kanji] = strokes
+
+    return seeds
+
+def infer_component_strokes(kanji_db, known, reference, min_support=3):
+    """
+    Infer the stroke counts of components missing from every seed source.
+
+    For each reference kanji with exactly one component of unknown count,
+    that component is credited with the remaining strokes; the most frequent
+    remainder wins.
+
+    Parameters
+    ----------
+    kanji_db : dict
+        Normalised kanji database (KANJI_DB).
+    known : dict[str, int]
+        Already seeded counts.
+    reference : dict[str, int]
+        Kanji -> trusted stroke count (KANJIDIC2).
+    min_support : int, optional
+        Minimum number of kanji agreeing on the inferred count.
+
+    Returns
+    -------
+    dict[str, int]
+        Component -> inferred stroke count.
+    """
+    votes = {}
+
+    for kanji, total in reference.items():
+        components = direct_components(kanji_db.get(kanji))
+        unknown    = [c for c in components if c not in known]
+
+        if len(unknown) != 1:
+            continue
+
+        remainder = total - sum(known[c] for c in components if c in known)
+        # the unknown component may appear several times (e.g. 氵 twice)
+        remainder, spare = divmod(remainder, components.count(unknown[0]))
+        if remainder > 0 and not spare:
+            votes.setdefault(unknown[0], Counter())[remainder] += 1
+
+    inferred = {}
+    for component, counter in votes.items():
+        strokes, support = counter.most_common(1)[0]
+        if support >= min_support:
+            inferred[component] = strokes
+
+    return inferred
+
+#%%
+def derive_stroke_counts(kanji_db, kangxi_radicals, kanji_dict=None, infer=True, holdout=()):
+    """
+    Derive the stroke count of every character of the component DAG.
+
+    Parameters
+    ----------
+    kanji_db : dict
+        Normalised kanji database (KANJI_DB).
+    kangxi_radicals : dict
+        Indexed Kangxi radicals (KANGXI_RADICALS).
+    kanji_dict : dict, optional
+        Parsed KANJIDIC2 dictionary, used as seeds.
+    infer : bool, optional
+        Infer the counts of unseeded components (see infer_component_strokes).
+    holdout : iterable[str], optional
+        Kanji whose KANJIDIC2 count is ignored, both as a seed and for the
+        inference (see holdout_stroke_count_report).
+
+    Returns
+    -------
+    dict
+        {
+          'kanji'     : list[str]   every character, components first,
+          'kanji_ids' : dict[str, int],
+          'strokes'   : np.ndarray[int16] seed if any, else derived count,
+          'derived'   : np.ndarray[int16] sum of the component counts,
+                        ignoring the character's own seed,
+          'source'    : np.ndarray[int8] SOURCE_* of 'strokes'
+        }
+        Unknown counts are UNKNOWN_STROKES.
+    """
+    reference = kanjidic_stroke_counts(kanji_dict) if kanji_dict else {}
+    for kanji in holdout:
+        reference.pop(kanji, None)
+
+    seeds  = {}
+    origin = {}
+    for char, strokes in radical_stroke_counts(kangxi_radicals).items():
+        seeds[char], origin[char] = strokes, SOURCE_RADICAL
+    for char, strokes in reference.items():
+        seeds[char], origin[char] = strokes, SOURCE_KANJIDIC
+    if infer and reference:
+        for char, strokes in infer_component_strokes(kanji_db, seeds, reference).items():
+            seeds[char], origin[char] = strokes, SOURCE_INFERRED
+
+    order   = component_topological_order(kanji_db)
+    strokes = {}
+    derived = np.full(len(order), UNKNOWN_STROKES, dtype=np.int16)
+    final   = np.full(len(order), UNKNOWN_STROKES, dtype=np.int16)
+    source  = np.zeros(len(order), dtype=np.int8)
+
+    # components come first : their counts are already memoised
+    for i, char in enumerate(order):
+        components = direct_components(kanji_db.get(char))
+
+        total = UNKNOWN_STROKES
+        if components:
+            total = 0
+            for component in components:
+                count = strokes.get(component, UNKNOWN_STROKES)
+                if count == UNKNOWN_STROKES:
+                    total = UNKNOWN_STROKES
+                    break
+                total += count
+        derived[i] = total
+
+        if char in seeds:
+            strokes[char], source[i] = seeds[char], origin[char]
+        elif total != UNKNOWN_STROKES:
+            strokes[char], source[i] = total, SOURCE_DERIVED
+        else:
+            continue
+        final[i] = strokes[char]
+
+    return {
+        'kanji'     : order,
+        'kanji_ids' : {char: i for i, char in enumerate(order)},
+        'strokes'   : final,
+        'derived'   : derived,
+        'source'    : source
+    }
+
+def stroke_count_report(stroke_counts, kanji_dict, top=20, kanji=None):
+    """
+    Compare derived stroke counts with KANJIDIC2 for every overlapping kanji.
+
+    When stroke_counts was derived with the same KANJIDIC2 seeds, this is an
+    in-sample fit : components seeded or inferred from the compared kanji
+    flatter 'exact' and 'within_one'. See holdout_stroke_count_report.
+
+    Parameters
+    ----------
+    stroke_counts : dict
+        Result of derive_stroke_counts.
+    kanji_dict : dict
+        Parsed KANJIDIC2 dictionary.
+    top : int, optional
+        Number of worst mismatches listed.
+    kanji : iterable[str], optional
+        Only compare these kanji (all the overlap by default).
+
+    Returns
+    -------
+    dict
+        {
+          'compared'      : int   kanji with both counts,
+          'exact'         : float share of exact matches,
+          'within_one'    : float share off by at most one stroke,
+          'mean_abs_error': float,
+          'bias'          : float mean (derived - KANJIDIC2),
+          'coverage'      : dict SOURCE_* -> number of characters,
+          'worst'         : list[tuple[str, int, int]] (kanji, derived, KANJIDIC2)
+        }
+    """
+    reference = kanjidic_stroke_counts(kanji_dict)
+    ids       = stroke_counts['kanji_ids']
+    if kanji is not None:
+        reference = {k: reference[k] for k in kanji if k in reference}
+
+    # aligned (position, KANJIDIC2 count) arrays for the overlap
+    pairs     = [(ids[k], n) for k, n in reference.items() if k in ids]
+    positions = np.fromiter((p for p, _ in pairs), dtype=np.int64, count=len(pairs))
+    expected  = np.fromiter((n for _, n in pairs), dtype=np.int16, count=len(pairs))
+
+    derived   = stroke_counts['derived'][positions]
+    known     = derived != UNKNOWN_STROKES
+    positions = positions[known]
+    error     = derived[known].astype(np.int32) - expected[known]
+    abs_error = np.abs(error)
+
+    worst  = np.argsort(-abs_error, kind='stable')[:top]
+    kanji  = stroke_counts['kanji']
+    counts = np.bincount(stroke_counts['source'], minlength=SOURCE_DERIVED + 1)
+
+    return {
+        'compared'       : int(known.sum()),
+        'exact'          : float(np.mean(abs_error == 0)) if len(error) else 0.0,
+        'within_one'     : float(np.mean(abs_error <= 1)) if len(error) else 0.0,
+        'mean_abs_error' : float(abs_error.mean()) if len(error) else 0.0,
+        'bias'           : float(error.mean()) if len(error) else 0.0,
+        'coverage'       : {source: int(count) for source, count in enumerate(counts)},
+        'worst'          : [
+            (kanji[positions[i]], int(derived[known][i]), int(expected[known][i]))
+            for i in worst
+            ]
+    }
+
+def holdout_stroke_count_report(kanji_db, kangxi_radicals, kanji_dict, fraction=HOLDOUT_FRACTION, seed=0, top=20):
+    """
+    Out-of-sample stroke_count_report.
+
+    A random `fraction` of the KANJIDIC2 kanji is held out : their counts
+    are neither seeds nor inference votes, and only they are scored.
+
+    Returns
+    -------
+    dict
+        stroke_count_report fields, plus 'held_out' (number of kanji held
+        out). 'coverage' describes the derivation without them.
+    """
+    reference = sorted(kanjidic_stroke_counts(kanji_dict))
+    held_out  = random.Random(seed).sample(reference, round(len(reference) * fraction))
+
+    stroke_counts = derive_stroke_counts(kanji_db, kangxi_radicals, kanji_dict, holdout=held_out)
+    report        = stroke_count_report(stroke_counts, kanji_dict, top, kanji=held_out)
+    report['held_out'] = len(held_out)
+
+    return report
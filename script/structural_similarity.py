@@ -0,0 +1,382 @@
+import heapq
+import numpy as np
+from parse_unihan_cjkvi import resolve_kanji_tree_enriched
+
+#%%
+"""
+Structural similarity between kanji decomposition trees.
+
+MinHash on component sets ignores layout : ⿰ and ⿱ arrangements of the same
+parts look identical. Here trees from resolve_kanji_tree_enriched are
+compared with an ordered tree edit distance (Zhang-Shasha), where
+
+    - deleting or inserting a node costs 1
+    - relabelling a node to another character costs 1
+    - keeping the character but changing its position (left -> top) costs 0.5
+
+so ⿰木口 and ⿱木口 arrangements of the same parts stay close but never identical.
+
+Computing the exact distance against ~88k trees is far too slow, so an index
+keeps cheap lower bounds for every character :
+
+    - |size1 - size2|, |depth1 - depth2|
+        every insertion / deletion changes the size by one and the depth by
+        at most one
+    - |size1 - size2| + min(size1, size2) - |labels1 ∩ labels2|
+        at most |labels1 ∩ labels2| mapped node pairs can keep their character,
+        every other pair costs a relabel
+
+The multiset bound is computed for all characters at once from per-label
+posting lists; candidates are then visited in increasing bound order and the
+search stops as soon as the bound reaches the current k-th best distance.
+"""
+
+INSERT_COST            = 1.0
+DELETE_COST            = 1.0
+RELABEL_COST           = 1.0
+POSITION_RELABEL_COST  = 0.5
+
+def postorder_annotation(tree):
+    """
+    Flatten a decomposition tree for the Zhang-Shasha algorithm.
+
+    Parameters
+    ----------
+    tree : dict
+        Root node, as returned by resolve_kanji_tree_enriched.
+
+    Returns
+    -------
+    tuple[list, list[int], list[int], int]
+        (labels, leftmost, keyroots, depth) where labels[i] is the
+        (char, position) of the i-th node in post-order, leftmost[i] the
+        post-order index of its leftmost leaf, keyroots the sorted keyroot
+        indices and depth the tree depth.
+    """
+    labels   = []
+    leftmost = []
+
+    def _walk(node):
+        # returns (leftmost leaf index, depth) of the subtree
+        first, depth = None, 0
+        for child in node['children']:
+            child_first, child_depth = _walk(child)
+            if first is None:
+                first = child_first
+            depth = max(depth, child_depth)
+
+        index = len(labels)
+        labels.append((node['char'], node.get('position')))
+        leftmost.append(index if first is None else first)
+
+        return leftmost[index], depth + 1
+
+    _, depth = _walk(tree)
+
+    # keyroots : the highest node of every leftmost-leaf chain
+    last_with_leftmost = {}
+    for i, first_leaf in enumerate(leftmost):
+        last_with_leftmost[first_leaf] = i
+
+    return labels, leftmost, sorted(last_with_leftmost.values()), depth
+
+def _relabel_cost(label1, label2):
+    """
+    Cost of mapping node label1 onto label2.
+    """
+    if label1[0] != label2[0]:
+        return RELABEL_COST
+
+    return 0.0 if label1[1] == label2[1] else POSITION_RELABEL_COST
+
+def zhang_shasha(annotation1, annotation2, threshold=None):
+    """
+    Exact ordered tree edit distance between two annotated trees.
+
+    With a `threshold`, None is returned as soon as the distance is known
+    to exceed it : in the last (root, root) keyroot pair, forest[x] holds
+    the distances from the first x post-order nodes of tree 1 to every
+    post-order prefix of tree 2, and the distance of the whole trees is
+    at least the minimum of any such row.
+    """
+    labels1, leftmost1, keyroots1, _ = annotation1
+    labels2, leftmost2, keyroots2, _ = annotation2
+
+    treedist = [[0.0] * len(labels2) for _ in labels1]
+    root1    = len(labels1) - 1
+    root2    = len(labels2) - 1
+
+    for i in keyroots1:
+        for j in keyroots2:
+            li, lj = leftmost1[i], leftmost2[j]
+            rows   = i - li + 2
+            cols   = j - lj + 2
+            cutoff = threshold is not None and i == root1 and j == root2
+
+            # forest distance between post-order prefixes of the two subtrees
+            forest = [[0.0] * cols for _ in range(rows)]
+            for x in range(1, rows):
+                forest[x][0] = forest[x - 1][0] + DELETE_COST
+            for y in range(1, cols):
+                forest[0][y] = forest[0][y - 1] + INSERT_COST
+
+            for x in range(1, rows):
+                ix = li + x - 1
+                for y in range(1, cols):
+                    jy = lj + y - 1
+
+                    delete = forest[x - 1][y] + DELETE_COST
+                    insert = forest[x][y - 1] + INSERT_COST
+
+                    if leftmost1[ix] == li and leftmost2[jy] == lj:
+                        # both prefixes are whole trees
+                        relabel = forest[x - 1][y - 1] + _relabel_cost(labels1[ix], labels2[jy])
+                        forest[x][y]     = min(delete, insert, relabel)
+                        treedist[ix][jy] = forest[x][y]
+                    else:
+                        p = leftmost1[ix] - li
+                        q = leftmost2[jy] - lj
+                        forest[x][y] = min(delete, insert, forest[p][q] + treedist[ix][jy])
+
+                if cutoff and min(forest[x]) > threshold:
+                    return None
+
+    distance = treedist[-1][-1]
+    if threshold is not None and distance > threshold:
+        return None
+
+    return distance
+
+def tree_edit_distance(tree1, tree2, threshold=None):
+    """
+    Ordered tree edit distance between two decomposition trees.
+
+    Parameters
+    ----------
+    tree1, tree2 : dict
+        Trees returned by resolve_kanji_tree_enriched.
+    threshold : float, optional
+        Early-abandon threshold. None is returned whenever the distance
+        exceeds it : first from the lower bounds, without running the
+        dynamic programme, then from the row minima of its last step.
+
+    Returns
+    -------
+    float or None
+        The distance, or None when it exceeds `threshold`.
+    """
+    annotation1 = postorder_annotation(tree1)
+    annotation2 = postorder_annotation(tree2)
+
+    if threshold is not None:
+        size1, size2 = len(annotation1[0]), len(annotation2[0])
+        bound        = max(
+                        abs(size1 - size2),
+                        abs(annotation1[3] - annotation2[3]),
+                        _label_bound(annotation1[0], annotation2[0])
+                        )
+        if bound > threshold:
+            return None
+
+    return zhang_shasha(annotation1, annotation2, threshold)
+
+def _label_bound(labels1, labels2):
+    """
+    Character multiset lower bound of the tree edit distance.
+    """
+    counts = {}
+    for char, _ in labels1:
+        counts[char] = counts.get(char, 0) + 1
+
+    common = 0
+    for char, _ in labels2:
+        if counts.get(char, 0):
+            counts[char] -= 1
+            common       += 1
+
+    size1, size2 = len(labels1), len(labels2)
+
+    return abs(size1 - size2) + min(size1, size2) - common
+
+#%%
+def build_structural_index(kanji_db, variant_index, kangxi_radicals):
+    """
+    Build the lower-bound index used to prune structural similarity queries.
+
+    Parameters
+    ----------
+    kanji_db : dict
+        Normalised kanji database (KANJI_DB).
+    variant_index : dict
+        Variant form -> canonical Kangxi radical (VARIANT_INDEX).
+    kangxi_radicals : dict
+        Indexed Kangxi radicals (KANGXI_RADICALS).
+
+    Returns
+    -------
+    dict
+        {
+          'kanji'          : list[str],
+          'size', 'depth'  : np.ndarray per kanji,
+          'labels'         : dict[str, int] node character -> label id,
+          'label_offsets'  : np.ndarray CSR offsets by label id,
+          'label_kanji'    : np.ndarray kanji ids containing the label,
+          'label_counts'   : np.ndarray number of such nodes in that kanji,
+          'annotations'    : dict[str, tuple] cache of post-order annotations
+        }
+    """
+    kanji  = list(kanji_db)
+    size   = np.empty(len(kanji), dtype=np.int32)
+    depth  = np.empty(len(kanji), dtype=np.int32)
+    labels = {}
+
+    pair_label = []
+    pair_kanji = []
+    pair_count = []
+
+    for kanji_id, char in enumerate(kanji):
+        tree = resolve_kanji_tree_enriched(char, kanji_db, variant_index, kangxi_radicals)
+
+        counts    = {}
+        level_max = 0
+        stack     = [(tree, 1)]
+        while stack:
+            node, level = stack.pop()
+            level_max   = max(level_max, level)
+            counts[node['char']] = counts.get(node['char'], 0) + 1
+            stack.extend((child, level + 1) for child in node['children'])
+
+        size[kanji_id]  = sum(counts.values())
+        depth[kanji_id] = level_max
+
+        for label, count in counts.items():
+            pair_label.append(labels.setdefault(label, len(labels)))
+            pair_kanji.append(kanji_id)
+            pair_count.append(count)
+
+    pair_label = np.asarray(pair_label, dtype=np.int32)
+    order      = np.argsort(pair_label, kind='stable')
+
+    label_offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pair_label, minlength=len(labels)), out=label_offsets[1:])
+
+    return {
+        'kanji'          : kanji,
+        'kanji_ids'      : {char: i for i, char in enumerate(kanji)},
+        'size'           : size,
+        'depth'          : depth,
+        'labels'         : labels,
+        'label_offsets'  : label_offsets,
+        'label_kanji'    : np.asarray(pair_kanji, dtype=np.int32)[order],
+        'label_counts'   : np.asarray(pair_count, dtype=np.int32)[order],
+        'annotations'    : {},
+        'kanji_db'       : kanji_db,
+        'variant_index'  : variant_index,
+        'kangxi_radicals': kangxi_radicals
+    }
+
+def _annotation(structural_index, char):
+    """
+    Post-order annotation of a character's tree, cached in the index.
+    """
+    cache = structural_index['annotations']
+
+    if char not in cache:
+        tree = resolve_kanji_tree_enriched(
+                                        char,
+                                        structural_index['kanji_db'],
+                                        structural_index['variant_index'],
+                                        structural_index['kangxi_radicals']
+                                        )
+        cache[char] = postorder_annotation(tree)
+
+    return cache[char]
+
+def lower_bounds(structural_index, annotation):
+    """
+    Vectorised lower bounds of the distance from one tree to every indexed tree.
+    """
+    labels     = annotation[0]
+    query_size = len(labels)
+
+    counts = {}
+    for char, _ in labels:
+        counts[char] = counts.get(char, 0) + 1
+
+    # multiset intersection |labels_query ∩ labels_x| for every x, label by label
+    common  = np.zeros(len(structural_index['kanji']), dtype=np.int32)
+    offsets = structural_index['label_offsets']
+    for char, count in counts.items():
+        label_id = structural_index['labels'].get(char)
+        if label_id is None:
+            continue
+        start, stop = offsets[label_id], offsets[label_id + 1]
+        common[structural_index['label_kanji'][start:stop]] += np.minimum(
+                                            structural_index['label_counts'][start:stop], count)
+
+    size       = structural_index['size']
+    size_bound = np.abs(size - query_size)
+
+    return size_bound + np.minimum(size, query_size) - common
+
+def most_similar_structures(structural_index, char, k=20):
+    """
+    Find the k characters whose decomposition tree is closest to `char`.
+
+    Parameters
+    ----------
+    structural_index : dict
+        Index returned by build_structural_index.
+    char : str
+        Query character.
+    k : int, optional
+        Number of neighbours.
+
+    Returns
+    -------
+    dict
+        {
+          'neighbours' : list[tuple[str, float]] closest first,
+          'exact'      : number of exact distances computed
+        }
+    """
+    query  = _annotation(structural_index, char)
+    bounds = lower_bounds(structural_index, query).astype(np.float64)
+    bounds = np.maximum(bounds, np.abs(structural_index['depth'] - query[3]))
+
+    self_id = structural_index['kanji_ids'].get(char)
+    if self_id is not None:
+        bounds[self_id] = np.inf
+
+    # best-first over candidates, stop once no bound can beat the k-th best
+    order = np.argsort(bounds, kind='stable')
+    best  = []   # max-heap of (-distance, -kanji_id)
+    exact = 0
+
+    kanji = structural_index['kanji']
+    for kanji_id in order:
+        bound = bounds[kanji_id]
+        if not np.isfinite(bound):
+            break
+        if len(best) == k and bound >= -best[0][0]:
+            break
+
+        # once k neighbours are known, farther candidates are abandoned early
+        threshold = -best[0][0] if len(best) == k else None
+        distance  = zhang_shasha(query, _annotation(structural_index, kanji[kanji_id]), threshold)
+        exact    += 1
+        if distance is None:
+            continue
+
+        item = (-distance, -int(kanji_id))
+        if len(best) < k:
+            heapq.heappush(best, item)
+        elif item > best[0]:
+            heapq.heapreplace(best, item)
+
+    neighbours = sorted((-d, -i) for d, i in best)
+
+    return {
+        'neighbours' : [(kanji[i], d) for d, i in neighbours],
+        'exact'      : exact
+    }
@@ -0,0 +1,238 @@
+import codecs
+import re
+import time
+from kanji_dict_xml import field_to_int
+
+#%%
+"""
+Batch annotation of the kanji of a text.
+
+Annotating Japanese text character by character repeats the same lookups
+for every occurrence of 日, 人, 本... Here a text is annotated in three
+steps :
+
+    1. scan  : one regular expression over the CJK ideograph ranges finds
+               the runs of kanji (no per-character Python test on kana,
+               latin or punctuation),
+    2. reduce: the unique kanji of the text are collected,
+    3. resolve: each unique kanji is resolved once against KANJIDIC2 and
+               the metrics ; annotations are cached in the annotator, so
+               a kanji is resolved once for all the texts it appears in.
+
+The result lists the position of every kanji occurrence and a single
+shared annotation per distinct kanji :
+
+    {
+      'positions'   : [0, 1, 5, ...],        # str offsets (code points)
+      'kanji'       : ['日', '本', '語', ...],  # kanji at each position
+      'annotations' : {'日': {...}, '本': {...}, ...}
+    }
+
+    annotator = build_annotator(kanji_dict, metrics)
+    annotate_text('日本語の本を読む', annotator)
+    for part in annotate_stream(open('corpus.txt', encoding='utf-8'), annotator):
+        ...
+"""
+
+# CJK unified ideographs (+ extension A, B-H) and compatibility ideographs, plus 々
+KANJI_RANGES = (
+    '々'
+    '㐀-䶿'
+    '一-鿿'
+    '豈-﫿'
+    '\U00020000-\U0003134f'
+)
+KANJI_RUN    = re.compile(f'[{KANJI_RANGES}]+')
+
+# characters read per annotate_stream step
+STREAM_CHUNK_SIZE = 1 << 20
+
+def build_annotator(kanji_dict, metrics=None, languages=('en',)):
+    """
+    Gather the lookup tables used to annotate texts.
+
+    Parameters
+    ----------
+    kanji_dict : dict
+        Parsed KANJIDIC2 dictionary (kanji_XML_parser_dic2).
+    metrics : dict[str, dict], optional
+        compute_all_kanji_metrics result.
+    languages : tuple[str], optional
+        Meaning languages kept in the annotations.
+
+    Returns
+    -------
+    dict
+        Annotator state ; 'cache' grows with the distinct kanji annotated.
+    """
+    return {
+        'kanji_dict' : kanji_dict,
+        'metrics'    : metrics or {},
+        'languages'  : frozenset(languages),
+        'cache'      : {}
+    }
+
+def annotate_kanji(char, annotator):
+    """
+    Build the annotation of one kanji (no cache, see resolve_annotations).
+
+    Returns
+    -------
+    dict
+        {
+          'known'        : bool, False when absent from KANJIDIC2,
+          'on', 'kun'    : list[str] readings,
+          'meanings'     : list[str],
+          'jlpt'         : int or None (former JLPT level 1-4),
+          'grade'        : int or None,
+          'frequency'    : int or None,
+          'stroke_count' : int or None,
+          'metrics'      : dict or None
+        }
+    """
+    data = annotator['kanji_dict'].get(char)
+    if data is None:
+        data = {}
+
+    readings  = data.get('readings', {})
+    languages = annotator['languages']
+
+    return {
+        'known'        : bool(data),
+        'on'           : readings.get('on', []),
+        'kun'          : readings.get('kun', []),
+        'meanings'     : [meaning['text'] for meaning in data.get('meanings', []) if meaning['lang'] in languages],
+        'jlpt'         : field_to_int(data.get('jlpt')),
+        'grade'        : field_to_int(data.get('grade')),
+        'frequency'    : field_to_int(data.get('frequency')),
+        'stroke_count' : field_to_int(data.get('stroke_count')),
+        'metrics'      : annotator['metrics'].get(char)
+    }
+
+def resolve_annotations(kanji, annotator):
+    """
+    Resolve a set of distinct kanji in bulk, through the annotator cache.
+
+    Returns
+    -------
+    dict[str, dict]
+        Kanji -> shared annotation.
+    """
+    cache   = annotator['cache']
+    missing = [char for char in kanji if char not in cache]
+
+    for char in missing:
+        cache[char] = annotate_kanji(char, annotator)
+
+    return {char: cache[char] for char in kanji}
+
+#%%
+def scan_kanji(text, offset=0):
+    """
+    Find every kanji of a text by scanning for runs of CJK ideographs.
+
+    Parameters
+    ----------
+    text : str
+    offset : int, optional
+        Added to the positions (position of `text` in a larger document).
+
+    Returns
+    -------
+    tuple[list[int], list[str]]
+        Positions and kanji of every occurrence, in text order.
+    """
+    positions = []
+    kanji     = []
+
+    for run in KANJI_RUN.finditer(text):
+        start = run.start() + offset
+        chars = run.group()
+        positions.extend(range(start, start + len(chars)))
+        kanji.extend(chars)
+
+    return positions, kanji
+
+def annotate_text(text, annotator, offset=0):
+    """
+    Annotate every kanji of a text.
+
+    Parameters
+    ----------
+    text : str
+    annotator : dict
+        Result of build_annotator.
+    offset : int, optional
+        Added to the positions.
+
+    Returns
+    -------
+    dict
+        {'positions': list[int], 'kanji': list[str], 'annotations': dict[str, dict]}
+    """
+    positions, kanji = scan_kanji(text, offset)
+
+    return {
+        'positions'   : positions,
+        'kanji'       : kanji,
+        'annotations' : resolve_annotations(set(kanji), annotator)
+    }
+
+def annotate_stream(file, annotator, chunk_size=STREAM_CHUNK_SIZE, encoding='utf-8'):
+    """
+    Annotate a large text file chunk by chunk, in bounded memory.
+
+    Parameters
+    ----------
+    file : file object
+        Text file, or binary file decoded with `encoding`.
+    annotator : dict
+        Result of build_annotator.
+    chunk_size : int, optional
+        Characters (text files) or bytes (binary files) read per step.
+
+    Yields
+    ------
+    dict
+        annotate_text result of each chunk, positions counted from the
+        start of the file (in characters). The annotations are shared
+        between chunks.
+    """
+    # a multi-byte character may straddle two binary chunks
+    decoder = codecs.getincrementaldecoder(encoding)()
+    offset  = 0
+
+    while True:
+        raw   = file.read(chunk_size)
+        chunk = decoder.decode(raw, final=not raw) if isinstance(raw, bytes) else raw
+
+        if chunk:
+            yield annotate_text(chunk, annotator, offset)
+            offset += len(chunk)
+
+        if not raw:
+            break
+
+def benchmark_annotation(text, annotator, rounds=5):
+    """
+    Measure annotate_text throughput on a text.
+
+    Returns
+    -------
+    dict
+        {'mb': text size in UTF-8 MB, 'seconds': best round, 'mb_per_s', 'kanji_per_s': float}
+    """
+    size = len(text.encode('utf-8')) / 1e6
+    best = float('inf')
+
+    for _ in range(rounds):
+        start  = time.perf_counter()
+        result = annotate_text(text, annotator)
+        best   = min(best, time.perf_counter() - start)
+
+    return {
+        'mb'          : round(size, 3),
+        'seconds'     : round(best, 4),
+        'mb_per_s'    : round(size / best, 1),
+        'kanji_per_s' : round(len(result['kanji']) / best)
+    }
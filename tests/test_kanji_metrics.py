@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPT_DIR = Path(__file__).resolve().parent.parent / 'script'
+DATA_DIR   = Path(__file__).resolve().parent.parent / 'data'
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from kanji_metrics import (
+    _metrics_for_kanji,
+    compute_all_kanji_metrics,
+    component_dag_metrics,
+    register_metric,
+    unregister_metric
+)
+
+def _entry(*components):
+    return {'components': [{'component': char, 'position': None} for char in components]}
+
+# repeated components (林, 圭, 棼), a component met again under a sibling (森),
+# shared sub-trees (佳, 街, 述, 迷) and a cycle (甲 <-> 乙)
+KANJI_DB = {
+    '林' : _entry('木', '木'),
+    '森' : _entry('木', '林'),
+    '棼' : _entry('林', '林'),
+    '圭' : _entry('土', '土'),
+    '佳' : _entry('亻', '圭'),
+    '街' : _entry('彳', '圭', '亍'),
+    '述' : _entry('辶', '术'),
+    '术' : _entry('木', '丶'),
+    '迷' : _entry('述', '米', '术'),
+    '甲' : _entry('乙', '口'),
+    '乙' : _entry('甲'),
+    '木' : {'components': []}
+}
+VARIANT_INDEX   = {'木': '木', '土': '土', '亻': '人', '彳': '彳', '辶': '辵', '口': '口', '乙': '乙'}
+KANGXI_RADICALS = {radical: {'id': i} for i, radical in enumerate(['木', '土', '人', '彳', '辵', '口', '乙'], 1)}
+
+def test_dag_metrics_match_tree_walk():
+    expected = _metrics_for_kanji(KANJI_DB, KANJI_DB, VARIANT_INDEX, KANGXI_RADICALS)
+    metrics  = component_dag_metrics(KANJI_DB, VARIANT_INDEX, KANGXI_RADICALS)
+
+    assert metrics == expected
+    assert list(metrics) == list(expected)
+    # the second 林 is a truncated leaf : 5 nodes, not 7
+    assert metrics['棼']['size'] == 5
+
+def test_registered_metrics_use_the_tree_walk():
+    register_metric('height', lambda node, values, depth: 1 + max(values, default=0))
+    try:
+        metrics = compute_all_kanji_metrics(KANJI_DB, VARIANT_INDEX, KANGXI_RADICALS)
+    finally:
+        unregister_metric('height')
+
+    assert all(values['height'] == values['depth'] for values in metrics.values())
+
+@pytest.mark.skipif(not (DATA_DIR / 'Unihan_CJKVI_database.txt').exists(), reason='CJKVI database not available')
+def test_dag_metrics_match_tree_walk_full_database():
+    from parse_unihan_cjkvi import load_kanji_resources
+
+    resources = load_kanji_resources(DATA_DIR / 'Unihan_CJKVI_database.txt', DATA_DIR / 'kangxi_radicals.json')
+    kanji_db  = resources['KANJI_DB']
+    args      = (resources['VARIANT_INDEX'], resources['KANGXI_RADICALS'])
+
+    assert component_dag_metrics(kanji_db, *args) == _metrics_for_kanji(kanji_db, kanji_db, *args)
@@ -0,0 +1,65 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPT_DIR = Path(__file__).resolve().parent.parent / 'script'
+DATA_DIR   = Path(__file__).resolve().parent.parent / 'data'
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from metric_sketches import (
+    DEFAULT_K,
+    build_metric_sketches,
+    compare_with_exact,
+    merge_metric_sketches
+)
+
+# KLL bound of the module docstring : rank error < 3.3 / k (99% probability),
+# 0.0165 for k = 200 ; the seeds are fixed, so the runs are reproducible
+RANK_ERROR_BOUND = 3.3 / DEFAULT_K
+SHARDS           = 4
+
+def _shards(metrics, count=SHARDS):
+    kanji = list(metrics)
+    return [{char: metrics[char] for char in kanji[i::count]} for i in range(count)]
+
+def _assert_within_bound(metrics):
+    single = compare_with_exact(metrics, build_metric_sketches(metrics, seed=1))
+    merged = compare_with_exact(
+                    metrics,
+                    merge_metric_sketches(*(
+                        build_metric_sketches(shard, seed=i) for i, shard in enumerate(_shards(metrics))
+                    ))
+                    )
+
+    for name, errors in (('single sketch', single), ('merged shards', merged)):
+        for metric, error in errors.items():
+            assert error < RANK_ERROR_BOUND, f"{name} {metric}: rank error {error:.4f} >= {RANK_ERROR_BOUND:.4f}"
+
+def test_sketch_rank_error_synthetic():
+    # skewed small integers with many ties, like the tree metrics
+    rng     = random.Random(0)
+    metrics = {
+        chr(0x4E00 + i): {
+            'depth' : min(int(rng.expovariate(0.5)), 12),
+            'size'  : int(rng.lognormvariate(2.5, 0.6)),
+            'ratio' : rng.random()
+        }
+        for i in range(50000)
+    }
+
+    _assert_within_bound(metrics)
+
+@pytest.mark.skipif(not (DATA_DIR / 'Unihan_CJKVI_database.txt').exists(), reason='CJKVI database not available')
+def test_sketch_rank_error_full_database():
+    from metrics_store import cached_kanji_metrics, store_to_metrics
+
+    store   = cached_kanji_metrics(
+                    DATA_DIR / 'Unihan_CJKVI_database.txt',
+                    DATA_DIR / 'kangxi_radicals.json',
+                    cache_dir=DATA_DIR / 'cache'
+                    )
+    metrics = store_to_metrics(store)
+
+    _assert_within_bound(metrics)